@@ -8,16 +8,25 @@
 
 import os
 import sys
+import signal
+import argparse
 import subprocess
 import logging
 import json
 import time
 import hashlib
+import socket
+import uuid
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Tuple, Optional
 import importlib
+import sqlite3
+import shutil
+import threading
+from contextlib import contextmanager
 import psycopg2
+import psycopg2.pool
 from psycopg2.extras import RealDictCursor
 
 ##########################################################################################
@@ -98,13 +107,96 @@ Path_F1_CO = os.path.normpath(Paths['F1_CO'])
 ##################################################################
 ##################################################################
 
+# Fragment storage: 'chunked' streams fragments into an ordinal chunk table with
+# bounded client memory; 'inline' keeps the whole file in fragment_data (legacy)
+FRAGMENT_STORAGE_MODE = 'chunked'
+FRAGMENT_CHUNK_SIZE = 8 * 1024 * 1024
+
+class DatabaseConnectionPools:
+    """
+    Pooled psycopg2 connections, one pool per database, shared by all handlers
+    """
+    
+    def __init__(self, minconn: int = 1, maxconn: int = 4, health_check_seconds: float = 30.0):
+        self.logger = logging.getLogger(__name__)
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.health_check_seconds = health_check_seconds
+        self._pools = {}
+        self._last_used = {}
+        self._lock = threading.Lock()
+    
+    def _pool_for(self, db_config: dict):
+        key = tuple(sorted(db_config.items()))
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = psycopg2.pool.ThreadedConnectionPool(self.minconn, self.maxconn, **db_config)
+                self._pools[key] = pool
+                self.logger.info(f"[DB_POOL] Opened pool for {db_config['host']}:{db_config['port']}/{db_config['database']} (max {self.maxconn})")
+            return pool
+    
+    def _is_healthy(self, conn) -> bool:
+        """Closed connections fail fast; idle ones are probed with SELECT 1"""
+        if conn.closed:
+            return False
+        if time.time() - self._last_used.get(id(conn), 0) < self.health_check_seconds:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    @contextmanager
+    def connection(self, db_config: dict):
+        """Borrow a healthy connection; commit on success, roll back on error"""
+        try:
+            pool = self._pool_for(db_config)
+            conn = pool.getconn()
+            for _ in range(self.maxconn):
+                if self._is_healthy(conn):
+                    break
+                self.logger.warning("[DB_POOL] Replacing stale database connection")
+                pool.putconn(conn, close=True)
+                conn = pool.getconn()
+        except Exception as e:
+            self.logger.error(f"[DB ERROR] Connection failed: {e}")
+            self.logger.error(f"[DB ERROR] Using host={db_config['host']}, database={db_config['database']}")
+            raise
+        
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except BaseException as e:
+            broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self._last_used[id(conn)] = time.time()
+            pool.putconn(conn, close=broken or conn.closed)
+    
+    def close_all(self):
+        with self._lock:
+            for pool in self._pools.values():
+                pool.closeall()
+            self._pools.clear()
+            self._last_used.clear()
+
+CONNECTION_POOLS = DatabaseConnectionPools()
+
 class FragmentsBYTEAHandler:
     """
     Handler for storing and retrieving Fragments files in PostgreSQL BYTEA format
     """
     
-    def __init__(self, db_config: dict):
+    def __init__(self, db_config: dict, pools: DatabaseConnectionPools = CONNECTION_POOLS):
         self.logger = logging.getLogger(__name__)
+        self.pools = pools
         
         # Simple mapping from project config to psycopg2 parameters
         self.db_config = {
@@ -114,18 +206,15 @@ class FragmentsBYTEAHandler:
             'user': db_config.get('DB_USER', 'postgres'),
             'password': db_config.get('DB_PASSWORD', '')
         }
+        self.storage_mode = db_config.get('FRAGMENT_STORAGE_MODE', FRAGMENT_STORAGE_MODE)
+        self.chunk_size = int(db_config.get('FRAGMENT_CHUNK_SIZE', FRAGMENT_CHUNK_SIZE))
         
         self.logger.info(f"[DB] Database config: host={self.db_config['host']}:{self.db_config['port']}, database={self.db_config['database']}, user={self.db_config['user']}")
         self.ensure_schema_exists()
     
     def get_connection(self):
-        """Create database connection"""
-        try:
-            return psycopg2.connect(**self.db_config)
-        except Exception as e:
-            self.logger.error(f"[DB ERROR] Connection failed: {e}")
-            self.logger.error(f"[DB ERROR] Using host={self.db_config['host']}, database={self.db_config['database']}")
-            raise
+        """Borrow a pooled database connection (one transaction per `with` block)"""
+        return self.pools.connection(self.db_config)
     
     def ensure_schema_exists(self):
         """Ensure the t5_va schema and F1600_CO_Fragments_bytea table exist"""
@@ -151,6 +240,29 @@ class FragmentsBYTEAHandler:
                         );
                     """)
                     
+                    # Chunked storage: fragment_data stays NULL and the bytes live in
+                    # ordered chunks, so neither side ever holds the whole file
+                    cur.execute("""
+                        ALTER TABLE t5_va.F1600_CO_Fragments_bytea
+                            ALTER COLUMN fragment_data DROP NOT NULL,
+                            ADD COLUMN IF NOT EXISTS storage_mode VARCHAR(16) NOT NULL DEFAULT 'inline',
+                            ADD COLUMN IF NOT EXISTS chunk_count INTEGER;
+                    """)
+                    cur.execute("""
+                        CREATE TABLE IF NOT EXISTS t5_va.F1600_CO_Fragments_bytea_chunks (
+                            fragment_id INTEGER NOT NULL
+                                REFERENCES t5_va.F1600_CO_Fragments_bytea(id) ON DELETE CASCADE,
+                            chunk_index INTEGER NOT NULL,
+                            chunk_data BYTEA NOT NULL,
+                            PRIMARY KEY (fragment_id, chunk_index)
+                        );
+                    """)
+                    # Fragments are already compressed; skip pglz on the chunks
+                    cur.execute("""
+                        ALTER TABLE t5_va.F1600_CO_Fragments_bytea_chunks
+                            ALTER COLUMN chunk_data SET STORAGE EXTERNAL;
+                    """)
+                    
                     # Create indexes
                     cur.execute("""
                         CREATE INDEX IF NOT EXISTS idx_fragments_filename 
@@ -178,28 +290,19 @@ class FragmentsBYTEAHandler:
     
     def store_fragment(self, fragment_file: Path, ifc_source: str, conversion_metadata: dict) -> bool:
         """Store fragment file as BYTEA in database"""
+        if self.storage_mode == 'chunked':
+            return self.store_fragment_chunked(fragment_file, ifc_source, conversion_metadata)
+        
         try:
             # Calculate file hash
             file_hash = self.calculate_file_hash(fragment_file)
             file_size = fragment_file.stat().st_size
             
-            # Check if file already exists
-            with self.get_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute("""
-                        SELECT id FROM t5_va.F1600_CO_Fragments_bytea 
-                        WHERE file_hash = %s
-                    """, (file_hash,))
-                    
-                    if cur.fetchone():
-                        self.logger.warning(f"[DB] Fragment already exists in database: {fragment_file.name}")
-                        return True
-            
             # Read fragment file
             with open(fragment_file, 'rb') as f:
                 fragment_data = f.read()
             
-            # Store in database
+            # Store in database; an existing hash inserts nothing and returns no id
             with self.get_connection() as conn:
                 with conn.cursor() as cur:
                     cur.execute("""
@@ -207,6 +310,7 @@ class FragmentsBYTEAHandler:
                         (filename, file_hash, fragment_data, file_size_bytes, 
                          ifc_source_file, conversion_metadata)
                         VALUES (%s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (file_hash) DO NOTHING
                         RETURNING id
                     """, (
                         fragment_file.name,
@@ -217,8 +321,11 @@ class FragmentsBYTEAHandler:
                         json.dumps(conversion_metadata)
                     ))
                     
-                    fragment_id = cur.fetchone()[0]
-                    conn.commit()
+                    row = cur.fetchone()
+                    if not row:
+                        self.logger.warning(f"[DB] Fragment already exists in database: {fragment_file.name}")
+                        return True
+                    fragment_id = row[0]
                     
                     self.logger.info(f"[DB] Successfully stored fragment in database: {fragment_file.name} (ID: {fragment_id})")
                     return True
@@ -227,6 +334,110 @@ class FragmentsBYTEAHandler:
             self.logger.error(f"[DB ERROR] Failed to store fragment {fragment_file.name}: {e}")
             return False
     
+    def store_fragment_chunked(self, fragment_file: Path, ifc_source: str, conversion_metadata: dict) -> bool:
+        """Stream fragment file into the chunk table, one chunk in memory at a time"""
+        try:
+            file_hash = self.calculate_file_hash(fragment_file)
+            file_size = fragment_file.stat().st_size
+            
+            with self.get_connection() as conn:
+                with conn.cursor() as cur:
+                    # Header row and chunks commit together; a failure leaves nothing behind
+                    cur.execute("""
+                        INSERT INTO t5_va.F1600_CO_Fragments_bytea 
+                        (filename, file_hash, fragment_data, file_size_bytes, 
+                         ifc_source_file, conversion_metadata, storage_mode)
+                        VALUES (%s, %s, NULL, %s, %s, %s, 'chunked')
+                        ON CONFLICT (file_hash) DO NOTHING
+                        RETURNING id
+                    """, (
+                        fragment_file.name,
+                        file_hash,
+                        file_size,
+                        ifc_source,
+                        json.dumps(conversion_metadata)
+                    ))
+                    row = cur.fetchone()
+                    if not row:
+                        self.logger.warning(f"[DB] Fragment already exists in database: {fragment_file.name}")
+                        return True
+                    fragment_id = row[0]
+                    
+                    chunk_count = 0
+                    with open(fragment_file, 'rb') as f:
+                        for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                            cur.execute("""
+                                INSERT INTO t5_va.F1600_CO_Fragments_bytea_chunks
+                                (fragment_id, chunk_index, chunk_data)
+                                VALUES (%s, %s, %s)
+                            """, (fragment_id, chunk_count, psycopg2.Binary(chunk)))
+                            chunk_count += 1
+                    
+                    cur.execute("""
+                        UPDATE t5_va.F1600_CO_Fragments_bytea SET chunk_count = %s WHERE id = %s
+                    """, (chunk_count, fragment_id))
+                    
+                    self.logger.info(f"[DB] Successfully stored fragment in database: {fragment_file.name} (ID: {fragment_id}, {chunk_count} chunks)")
+                    return True
+        
+        except Exception as e:
+            self.logger.error(f"[DB ERROR] Failed to store fragment {fragment_file.name}: {e}")
+            return False
+    
+    def iter_fragment(self, file_hash: str):
+        """Yield a stored fragment's bytes in chunks, whichever storage mode it was written with"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT id, storage_mode, file_size_bytes FROM t5_va.F1600_CO_Fragments_bytea 
+                    WHERE file_hash = %s
+                """, (file_hash,))
+                row = cur.fetchone()
+            if not row:
+                raise KeyError(f"Fragment not found in database: {file_hash}")
+            fragment_id, storage_mode, file_size = row
+            
+            if storage_mode == 'chunked':
+                # Server-side cursor: rows are fetched one chunk per round trip
+                with conn.cursor(name=f"fragment_{fragment_id}") as cur:
+                    cur.itersize = 1
+                    cur.execute("""
+                        SELECT chunk_data FROM t5_va.F1600_CO_Fragments_bytea_chunks
+                        WHERE fragment_id = %s ORDER BY chunk_index
+                    """, (fragment_id,))
+                    for (chunk_data,) in cur:
+                        yield bytes(chunk_data)
+            else:
+                # Legacy inline rows are sliced server-side with substring()
+                with conn.cursor() as cur:
+                    for offset in range(0, file_size, self.chunk_size):
+                        cur.execute("""
+                            SELECT substring(fragment_data FROM %s FOR %s)
+                            FROM t5_va.F1600_CO_Fragments_bytea WHERE id = %s
+                        """, (offset + 1, self.chunk_size, fragment_id))
+                        yield bytes(cur.fetchone()[0])
+    
+    def export_fragment(self, file_hash: str, output_file: Path) -> bool:
+        """Stream a stored fragment to disk and verify it against its hash"""
+        tmp_file = output_file.with_suffix(output_file.suffix + ".part")
+        try:
+            hash_sha256 = hashlib.sha256()
+            with open(tmp_file, 'wb') as f:
+                for chunk in self.iter_fragment(file_hash):
+                    hash_sha256.update(chunk)
+                    f.write(chunk)
+            
+            if hash_sha256.hexdigest() != file_hash:
+                raise ValueError(f"Hash mismatch for exported fragment {output_file.name}")
+            tmp_file.replace(output_file)
+            self.logger.info(f"[DB] Exported fragment from database: {output_file.name}")
+            return True
+        
+        except Exception as e:
+            tmp_file.unlink(missing_ok=True)
+            self.logger.error(f"[DB ERROR] Failed to export fragment {file_hash}: {e}")
+            return False
+    
     def get_storage_stats(self) -> dict:
         """Get database storage statistics"""
         try:
@@ -249,15 +460,282 @@ class FragmentsBYTEAHandler:
             self.logger.error(f"[DB ERROR] Failed to get storage stats: {e}")
             return {}
 
+class FragmentStorageOutbox:
+    """
+    Durable write-behind queue of fragments pending database storage
+    
+    Conversions enqueue one row per target database in a local SQLite file and
+    move on; one writer thread per target drains its rows with exponential
+    backoff. Rows left pending (crash, unreachable database) are picked up by
+    the next run.
+    
+    Each enqueued fragment is copied into a spool directory next to the
+    database and stored from there, as the next conversion of the same IFC
+    (possibly in the next run, while resumed rows drain) overwrites the
+    output path. The copy is removed once no row is pending on it.
+    """
+    
+    def __init__(self, db_path: Path, handlers: Dict[str, 'FragmentsBYTEAHandler'],
+                 max_attempts: int = 6, backoff_seconds: float = 2.0, max_backoff_seconds: float = 120.0,
+                 on_result=None):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = Path(db_path)
+        self.spool_dir = self.db_path.parent / f"{self.db_path.stem}_spool"
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.handlers = handlers
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.on_result = on_result
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._writers = []
+        # Rows up to this id were queued by earlier runs (set by start())
+        self.resumed_max_id = 0
+        
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    target TEXT NOT NULL,
+                    fragment_path TEXT NOT NULL,
+                    spool_path TEXT,
+                    ifc_source TEXT NOT NULL,
+                    conversion_metadata TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    enqueued_at REAL NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    stored_at REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(target, status, next_attempt_at);
+            """)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(outbox)")}
+            if 'spool_path' not in columns:
+                conn.execute("ALTER TABLE outbox ADD COLUMN spool_path TEXT")
+    
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def enqueue(self, fragment_file: Path, ifc_source: str, conversion_metadata: dict) -> Dict[str, int]:
+        """Queue a fragment for every target database; returns the row id per target"""
+        spool_file = self._spool(Path(fragment_file))
+        now = time.time()
+        ids = {}
+        with self._connect() as conn:
+            for target in self.handlers:
+                cur = conn.execute("""
+                    INSERT INTO outbox (target, fragment_path, spool_path, ifc_source, conversion_metadata,
+                                        enqueued_at, next_attempt_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (target, str(fragment_file), str(spool_file), ifc_source, json.dumps(conversion_metadata),
+                      now, now))
+                ids[target] = cur.lastrowid
+        with self._wakeup:
+            self._wakeup.notify_all()
+        return ids
+    
+    def _spool(self, fragment_file: Path) -> Path:
+        """Copy a fragment to its own spool directory, keeping its name (stored with the fragment)"""
+        spool_file = self.spool_dir / uuid.uuid4().hex / fragment_file.name
+        spool_file.parent.mkdir()
+        try:
+            shutil.copyfile(fragment_file, spool_file)
+        except OSError:
+            shutil.rmtree(spool_file.parent, ignore_errors=True)
+            raise
+        return spool_file
+    
+    def _release_spool(self, spool_path: Optional[str]):
+        """Remove a spooled fragment once no pending row refers to it"""
+        if not spool_path:
+            return
+        with self._connect() as conn:
+            still_pending = conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE spool_path = ? AND status = 'pending'", (spool_path,)
+            ).fetchone()[0]
+        if not still_pending:
+            shutil.rmtree(Path(spool_path).parent, ignore_errors=True)
+    
+    def _spool_legacy_rows(self):
+        """Spool the fragments of pending rows queued before spooling existed, before any conversion starts"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT fragment_path FROM outbox WHERE status = 'pending' AND spool_path IS NULL"
+            ).fetchall()
+        for row in rows:
+            fragment_file = Path(row['fragment_path'])
+            if not fragment_file.exists():
+                continue
+            spool_file = self._spool(fragment_file)
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE outbox SET spool_path = ? WHERE fragment_path = ? AND status = 'pending' AND spool_path IS NULL",
+                    (str(spool_file), row['fragment_path'])
+                )
+    
+    def start(self):
+        """Start one writer thread per target database"""
+        with self._connect() as conn:
+            self.resumed_max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM outbox").fetchone()[0]
+        pending = self.pending_count()
+        if pending:
+            self.logger.info(f"[OUTBOX] Resuming {pending} fragment(s) pending from previous runs")
+            self._spool_legacy_rows()
+        for target in self.handlers:
+            writer = threading.Thread(target=self._writer_loop, args=(target,),
+                                      name=f"outbox-{target}", daemon=True)
+            writer.start()
+            self._writers.append(writer)
+    
+    def _next_due(self, target: str):
+        with self._connect() as conn:
+            return conn.execute("""
+                SELECT * FROM outbox
+                WHERE target = ? AND status = 'pending' AND next_attempt_at <= ?
+                ORDER BY id LIMIT 1
+            """, (target, time.time())).fetchone()
+    
+    def _writer_loop(self, target: str):
+        handler = self.handlers[target]
+        while not self._stopping:
+            row = self._next_due(target)
+            if row is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=1.0)
+                continue
+            
+            fragment_file = Path(row['spool_path'] or row['fragment_path'])
+            error = None
+            if not fragment_file.exists():
+                error = f"Fragment file missing: {fragment_file}"
+                stored = False
+            else:
+                stored = handler.store_fragment(fragment_file, row['ifc_source'], json.loads(row['conversion_metadata']))
+                if not stored:
+                    error = "store_fragment failed"
+            
+            attempts = row['attempts'] + 1
+            with self._connect() as conn:
+                if stored:
+                    conn.execute("""
+                        UPDATE outbox SET status = 'stored', attempts = ?, stored_at = ?, last_error = NULL
+                        WHERE id = ?
+                    """, (attempts, time.time(), row['id']))
+                elif attempts >= self.max_attempts or not fragment_file.exists():
+                    conn.execute("""
+                        UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?
+                    """, (attempts, error, row['id']))
+                else:
+                    delay = min(self.backoff_seconds * 2 ** (attempts - 1), self.max_backoff_seconds)
+                    conn.execute("""
+                        UPDATE outbox SET attempts = ?, last_error = ?, next_attempt_at = ? WHERE id = ?
+                    """, (attempts, error, time.time() + delay, row['id']))
+                    self.logger.warning(f"[OUTBOX] {target}: {fragment_file.name} attempt {attempts} failed, retrying in {delay:.1f}s")
+                    continue
+            
+            self._release_spool(row['spool_path'])
+            if self.on_result:
+                self.on_result(target, row['id'], stored)
+        
+        with self._wakeup:
+            self._wakeup.notify_all()
+    
+    def pending_count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+    
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Wait until nothing is pending (True) or the timeout passes (False)"""
+        deadline = time.time() + timeout if timeout is not None else None
+        while self.pending_count():
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.5)
+        return True
+    
+    def stop(self):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for writer in self._writers:
+            writer.join(timeout=5)
+    
+    def statuses(self, ids) -> Dict[int, str]:
+        ids = list(ids)
+        if not ids:
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id, status FROM outbox WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+        return {row['id']: row['status'] for row in rows}
+    
+    def lag_stats(self, since: float = 0) -> Dict:
+        """Storage lag per target: enqueue-to-stored times and the pending backlog"""
+        now = time.time()
+        stats = {}
+        with self._connect() as conn:
+            for target in self.handlers:
+                stored = conn.execute("""
+                    SELECT COUNT(*), AVG(stored_at - enqueued_at), MAX(stored_at - enqueued_at)
+                    FROM outbox WHERE target = ? AND status = 'stored' AND enqueued_at >= ?
+                """, (target, since)).fetchone()
+                pending = conn.execute("""
+                    SELECT COUNT(*), MIN(enqueued_at) FROM outbox WHERE target = ? AND status = 'pending'
+                """, (target,)).fetchone()
+                failed = conn.execute("""
+                    SELECT COUNT(*) FROM outbox WHERE target = ? AND status = 'failed' AND enqueued_at >= ?
+                """, (target, since)).fetchone()[0]
+                stats[target] = {
+                    'stored': stored[0],
+                    'avg_lag_seconds': round(stored[1], 2) if stored[1] is not None else None,
+                    'max_lag_seconds': round(stored[2], 2) if stored[2] is not None else None,
+                    'pending': pending[0],
+                    'oldest_pending_seconds': round(now - pending[1], 2) if pending[1] else None,
+                    'failed': failed
+                }
+        return stats
+
+# Time the run waits at the end for the outbox to drain; leftovers stay queued for the next run
+OUTBOX_DRAIN_TIMEOUT = 600
+
+# Converter timeout when the portable package (and its duration model) cannot be imported
+DEFAULT_CONVERSION_TIMEOUT = 600
+
+# Niceness of the converter processes per priority class; batch runs yield the
+# CPU to interactive conversions (e.g. viewer uploads) on the same machine
+PRIORITY_NICE = {'interactive': 0, 'batch': 10}
+
+# Distributed mode: lease directory under the target directory unless --lease-dir is given
+DEFAULT_LEASE_DIR_NAME = '.conversion_leases'
+
+# Longest wait between passes over files leased by other hosts
+LEASE_POLL_SECONDS = 30
+
 class ProjectIfcConverter:
     """
     Project-specific IFC to Fragments converter using portable converter package
     """
     
-    def __init__(self):
+    def __init__(self, priority: str = 'batch', distributed: bool = False, lease_dir: Optional[str] = None,
+                 batch_id: Optional[str] = None):
         # Define script_dir and log_dir first, ensure log_dir exists
         self.script_dir = Path(__file__).parent
         self.log_dir = self.script_dir / "logs"
+        if distributed:
+            # The script directory is shared between the hosts; their SQLite
+            # stores (history, outbox) and logs must not be
+            self.log_dir = self.log_dir / socket.gethostname()
         self.log_dir.mkdir(parents=True, exist_ok=True)
         
         self.setup_logging() # Logging setup now uses self.log_dir
@@ -267,6 +745,11 @@ class ProjectIfcConverter:
         self.target_dir = Path(Path_F1_CO)
         self.project_name = PjName
         self.project_long_name = PjLongName
+        self.priority = priority
+        self.distributed = distributed
+        self.lease_dir = Path(lease_dir) if lease_dir else self.target_dir / DEFAULT_LEASE_DIR_NAME
+        self.batch_id = batch_id
+        self.leases = None
         
         # Initialize primary database handler
         try:
@@ -332,6 +815,49 @@ class ProjectIfcConverter:
         
         self.portable_converter = self.converter_package_dir / "ifc_fragments_converter.py"
         
+        # Append-only conversion history (ships with the portable converter package)
+        self.history = None
+        self.run_id = None
+        self.run_measured = None
+        self.converter_version = None
+        self.duration_model = None
+        self.count_entities = None
+        self.entity_counts = {}
+        self.content_hashes = {}
+        self.prescan = None
+        try:
+            sys.path.append(str(self.converter_package_dir))
+            from conversion_history import ConversionHistory, converter_version, run_measured
+            from duration_model import DurationModel, count_entities
+            self.history = ConversionHistory(self.log_dir / "conversion_history.db")
+            self.run_measured = run_measured
+            node_script = self.converter_package_dir / "convert_ifc_to_fragments.js"
+            self.converter_version = converter_version(node_script) if node_script.exists() else None
+            # Timeouts follow the durations of earlier real (non-mock) conversions
+            self.duration_model = DurationModel(self.history, converter_version=self.converter_version)
+            self.count_entities = count_entities
+            self.logger.info(f"[HISTORY] Recording conversions in {self.history.db_path}")
+        except Exception as e:
+            self.logger.warning(f"[HISTORY_WARN] Conversion history disabled: {e}")
+        
+        # Pre-scan rejects unreadable IFC files before a converter is started
+        try:
+            from ifc_prescan import describe, prescan
+            self.prescan = prescan
+            self.describe_scan = describe
+        except ImportError as e:
+            self.logger.warning(f"[PRESCAN_WARN] IFC pre-scan disabled: {e}")
+        
+        # Distributed mode: files are claimed through lease files shared with the other hosts
+        if self.distributed:
+            sys.path.append(str(self.converter_package_dir))
+            from file_leases import LeaseDirectory
+            # Results of another converter version or batch id are converted again
+            generation = ':'.join(part for part in (self.converter_version, self.batch_id) if part) or None
+            self.leases = LeaseDirectory(self.lease_dir, source_root=self.source_dir, generation=generation)
+            self.logger.info(f"[LEASES] Distributed mode as {self.leases.owner}, leases in {self.lease_dir} "
+                             f"(generation {generation or 'unversioned'})")
+        
         # Conversion statistics
         self.stats = {
             'total_files': 0,
@@ -342,11 +868,27 @@ class ProjectIfcConverter:
             'db_failed': 0, # Primary DB
             'db_stored_secondary': 0, # Secondary DB
             'db_failed_secondary': 0, # Secondary DB (actual store failures)
+            'outbox_resumed_stored': 0, # Rows queued by earlier runs, both DBs
+            'outbox_resumed_failed': 0,
             'start_time': None,
             'end_time': None,
             'total_time': 0,
+            'converted_elsewhere': 0,
             'results': []
         }
+        self._stats_lock = threading.Lock()
+        
+        # Write-behind storage: primary and secondary databases are drained concurrently
+        storage_targets = {}
+        if self.database_enabled:
+            storage_targets['primary'] = self.db_handler
+        if self.secondary_database_enabled:
+            storage_targets['secondary'] = self.db_handler_secondary
+        self.outbox = None
+        if storage_targets:
+            self.outbox = FragmentStorageOutbox(self.log_dir / "fragment_outbox.db", storage_targets,
+                                                on_result=self._on_outbox_result)
+            self.logger.info(f"[OUTBOX] Fragment storage outbox: {self.outbox.db_path}")
     
     def setup_logging(self):
         """Configure logging for the conversion process"""
@@ -455,6 +997,72 @@ class ProjectIfcConverter:
         self.logger.info(f"📊 Total size: {total_size:.2f} MB across {len(ifc_files)} file(s)")
         return ifc_files
     
+    def _rejected_by_prescan(self, ifc_file: Path, start_time: float) -> Optional[Dict]:
+        """Failed result for a file no converter can read (truncated, not STEP, unsupported schema), else None"""
+        if not self.prescan:
+            return None
+        try:
+            # Hashed in the same pass, so the history needs no second read of the file
+            scan = self.prescan(ifc_file, sha256=True)
+        except OSError as e:
+            self.logger.warning(f"⚠️  Could not pre-scan {ifc_file.name}: {e}")
+            return None
+        self.entity_counts[ifc_file.name] = scan['entities']
+        self.content_hashes[ifc_file.name] = scan['sha256']
+        if scan['valid']:
+            self.logger.info(f"🔎 {ifc_file.name}: {self.describe_scan(scan)}")
+            return None
+        self.logger.error(f"❌ Rejected {ifc_file.name}: {self.describe_scan(scan)}")
+        return {
+            'file': ifc_file.name,
+            'status': 'failed',
+            'message': f"Invalid IFC file: {'; '.join(scan['errors'])}",
+            'conversion_time': time.time() - start_time,
+            'db_stored': False,
+            'db_stored_secondary': False
+        }
+    
+    def _entity_count(self, ifc_file: Path) -> Optional[int]:
+        """STEP entity count of a file, counted once per run"""
+        if ifc_file.name not in self.entity_counts and self.count_entities:
+            self.entity_counts[ifc_file.name] = self.count_entities(ifc_file)
+        return self.entity_counts.get(ifc_file.name)
+    
+    def order_shortest_first(self, ifc_files: List[Path]) -> List[Path]:
+        """Shortest predicted conversion first (file size until the model has history)"""
+        def expected(ifc_file: Path):
+            size = ifc_file.stat().st_size
+            seconds = None
+            if self.duration_model and self.duration_model.predict(size):
+                seconds = self.duration_model.expected_seconds(size, self._entity_count(ifc_file))
+            return (seconds is None, seconds or 0, size)
+        ordered = sorted(ifc_files, key=expected)
+        self.logger.info(f"📋 Shortest-job-first order: {', '.join(f.name for f in ordered)}")
+        return ordered
+    
+    def _conversion_timeout(self, ifc_file: Path) -> float:
+        """Timeout from the duration model's upper bound, or the former size steps"""
+        input_bytes = ifc_file.stat().st_size
+        if not self.duration_model:
+            return DEFAULT_CONVERSION_TIMEOUT
+        prediction = self.duration_model.predict(input_bytes, self._entity_count(ifc_file))
+        timeout = self.duration_model.timeout(input_bytes, self._entity_count(ifc_file))
+        if prediction:
+            self.logger.info(f"⏱️  Predicted {prediction['expected_s']}s (upper {prediction['upper_s']}s "
+                             f"from {prediction['records']} conversions), timeout {timeout}s")
+        else:
+            self.logger.info(f"⏱️  Not enough conversion history for a prediction, timeout {timeout}s")
+        return timeout
+    
+    def _log_converter_line(self, stream: str, line: str):
+        """Forward portable converter output to the log as it arrives"""
+        if not line.strip():
+            return
+        if stream == 'stderr':
+            self.logger.warning(f"   📄 {line}")
+        else:
+            self.logger.info(f"   📄 {line}")
+    
     def convert_single_file(self, ifc_file: Path) -> Dict:
         """
         Convert a single IFC file to fragments using the portable converter
@@ -470,24 +1078,47 @@ class ProjectIfcConverter:
         
         self.logger.info(f"🔄 Converting: {ifc_file.name}")
         
+        # A broken file fails here in milliseconds instead of in the converter (or as a mock fragment)
+        rejected = self._rejected_by_prescan(ifc_file, start_time)
+        if rejected:
+            return rejected
+        
         # First try the portable converter
         try:
             # Execute portable converter with correct arguments
             # Use the same Python executable that's running this script
-            # source_dir, target_dir, --single filename, --auto
+            # source_dir, target_dir, --single filename, --auto, --priority class
             cmd = [sys.executable, str(self.portable_converter), 
                    str(self.source_dir), str(self.target_dir), 
-                   '--single', ifc_file.name, '--auto']
+                   '--single', ifc_file.name, '--auto', '--priority', self.priority]
             
             # Log the command being executed for debugging
             self.logger.info(f"🔧 Executing: {' '.join(cmd)}")
             
-            # Add timeout to prevent hanging (reduced to 30 seconds for testing)
-            result = subprocess.run(cmd, 
-                                  capture_output=True, 
-                                  text=True, 
-                                  shell=False,
-                                  timeout=30)  # 30 second timeout for testing
+            # Timeout from the predicted duration to prevent hanging
+            timeout = self._conversion_timeout(ifc_file)
+            peak_memory_mb = None
+            if self.run_measured:
+                # Same as subprocess.run, plus the converter's peak memory
+                # The converter and its Node.js process run in their own process group,
+                # which is killed as a whole on timeout or Ctrl-C
+                try:
+                    result, peak_memory_mb = self.run_measured(cmd, 
+                                                               text=True, 
+                                                               shell=False,
+                                                               on_line=self._log_converter_line,
+                                                               nice=PRIORITY_NICE[self.priority],
+                                                               timeout=timeout)
+                except KeyboardInterrupt:
+                    output_file.unlink(missing_ok=True)
+                    self.logger.warning(f"🛑 Interrupted, removed partial output {output_file.name}")
+                    raise
+            else:
+                result = subprocess.run(cmd, 
+                                      capture_output=True, 
+                                      text=True, 
+                                      shell=False,
+                                      timeout=timeout)
             
             conversion_time = time.time() - start_time
             
@@ -496,19 +1127,18 @@ class ProjectIfcConverter:
                 # Check if output file was created successfully
                 if output_file.exists() and output_file.stat().st_size > 0:
                     self.logger.info(f"✅ Successfully converted: {ifc_file.name}")
-                    return self._process_successful_conversion(ifc_file, output_file, conversion_time)
+                    return self._process_successful_conversion(ifc_file, output_file, conversion_time, peak_memory_mb)
                 else:
                     raise Exception("Output file not created or is empty")
             else:
-                # Log converter output for debugging
-                if result.stdout:
-                    self.logger.info(f"📄 Converter output: {result.stdout[:200]}...")
+                # Output was logged as it arrived; the tail explains the failure
                 if result.stderr:
-                    self.logger.error(f"🚨 Converter error: {result.stderr[:200]}...")
-                raise Exception(f"Portable converter failed with code {result.returncode}: {result.stderr}")
+                    self.logger.error(f"🚨 Converter error: {result.stderr[-500:]}")
+                raise Exception(f"Portable converter failed with code {result.returncode}: {result.stderr[-500:]}")
                 
         except subprocess.TimeoutExpired:
             self.logger.warning(f"⏰ Portable converter timed out for {ifc_file.name}, trying fallback...")
+            output_file.unlink(missing_ok=True)
             # Fall back to mock conversion for testing
             return self._fallback_mock_conversion(ifc_file, output_file, start_time)
             
@@ -518,7 +1148,8 @@ class ProjectIfcConverter:
             # Fall back to mock conversion for testing
             return self._fallback_mock_conversion(ifc_file, output_file, start_time)
     
-    def _process_successful_conversion(self, ifc_file: Path, output_file: Path, conversion_time: float) -> Dict:
+    def _process_successful_conversion(self, ifc_file: Path, output_file: Path, conversion_time: float,
+                                       peak_memory_mb: Optional[float] = None) -> Dict:
         """Process a successful conversion with real fragment file"""
         # Calculate compression stats
         input_size_mb = ifc_file.stat().st_size / (1024 * 1024)
@@ -537,6 +1168,7 @@ class ProjectIfcConverter:
             'compression_ratio_percent': compression_ratio,
             'ifc_source_path': str(ifc_file),
             'converter_version': 'portable_ifc_fragments_converter',
+            'peak_memory_mb': peak_memory_mb,
             'project_name': self.project_name,
             'conversion_timestamp': datetime.now().isoformat()
         }
@@ -597,58 +1229,26 @@ class ProjectIfcConverter:
             }
     
     def _store_fragment_and_return_result(self, ifc_file: Path, output_file: Path, conversion_time: float, conversion_metadata: dict) -> Dict:
-        """Store fragment in databases and return result"""
-        # Store in primary database if enabled
-        db_stored_primary = False 
-        if self.database_enabled:
-            self.logger.info(f"💾 Storing in primary database: {output_file.name}")
-            db_stored_primary = self.db_handler.store_fragment(
-                output_file, 
-                ifc_file.name, 
-                conversion_metadata
-            )
-            
-            if db_stored_primary:
-                self.stats['db_stored'] += 1
-                self.logger.info(f"   ✅ Primary database storage successful")
-            else:
-                self.stats['db_failed'] += 1
-                self.logger.error(f"   ❌ Primary database storage failed")
-        
-        # Store in secondary database if enabled
-        db_stored_secondary = False
-        if self.secondary_database_enabled:
-            # Determine if secondary storage should be attempted
-            can_attempt_secondary = False
-            if self.database_enabled: # Primary DB is active
-                if db_stored_primary: # And primary storage was successful
-                    can_attempt_secondary = True
-                else:
-                    self.logger.warning(f"⚠️  Skipped secondary database storage for {output_file.name} (primary storage failed)")
-            else: # Primary DB is disabled, so proceed if conversion was successful (output_file exists)
-                can_attempt_secondary = True
-
-            if can_attempt_secondary:
-                self.logger.info(f"💾 Storing in secondary database: {output_file.name}")
-                db_stored_secondary = self.db_handler_secondary.store_fragment(
-                    output_file,
-                    ifc_file.name,
-                    conversion_metadata # Re-use metadata
-                )
-                if db_stored_secondary:
-                    self.stats['db_stored_secondary'] += 1
-                    self.logger.info(f"   ✅ Secondary database storage successful")
-                else:
-                    self.stats['db_failed_secondary'] += 1 # Actual failure to store in secondary
-                    self.logger.error(f"   ❌ Secondary database storage failed")
+        """Queue fragment for database storage and return result"""
+        # Writers store it in the background; db_stored flags are filled in once the outbox drains
+        outbox_ids = {}
+        if self.outbox:
+            try:
+                outbox_ids = self.outbox.enqueue(output_file, ifc_file.name, conversion_metadata)
+                self.logger.info(f"📮 Queued for database storage ({', '.join(outbox_ids)}): {output_file.name}")
+            except OSError as e:
+                self.logger.error(f"❌ Could not spool {output_file.name} for database storage: {e}")
         
         return {
             'file': ifc_file.name,
             'status': 'success',
             'message': 'Conversion successful',
             'conversion_time': conversion_time,
-            'db_stored': db_stored_primary, 
-            'db_stored_secondary': db_stored_secondary, # Add secondary status
+            'db_stored': False,
+            'db_stored_secondary': False,
+            'outbox_ids': outbox_ids,
+            'converter': conversion_metadata['converter_version'],
+            'peak_memory_mb': conversion_metadata.get('peak_memory_mb'),
             'stats': {
                 'inputSizeMB': conversion_metadata['input_size_mb'],
                 'outputSizeMB': conversion_metadata['output_size_mb'],
@@ -671,20 +1271,21 @@ class ProjectIfcConverter:
             self.logger.warning("⚠️  No IFC files found in source directory")
             return
         
+        # Small files finish first instead of waiting behind the largest model;
+        # results are still reported in discovery order
+        discovery_order = {ifc_file.name: i for i, ifc_file in enumerate(ifc_files)}
+        ifc_files = self.order_shortest_first(ifc_files)
+        
+        self.run_id = uuid.uuid4().hex
+        if self.outbox:
+            self.outbox.start()
+        
         # Process each file
         for i, ifc_file in enumerate(ifc_files, 1):
             self.logger.info(f"📂 Processing file {i}/{len(ifc_files)}: {ifc_file.name}")
             
             result = self.convert_single_file(ifc_file)
-            self.stats['results'].append(result)
-            
-            # Update counters
-            if result['status'] == 'success':
-                self.stats['successful'] += 1
-            elif result['status'] == 'failed':
-                self.stats['failed'] += 1
-            elif result['status'] == 'skipped':
-                self.stats['skipped'] += 1
+            self._add_result(ifc_file, result)
             
             # Progress update
             progress = (i / len(ifc_files)) * 100
@@ -694,8 +1295,156 @@ class ProjectIfcConverter:
         self.stats['end_time'] = datetime.now()
         self.stats['total_time'] = (self.stats['end_time'] - self.stats['start_time']).total_seconds()
         
+        if self.outbox:
+            self.finish_outbox()
+        
+        self.stats['results'].sort(key=lambda result: discovery_order.get(result['file'], len(discovery_order)))
         self.print_summary()
     
+    def _add_result(self, ifc_file: Path, result: Dict):
+        """Record a conversion result in the run statistics and the history"""
+        self.stats['results'].append(result)
+        self.record_history(ifc_file, result)
+        
+        # Update counters
+        if result['status'] == 'success':
+            self.stats['successful'] += 1
+        elif result['status'] == 'failed':
+            self.stats['failed'] += 1
+        elif result['status'] == 'skipped':
+            self.stats['skipped'] += 1
+    
+    def convert_all_files_distributed(self):
+        """
+        Convert the source directory together with the hosts sharing the lease directory
+        
+        Each file is claimed through an atomic lease file, converted while a
+        heartbeat keeps the lease alive, and its result published in the
+        lease directory. The run ends once every file has a result; files
+        leased by other hosts are waited for, so the lease of a host that
+        crashed expires and its file is converted here instead.
+        """
+        self.logger.info("🚀 Starting distributed IFC to Fragments conversion process")
+        self.stats['start_time'] = datetime.now()
+        
+        ifc_files = self.find_ifc_files()
+        if not ifc_files:
+            self.logger.warning("⚠️  No IFC files found in source directory")
+            return
+        
+        # Every host walks the same shortest-first order, claiming what is still free
+        discovery_order = {ifc_file.name: i for i, ifc_file in enumerate(ifc_files)}
+        ifc_files = self.order_shortest_first(ifc_files)
+        
+        self.run_id = uuid.uuid4().hex
+        if self.outbox:
+            self.outbox.start()
+        
+        poll_seconds = min(self.leases.ttl / 4, LEASE_POLL_SECONDS)
+        pending = self.leases.pending(ifc_files)
+        self.logger.info(f"📋 {len(pending)} of {len(ifc_files)} file(s) without a published result")
+        
+        while pending:
+            lease = None
+            for ifc_file in pending:
+                lease = self.leases.claim(ifc_file)
+                if lease:
+                    break
+            
+            if lease is None:
+                summary = self.leases.summary(pending)
+                self.logger.info(f"⏳ {summary['leased']} file(s) being converted on other hosts, "
+                                 f"checking again in {poll_seconds:.0f}s")
+                time.sleep(poll_seconds)
+            else:
+                ifc_file = lease.source
+                self.logger.info(f"🔒 Claimed {ifc_file.name} (attempt {lease.attempt})")
+                with lease:
+                    result = self.convert_single_file(ifc_file)
+                    published = self.leases.publish(lease, {
+                        key: result.get(key) for key in ('file', 'status', 'message', 'conversion_time', 'peak_memory_mb')
+                    })
+                if published:
+                    self._add_result(ifc_file, result)
+                    self.stats['total_files'] += 1
+                else:
+                    self.logger.warning(f"⚠️  Lease on {ifc_file.name} expired and was taken over; "
+                                        f"the other host's result counts")
+            
+            pending = self.leases.pending(pending)
+        
+        self.stats['converted_elsewhere'] = len(ifc_files) - self.stats['total_files']
+        self.logger.info(f"📊 All {len(ifc_files)} file(s) have a result: {self.stats['total_files']} converted here, "
+                         f"{self.stats['converted_elsewhere']} on other hosts")
+        
+        # Finalize statistics
+        self.stats['end_time'] = datetime.now()
+        self.stats['total_time'] = (self.stats['end_time'] - self.stats['start_time']).total_seconds()
+        
+        if self.outbox:
+            self.finish_outbox()
+        
+        self.stats['results'].sort(key=lambda result: discovery_order.get(result['file'], len(discovery_order)))
+        self.print_summary()
+    
+    def _on_outbox_result(self, target: str, outbox_id: int, stored: bool):
+        """Count a background storage outcome (called from the outbox writer threads)"""
+        if outbox_id <= self.outbox.resumed_max_id:
+            # Queued by an earlier run: not one of this run's successful files
+            key = 'outbox_resumed_stored' if stored else 'outbox_resumed_failed'
+        else:
+            key = {'primary': 'db_stored', 'secondary': 'db_stored_secondary'}[target]
+            if not stored:
+                key = key.replace('stored', 'failed')
+        with self._stats_lock:
+            self.stats[key] += 1
+    
+    def finish_outbox(self):
+        """Wait for pending storage, then copy outcomes into results and record the lag"""
+        pending = self.outbox.pending_count()
+        if pending:
+            self.logger.info(f"⏳ Waiting for {pending} queued database write(s)...")
+        drain_start = time.time()
+        drained = self.outbox.drain(timeout=OUTBOX_DRAIN_TIMEOUT)
+        self.outbox.stop()
+        if not drained:
+            self.logger.warning(f"⚠️  Outbox not drained after {OUTBOX_DRAIN_TIMEOUT}s; remaining fragments are stored on the next run")
+        
+        outbox_ids = [i for result in self.stats['results'] for i in result.get('outbox_ids', {}).values()]
+        statuses = self.outbox.statuses(outbox_ids)
+        for result in self.stats['results']:
+            ids = result.pop('outbox_ids', {})
+            result['db_stored'] = statuses.get(ids.get('primary')) == 'stored'
+            result['db_stored_secondary'] = statuses.get(ids.get('secondary')) == 'stored'
+        
+        self.stats['outbox'] = {
+            'drain_wait_seconds': round(time.time() - drain_start, 2),
+            'drained': drained,
+            'targets': self.outbox.lag_stats(since=self.stats['start_time'].timestamp())
+        }
+    
+    def record_history(self, ifc_file: Path, result: Dict):
+        """Append one conversion result to the history store"""
+        if not self.history:
+            return
+        output_file = self.target_dir / f"{ifc_file.stem}.frag"
+        try:
+            self.history.record(
+                'project_converter', ifc_file.name, result['status'],
+                duration_s=result.get('conversion_time'),
+                ifc_path=ifc_file,
+                output_path=output_file if result['status'] == 'success' else None,
+                peak_memory_mb=result.get('peak_memory_mb'),
+                # Mock fallbacks are recorded, but never under the real converter's version
+                converter_version=self.converter_version if result.get('converter') == 'portable_ifc_fragments_converter' else result.get('converter'),
+                run_id=self.run_id,
+                message=result.get('message'),
+                ifc_entities=self.entity_counts.get(ifc_file.name),
+                ifc_sha256=self.content_hashes.get(ifc_file.name)
+            )
+        except Exception as e:
+            self.logger.warning(f"⚠️  Could not record history for {ifc_file.name}: {e}")
+    
     def print_summary(self):
         """
         Print conversion summary and statistics
@@ -711,6 +1460,8 @@ class ProjectIfcConverter:
         self.logger.info(f"✅ Successful: {self.stats['successful']}")
         self.logger.info(f"❌ Failed: {self.stats['failed']}")
         self.logger.info(f"⏭️  Skipped: {self.stats['skipped']}")
+        if self.distributed:
+            self.logger.info(f"🌐 Converted on other hosts: {self.stats['converted_elsewhere']} (leases in {self.lease_dir})")
         
         # Database storage statistics
         if self.database_enabled:
@@ -726,7 +1477,7 @@ class ProjectIfcConverter:
 
         if self.secondary_database_enabled:
             self.logger.info(f"💾 Secondary DB Stored: {self.stats['db_stored_secondary']}")
-            self.logger.info(f"💥 Secondary DB Failed (actual store attempts): {self.stats['db_failed_secondary']}")
+            self.logger.info(f"💥 Secondary DB Failed (after retries): {self.stats['db_failed_secondary']}")
             
             db_stats_secondary = self.db_handler_secondary.get_storage_stats()
             if db_stats_secondary:
@@ -734,6 +1485,20 @@ class ProjectIfcConverter:
                 self.logger.info(f"📈 Total Fragments in Secondary DB: {db_stats_secondary.get('total_fragments', 0)}")
                 self.logger.info(f"💾 Total Secondary DB Storage: {total_size_mb_secondary:.2f} MB")
         
+        # Write-behind outbox lag
+        outbox_stats = self.stats.get('outbox')
+        if outbox_stats:
+            self.logger.info(f"📮 Outbox drain wait after conversions: {outbox_stats['drain_wait_seconds']:.2f} seconds")
+            if self.stats['outbox_resumed_stored'] or self.stats['outbox_resumed_failed']:
+                self.logger.info(f"📮 Resumed from previous runs: {self.stats['outbox_resumed_stored']} stored, "
+                                 f"{self.stats['outbox_resumed_failed']} failed")
+            for target, lag in outbox_stats['targets'].items():
+                avg_lag = f"{lag['avg_lag_seconds']:.2f}s" if lag['avg_lag_seconds'] is not None else "n/a"
+                max_lag = f"{lag['max_lag_seconds']:.2f}s" if lag['max_lag_seconds'] is not None else "n/a"
+                self.logger.info(f"📮 Outbox {target}: lag avg {avg_lag} / max {max_lag}, pending {lag['pending']}, failed {lag['failed']}")
+                if lag['pending']:
+                    self.logger.info(f"   ⏳ Oldest pending fragment queued {lag['oldest_pending_seconds']:.0f}s ago")
+        
         if self.stats['successful'] > 0:
             success_rate = (self.stats['successful'] / self.stats['total_files']) * 100
             self.logger.info(f"🎯 Success Rate: {success_rate:.1f}%")
@@ -742,19 +1507,10 @@ class ProjectIfcConverter:
                 db_success_rate_primary = (self.stats['db_stored'] / self.stats['successful']) * 100
                 self.logger.info(f"💾 Primary DB Storage Rate (of successful files): {db_success_rate_primary:.1f}%")
 
-            if self.secondary_database_enabled and self.stats['successful'] > 0 :
-                # Calculate rate based on files eligible for secondary storage attempt
-                eligible_for_secondary_attempt = 0
-                if self.database_enabled: # If primary DB is on, secondary is only attempted if primary stored
-                    eligible_for_secondary_attempt = self.stats['db_stored'] 
-                else: # If primary DB is off, secondary is attempted for all successful conversions
-                    eligible_for_secondary_attempt = self.stats['successful']
-
-                if eligible_for_secondary_attempt > 0:
-                    db_success_rate_secondary = (self.stats['db_stored_secondary'] / eligible_for_secondary_attempt) * 100
-                    self.logger.info(f"💾 Secondary DB Storage Rate (of eligible files): {db_success_rate_secondary:.1f}%")
-                elif self.stats['db_stored_secondary'] == 0 and self.stats['successful'] > 0 :
-                     self.logger.info(f"💾 Secondary DB Storage Rate: 0.0% (No files stored, or none eligible for secondary attempt)")
+            if self.secondary_database_enabled:
+                # Secondary storage is queued for every successful conversion, independently of the primary
+                db_success_rate_secondary = (self.stats['db_stored_secondary'] / self.stats['successful']) * 100
+                self.logger.info(f"💾 Secondary DB Storage Rate (of successful files): {db_success_rate_secondary:.1f}%")
 
         # Detailed results
         if self.stats['results']:
@@ -769,19 +1525,9 @@ class ProjectIfcConverter:
                 
                 db_info_secondary = ""
                 if self.secondary_database_enabled:
-                    # Determine if secondary storage was attempted for this specific result
-                    attempted_secondary_in_result = False
-                    if result['status'] == 'success': # Conversion must be successful to attempt any DB storage
-                        if self.database_enabled: # Primary DB was active
-                            if result.get('db_stored', False): # And primary DB storage was successful for this file
-                                attempted_secondary_in_result = True
-                        else: # Primary DB was disabled, so secondary would have been attempted if conversion was successful
-                            attempted_secondary_in_result = True
-                    
-                    if attempted_secondary_in_result:
+                    if result['status'] == 'success': # Conversion must be successful to queue any DB storage
                         db_info_secondary = " [DB2:✅]" if result.get('db_stored_secondary', False) else " [DB2:❌]"
                     else:
-                        # Not attempted (e.g., conversion failed, or primary DB enabled & failed to store, or secondary DB disabled)
                         db_info_secondary = " [DB2:➖]" 
                 
                 self.logger.info(f"   {status_icon} {result['file']}{time_info}{db_info_primary}{db_info_secondary}")
@@ -795,27 +1541,22 @@ class ProjectIfcConverter:
     
     def save_report(self):
         """
-        Save detailed conversion report to JSON file in the logs directory
+        Record the run summary in the conversion history store
         """
-        # log_dir is now defined in __init__ and created there
-        report_file = self.log_dir / f"conversion_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        
-        report_data = {
-            'conversion_summary': self.stats,
-            'environment': {
-                'source_directory': str(self.source_dir),
-                'target_directory': str(self.target_dir),
-                'script_directory': str(self.script_dir),
-                'converter_package': str(self.converter_package_dir)
-            },
-            'timestamp': datetime.now().isoformat()
+        environment = {
+            'source_directory': str(self.source_dir),
+            'target_directory': str(self.target_dir),
+            'script_directory': str(self.script_dir),
+            'converter_package': str(self.converter_package_dir)
         }
         
+        if not self.history:
+            self.logger.warning("⚠️  Conversion history disabled, run summary not saved")
+            return
+        
         try:
-            with open(report_file, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, indent=2, default=str)
-            
-            self.logger.info(f"📄 Detailed report saved: {report_file}")
+            self.history.record_run('project_converter', self.stats, environment, self.run_id)
+            self.logger.info(f"📄 Run {self.run_id} recorded in {self.history.db_path}")
         except Exception as e:
             self.logger.warning(f"⚠️  Could not save report: {e}")
     
@@ -836,7 +1577,10 @@ class ProjectIfcConverter:
                 return False
             
             # Start conversion process
-            self.convert_all_files()
+            if self.distributed:
+                self.convert_all_files_distributed()
+            else:
+                self.convert_all_files()
             return True
             
         except KeyboardInterrupt:
@@ -845,12 +1589,33 @@ class ProjectIfcConverter:
         except Exception as e:
             self.logger.error(f"❌ Unexpected error: {e}")
             return False
+        finally:
+            CONNECTION_POOLS.close_all()
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
 
 def main():
     """
     Main entry point
     """
-    converter = ProjectIfcConverter()
+    parser = argparse.ArgumentParser(description='Convert the project IFC files to fragments')
+    parser.add_argument('--priority', choices=list(PRIORITY_NICE), default='batch',
+                        help='Priority class; batch runs the converter at a lower CPU priority (default: batch)')
+    parser.add_argument('--distributed', action='store_true',
+                        help='Share the batch with converters on other hosts through lease files')
+    parser.add_argument('--lease-dir',
+                        help=f'Shared lease directory for --distributed (default: <target dir>/{DEFAULT_LEASE_DIR_NAME})')
+    parser.add_argument('--batch-id',
+                        help='Label of this --distributed batch; results published by a batch with another '
+                             'label (or converter version) are converted again. Use the same label on every host')
+    args = parser.parse_args()
+    
+    # SIGTERM takes the Ctrl-C path, so the running conversion's process tree is killed
+    signal.signal(signal.SIGTERM, _interrupt)
+    
+    converter = ProjectIfcConverter(priority=args.priority, distributed=args.distributed, lease_dir=args.lease_dir,
+                                    batch_id=args.batch_id)
     success = converter.run()
     sys.exit(0 if success else 1)
 
@@ -7,17 +7,44 @@ Simple Flask API server to serve converted fragment files to the frontend.
 """
 
 import os
+import sys
 import json
+import time
+import atexit
+import functools
+import signal
 import subprocess
-import tempfile
 import logging
 from pathlib import Path
 from datetime import datetime
-from flask import Flask, jsonify, send_file, request
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 
+from converter_pool import ConverterWorkerPool
+from job_manager import JobManager, BATCH, BATCH_NICE, INTERACTIVE, PRIORITY_CLASSES, current_cancel_event
+from memory_scheduler import AdmissionCancelled, MemoryBudgetScheduler, node_memory_plan
+from conversion_cache import ConversionCache, converter_version
+from upload_staging import StreamingUploadRequest, remove_staged_file
+from upload_sessions import UploadSessionManager, UploadSessionError
+from fragment_serving import send_fragment
+from file_catalog import FileCatalog
+from resource_monitor import run_monitored, describe_usage
+from metrics import init_metrics, observe_queue_wait, register_gauge, track_conversion
+
+# Shared stdlib helpers that ship with the portable frag_convert package
+sys.path.append(str(Path(__file__).parent.parent / "frag_convert"))
+from conversion_history import ConversionHistory
+from duration_model import DurationModel, bounded_timeout, default_timeout
+from ifc_prescan import describe, prescan
+from output_capture import ConversionCancelled
+
+# Raised inside a conversion once its job is cancelled (DELETE /api/jobs/<id>)
+CANCELLED_ERRORS = (ConversionCancelled, AdmissionCancelled)
+
 app = Flask(__name__)
+# Uploads are hashed and written to their staging directory while the body is parsed
+app.request_class = StreamingUploadRequest
 CORS(app)
 
 @app.before_request
@@ -30,6 +57,14 @@ BACKEND_DIR = Path(__file__).parent
 PROJECT_ROOT = BACKEND_DIR.parent
 FRAGMENTS_DIR = PROJECT_ROOT / "data" / "fragments"
 IFC_DIR = PROJECT_ROOT / "data" / "ifc"
+JOBS_DIR = PROJECT_ROOT / "data" / "jobs"
+CACHE_DIR = Path(os.getenv("QGEN_IMPFRAG_CACHE_DIR", PROJECT_ROOT / "data" / "cache"))
+UPLOAD_STAGING_DIR = PROJECT_ROOT / "data" / "uploads"
+UPLOAD_SESSIONS_DIR = PROJECT_ROOT / "data" / "upload_sessions"
+MAX_FILE_SIZE_MB = int(os.getenv("QGEN_IMPFRAG_MAX_FILE_SIZE_MB", "500"))
+# Chunked uploads are meant for the multi-GB models a single POST cannot carry
+MAX_CHUNKED_UPLOAD_MB = int(os.getenv("QGEN_IMPFRAG_MAX_CHUNKED_UPLOAD_MB", "5120"))
+UPLOAD_CHUNK_MB = int(os.getenv("QGEN_IMPFRAG_UPLOAD_CHUNK_MB", "8"))
 CONVERTER_SCRIPT = BACKEND_DIR / "ifc_converter.js"
 
 # Debug logging
@@ -44,6 +79,83 @@ print(f"📄 Actual IFC files found: {list(IFC_DIR.glob('*.ifc'))}")
 # Ensure directories exist
 FRAGMENTS_DIR.mkdir(parents=True, exist_ok=True)
 IFC_DIR.mkdir(parents=True, exist_ok=True)
+UPLOAD_STAGING_DIR.mkdir(parents=True, exist_ok=True)
+
+# Upload limits: per-file bytes are enforced while streaming, the request
+# length (file plus multipart overhead) is rejected up front
+app.config["UPLOAD_STAGING_DIR"] = UPLOAD_STAGING_DIR
+app.config["MAX_UPLOAD_BYTES"] = MAX_FILE_SIZE_MB * 1024 * 1024
+app.config["MAX_CONTENT_LENGTH"] = (MAX_FILE_SIZE_MB + 1) * 1024 * 1024
+print(f"📏 Max upload size: {MAX_FILE_SIZE_MB} MB ({MAX_CHUNKED_UPLOAD_MB} MB chunked)")
+
+# Resumable chunked uploads assemble into the same staging directory
+upload_sessions = UploadSessionManager(
+    UPLOAD_SESSIONS_DIR, UPLOAD_STAGING_DIR,
+    max_bytes=MAX_CHUNKED_UPLOAD_MB * 1024 * 1024,
+    chunk_size=UPLOAD_CHUNK_MB * 1024 * 1024
+)
+
+@app.teardown_request
+def discard_unclaimed_uploads(exc):
+    request.discard_unclaimed_uploads()
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify({
+        "success": False,
+        "error": f"File exceeds the {MAX_FILE_SIZE_MB} MB upload limit"
+    }), 413
+
+# Warm Node.js converter workers for small files (QGEN_IMPFRAG_POOL_SIZE=0 disables)
+converter_pool = ConverterWorkerPool.from_env()
+if converter_pool:
+    print(f"♻️  Converter pool: {converter_pool.size} workers for files <= {converter_pool.max_file_mb} MB")
+    atexit.register(converter_pool.shutdown)
+
+# Identical IFC content is converted once and served from the cache afterwards
+conversion_cache = ConversionCache(CACHE_DIR, max_size_mb=int(os.getenv("QGEN_IMPFRAG_CACHE_MAX_MB", "10240")))
+NODE_CONVERTER_VERSION = converter_version(CONVERTER_SCRIPT)
+FRAG_CONVERT_VERSION = converter_version(PROJECT_ROOT / "frag_convert" / "convert_ifc_to_fragments.js")
+print(f"🗄️  Conversion cache: {CACHE_DIR} ({conversion_cache.summary()['entries']} entries)")
+
+# Every conversion is appended to the SQLite history (percentiles via /api/history/stats)
+conversion_history = ConversionHistory(os.getenv("QGEN_IMPFRAG_HISTORY_DB") or PROJECT_ROOT / "data" / "conversion_history.db")
+print(f"📜 Conversion history: {conversion_history.db_path}")
+
+# Timeouts and queue ETAs come from durations predicted on that history
+duration_model = DurationModel(conversion_history)
+CONVERTER_SOURCES = {
+    "convert": ["backend_node", "processor_node"],
+    "convert-subprocess": ["backend_frag_convert"]
+}
+
+# Admission control keeps concurrent conversions inside the memory budget
+memory_scheduler = MemoryBudgetScheduler()
+print(f"🧠 Conversion memory budget: {memory_scheduler.budget_mb} MB")
+
+# Directory listings are served from memory and kept current by filesystem events
+file_catalog = FileCatalog(IFC_DIR, FRAGMENTS_DIR)
+file_catalog.start()
+atexit.register(file_catalog.stop)
+print(f"🗂️  File catalog: {file_catalog.counts()}")
+
+# Conversions run on a bounded worker pool (shortest job first within priority
+# classes, with aging); requests only queue them
+job_manager = JobManager(JOBS_DIR, max_workers=int(os.getenv("QGEN_IMPFRAG_JOB_WORKERS", "2")),
+                         on_dispatch=observe_queue_wait)
+
+# Prometheus /metrics: request latency, conversions, bytes served and queue depths
+init_metrics(app)
+register_gauge("xsba_jobs", "Conversion jobs by state", job_manager.counts)
+register_gauge("xsba_jobs_waiting", "Queued conversion jobs by priority class",
+               lambda: {priority: stats["waiting"] for priority, stats in job_manager.wait_stats().items()},
+               label="priority")
+register_gauge("xsba_memory_admission_queued", "Conversions waiting for memory admission",
+               lambda: memory_scheduler.snapshot()["queued"])
+register_gauge("xsba_memory_reserved_mb", "Memory reserved by running conversions",
+               lambda: memory_scheduler.snapshot()["reserved_mb"])
+print(f"🧵 Conversion job workers: {job_manager.max_workers}")
+atexit.register(job_manager.shutdown)
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -63,7 +175,7 @@ def test_subprocess():
 @app.route('/debug/paths', methods=['GET'])
 def debug_paths():
     """Debug endpoint to show exactly where backend is looking"""
-    fragments_files = list(FRAGMENTS_DIR.glob("*.frag"))
+    fragments_files = [FRAGMENTS_DIR / name for name in file_catalog.fragment_names()]
     return jsonify({
         "working_directory": str(Path.cwd()),
         "fragments_dir": str(FRAGMENTS_DIR),
@@ -72,83 +184,160 @@ def debug_paths():
         "ifc_dir_exists": IFC_DIR.exists(),
         "converter_script": str(CONVERTER_SCRIPT),
         "fragments_found": [str(f) for f in fragments_files],
-        "fragments_count": len(fragments_files)
+        "fragments_count": len(fragments_files),
+        "catalog_version": file_catalog.version
     })
 
+def _listing_query():
+    """Pagination, sorting and filtering parameters for catalog listings"""
+    per_page = request.args.get('per_page', type=int)
+    return {
+        "search": request.args.get('q'),
+        "sort": request.args.get('sort', 'name'),
+        "order": request.args.get('order', 'asc'),
+        "page": request.args.get('page', 1, type=int),
+        "per_page": min(per_page, 1000) if per_page else None
+    }
+
+def _catalog_response(key, listing):
+    """Listing response tagged with the catalog version (304 if the client has it)"""
+    if request.if_none_match.contains(file_catalog.etag):
+        return "", 304, {'ETag': f'"{file_catalog.etag}"'}
+    
+    response = jsonify({key: listing.pop("items"), **listing})
+    response.set_etag(file_catalog.etag_for(listing['version']))
+    response.cache_control.no_cache = True
+    return response
+
 @app.route('/api/fragments', methods=['GET'])
 def list_fragments():
-    """List available fragment files"""
-    fragments = []
-    
-    for frag_file in FRAGMENTS_DIR.glob("*.frag"):
-        stat = frag_file.stat()
-        fragments.append({
-            "filename": frag_file.name,
-            "size_mb": round(stat.st_size / (1024 * 1024), 2),
-            "created": datetime.fromtimestamp(stat.st_ctime).isoformat(),
-            "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-            "url": f"/api/fragments/{frag_file.name}"
-        })
-    
-    return jsonify({
-        "fragments": fragments,
-        "count": len(fragments),
-        "total_size_mb": round(sum(f["size_mb"] for f in fragments), 2)
-    })
+    """List available fragment files (?q=&sort=name|size|modified&order=&page=&per_page=)"""
+    return _catalog_response("fragments", file_catalog.list_fragments(**_listing_query()))
 
 @app.route('/api/fragments/<filename>', methods=['GET'])
 def serve_fragment(filename):
-    """Serve a fragment file"""
-    fragment_file = FRAGMENTS_DIR / filename
+    """Serve a fragment file (ETag/conditional GET and byte ranges)"""
+    fragment_file = FRAGMENTS_DIR / Path(filename).name
     
     if not fragment_file.exists():
         return jsonify({"error": f"Fragment file not found: {filename}"}), 404
     
-    return send_file(fragment_file, as_attachment=False, mimetype='application/octet-stream')
+    return send_fragment(fragment_file)
 
 @app.route('/api/ifc', methods=['GET'])
 def list_ifc_files():
-    """List available IFC files and their conversion status"""
-    files = []
-    
-    for ifc_file in IFC_DIR.glob("*.ifc"):
-        # Look for corresponding fragment file
-        fragment_name = f"{ifc_file.stem.replace(' ', '_').replace('(', '').replace(')', '')}.frag"
-        fragment_file = FRAGMENTS_DIR / fragment_name
-        
-        stat = ifc_file.stat()
-        files.append({
-            "filename": ifc_file.name,
-            "size_mb": round(stat.st_size / (1024 * 1024), 2),
-            "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-            "has_fragments": fragment_file.exists(),
-            "fragment_file": fragment_name if fragment_file.exists() else None,
-            "fragment_size_mb": round(fragment_file.stat().st_size / (1024 * 1024), 2) if fragment_file.exists() else None
-        })
-    
-    return jsonify({
-        "ifc_files": files,
-        "count": len(files),
-        "total_size_mb": round(sum(f["size_mb"] for f in files), 2)
-    })
+    """List available IFC files and their conversion status (listing params as /api/fragments, plus ?has_fragments=)"""
+    has_fragments = request.args.get('has_fragments')
+    if has_fragments is not None:
+        has_fragments = has_fragments.lower() in ('1', 'true', 'yes')
+    return _catalog_response("ifc_files", file_catalog.list_ifc_files(has_fragments=has_fragments, **_listing_query()))
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get overall system status"""
-    ifc_count = len(list(IFC_DIR.glob("*.ifc")))
-    fragment_count = len(list(FRAGMENTS_DIR.glob("*.frag")))
+    counts = file_catalog.counts()
     
     return jsonify({
         "status": "running",
-        "ifc_files": ifc_count,
-        "fragment_files": fragment_count,
-        "conversion_complete": fragment_count > 0,
+        "ifc_files": counts["ifc_files"],
+        "fragment_files": counts["fragment_files"],
+        "conversion_complete": counts["fragment_files"] > 0,
+        "catalog_version": file_catalog.version,
+        "jobs": job_manager.counts(),
+        "queue": job_manager.wait_stats(),
+        "memory": memory_scheduler.snapshot(),
+        "cache": conversion_cache.summary(),
         "timestamp": datetime.now().isoformat()
     })
 
+def _job_accepted(job):
+    """202 response pointing the client at the job status endpoint"""
+    response = jsonify({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}",
+        "message": f"Conversion of {job.filename} queued"
+    })
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response, 202
+
+def _remove_file(path):
+    """Remove a staged upload if it still exists"""
+    remove_staged_file(path)
+
+def _cancelled_result(*output_paths):
+    """Result of a cancelled conversion; its converter is gone, so partial outputs are removed"""
+    for output_path in output_paths:
+        Path(output_path).unlink(missing_ok=True)
+    print(f"🛑 Conversion cancelled, removed partial output {Path(output_paths[0]).name}")
+    return {
+        "success": False,
+        "cancelled": True,
+        "error": "Conversion cancelled"
+    }
+
+@functools.lru_cache(maxsize=64)
+def _ifc_scan(temp_ifc_path):
+    """Pre-scan of a staged upload (schema, entity counts, truncation; scanned once per path)"""
+    try:
+        return prescan(Path(temp_ifc_path))
+    except OSError:
+        return None
+
+def _ifc_entities(temp_ifc_path):
+    """STEP entity count of a staged upload"""
+    scan = _ifc_scan(temp_ifc_path)
+    return scan["entities"] if scan else None
+
+def _rejected_upload(temp_ifc_path, filename):
+    """422 response for a staged upload no converter can read (removing it), or None"""
+    scan = _ifc_scan(temp_ifc_path)
+    if scan is None or scan["valid"]:
+        if scan:
+            print(f"🔎 {filename}: {describe(scan)}")
+        return None
+    print(f"❌ Rejected {filename}: {describe(scan)}")
+    _remove_file(temp_ifc_path)
+    return jsonify({
+        "success": False,
+        "error": f"Invalid IFC file: {'; '.join(scan['errors'])}",
+        "errors": scan["errors"],
+        "schema": scan["schema"],
+        "entities": scan["entities"]
+    }), 422
+
+def _request_priority(value):
+    """Priority class of a conversion request; interactive unless the caller says batch"""
+    priority = (value or INTERACTIVE).lower()
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"priority must be one of {', '.join(PRIORITY_CLASSES)}")
+    return priority
+
+def _expected_seconds(kind, size):
+    """Predicted run time of a queued conversion (None until the history allows a fit)"""
+    return duration_model.expected_seconds(size, sources=CONVERTER_SOURCES[kind])
+
+def _conversion_timeout(kind, temp_ifc_path, default):
+    """Timeout from the duration model's upper bound, or `default` without enough history"""
+    size = Path(temp_ifc_path).stat().st_size
+    prediction = duration_model.predict(size, _ifc_entities(temp_ifc_path), CONVERTER_SOURCES[kind])
+    if prediction is None:
+        print(f"⏱️  Not enough {kind} history for a duration model, using {default}s timeout")
+        return default
+    timeout = bounded_timeout(prediction["upper_s"])
+    print(f"⏱️  Predicted {prediction['expected_s']}s (p{prediction['confidence'] * 100:g} "
+          f"{prediction['upper_s']}s from {prediction['records']} conversions), {timeout}s timeout")
+    return timeout
+
+def _print_converter_line(stream, line):
+    """Echo converter output as it arrives (only the tail is kept in memory)"""
+    if line.strip():
+        print(f"{'📤' if stream == 'stdout' else '📥'} {line}")
+
 @app.route('/api/convert', methods=['POST'])
 def convert_ifc():
-    """Convert uploaded IFC file to fragments in memory"""
+    """Queue uploaded IFC file for conversion to fragments"""
     if 'file' not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
     
@@ -160,50 +349,172 @@ def convert_ifc():
         return jsonify({"error": "File must be an IFC file"}), 400
     
     try:
-        # Create temporary file for IFC data
-        with tempfile.NamedTemporaryFile(suffix='.ifc', delete=False) as temp_ifc:
-            file.save(temp_ifc.name)
-            temp_ifc_path = temp_ifc.name
+        priority = _request_priority(request.form.get('priority'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        # The upload was streamed to its staging file (and hashed) while parsing
+        upload = file.stream.claim()
+        temp_ifc_path = str(upload.path)
+        print(f"📄 Staged upload: {temp_ifc_path} ({upload.size} bytes, sha256 {upload.sha256[:12]})")
+        
+        # Truncated / non-STEP / unsupported schema files fail here, not in the converter
+        rejected = _rejected_upload(temp_ifc_path, file.filename)
+        if rejected:
+            return rejected
         
         # Generate output filename (sanitized)
         base_name = secure_filename(file.filename)
         base_name = base_name.replace('.ifc', '').replace(' ', '_')
         output_filename = f"{base_name}.frag"
-        output_path = FRAGMENTS_DIR / output_filename
         
+        job = job_manager.submit(
+            "convert", file.filename, run_conversion,
+            temp_ifc_path, file.filename, output_filename, upload.sha256, priority,
+            on_cancel=lambda: _remove_file(temp_ifc_path),
+            expected_seconds=_expected_seconds("convert", upload.size),
+            priority=priority, input_bytes=upload.size
+        )
+        print(f"📥 Queued {priority} conversion job {job.id}: {file.filename} -> {output_filename}")
+        return _job_accepted(job)
+            
+    except Exception as e:
+        # Clean up temp file if it exists
+        if 'temp_ifc_path' in locals():
+            _remove_file(temp_ifc_path)
+        return jsonify({
+            "success": False,
+            "error": f"Server error: {str(e)}"
+        }), 500
+
+def run_conversion(temp_ifc_path, original_filename, output_filename, content_hash=None, priority=INTERACTIVE):
+    """Convert a staged IFC file, reusing the cached fragment for identical content (runs on the job executor)"""
+    try:
+        cache_key = conversion_cache.key_for(Path(temp_ifc_path), NODE_CONVERTER_VERSION,
+                                             {"converter": CONVERTER_SCRIPT.name}, content_hash)
+        # Measured up front: the converter removes the staged file before the history row is written
+        input_bytes, ifc_entities = Path(temp_ifc_path).stat().st_size, _ifc_entities(temp_ifc_path)
+        started = time.time()
+        outcome = conversion_cache.get_or_convert(
+            cache_key, FRAGMENTS_DIR / output_filename,
+            lambda: _tracked_conversion("node", temp_ifc_path, _convert_with_node,
+                                        temp_ifc_path, original_filename, output_filename,
+                                        BATCH_NICE if priority == BATCH else 0),
+            source_name=original_filename
+        )
+        _record_conversion("backend_node", original_filename, output_filename, outcome,
+                           time.time() - started, NODE_CONVERTER_VERSION, content_hash,
+                           input_bytes, ifc_entities)
+        return _cached_conversion_result(outcome, original_filename, output_filename)
+    finally:
+        _remove_file(temp_ifc_path)
+
+def _tracked_conversion(converter, temp_ifc_path, convert, *args):
+    """Run a converter function under the conversion metrics"""
+    with track_conversion(converter, Path(temp_ifc_path).stat().st_size) as conversion:
+        result = convert(*args)
+        conversion.result(result)
+    return result
+
+def _record_conversion(source, original_filename, output_filename, outcome, duration, version,
+                       content_hash=None, input_bytes=None, ifc_entities=None):
+    """Append a conversion that actually ran (cache misses) to the history"""
+    if outcome["cache"] != "miss":
+        return
+    try:
+        if outcome["success"]:
+            status = "success"
+        else:
+            status = "cancelled" if (outcome["result"] or {}).get("cancelled") else "failed"
+        conversion_history.record(
+            source, original_filename, status,
+            duration_s=round(duration, 3),
+            ifc_sha256=content_hash,
+            input_bytes=input_bytes,
+            output_path=FRAGMENTS_DIR / output_filename if outcome["success"] else None,
+            peak_memory_mb=((outcome["result"] or {}).get("resources") or {}).get("peak_rss_mb"),
+            converter_version=version,
+            message=outcome["error"],
+            ifc_entities=ifc_entities
+        )
+    except Exception as e:
+        print(f"⚠️  Could not record conversion history: {e}")
+
+def _cached_conversion_result(outcome, original_filename, output_filename, **extra):
+    """Response body for a conversion that went through the conversion cache"""
+    if outcome["cache"] == "miss" and outcome["result"] is not None:
+        return {**outcome["result"], "cache": "miss"}
+    
+    if not outcome["success"]:
+        return {
+            "success": False,
+            "error": f"Conversion failed: {outcome['error']}",
+            "cache": outcome["cache"]
+        }
+    
+    stat = (FRAGMENTS_DIR / output_filename).stat()
+    return {
+        "success": True,
+        "message": f"Successfully converted {original_filename} (cached result)",
+        "output_file": output_filename,
+        "size_mb": round(stat.st_size / (1024 * 1024), 2),
+        "conversion_time": "cached",
+        "cache": outcome["cache"],
+        **extra
+    }
+
+def _convert_with_node(temp_ifc_path, original_filename, output_filename, nice=0):
+    """Convert a staged IFC file with ifc_converter.js (`nice` lowers its CPU priority)"""
+    output_path = FRAGMENTS_DIR / output_filename
+    cancel_event = current_cancel_event()
+    
+    try:
         # Check file size for memory optimization
         temp_file_size = Path(temp_ifc_path).stat().st_size
         file_size_mb = temp_file_size / (1024 * 1024)
         
-        # Build command with memory optimization for large files
-        if file_size_mb > 50:  # Large files > 50MB
-            cmd = [
-                'node', '--max-old-space-size=8192', '--max-semi-space-size=1024', '--expose-gc',
-                str(CONVERTER_SCRIPT),
-                '--input', temp_ifc_path,
-                '--output', str(output_path)
-            ]
-            timeout = 3600  # 1 hour for very large files
-            print(f"📏 Large file ({file_size_mb:.1f} MB): Using Node.js memory optimization + 1 hour timeout")
-        elif file_size_mb > 20:  # Medium files > 20MB
-            cmd = [
-                'node', '--max-old-space-size=4096', '--expose-gc',
-                str(CONVERTER_SCRIPT),
-                '--input', temp_ifc_path,
-                '--output', str(output_path)
-            ]
-            timeout = 1800  # 30 minutes for medium files
-            print(f"📏 Medium file ({file_size_mb:.1f} MB): Using moderate memory boost + 30 minute timeout")
-        else:  # Small files
-            cmd = [
-                'node', str(CONVERTER_SCRIPT),
-                '--input', temp_ifc_path,
-                '--output', str(output_path)
-            ]
-            timeout = 600   # 10 minutes for small files
-            print(f"📏 Small file ({file_size_mb:.1f} MB): Using default memory + 10 minute timeout")
+        # Size tiers feed the memory estimate used for admission
+        plan = node_memory_plan(file_size_mb)
+        timeout = _conversion_timeout("convert", temp_ifc_path, plan["timeout"])
+        
+        # Small files run on a warm worker instead of a fresh Node.js process
+        if converter_pool and file_size_mb <= converter_pool.max_file_mb:
+            print(f"♻️  Small file ({file_size_mb:.1f} MB): Using warm converter pool")
+            print(f"🔄 Converting: {original_filename} -> {output_filename}")
+            with memory_scheduler.admit(plan["estimated_peak_mb"], original_filename, cancel_event):
+                pool_result = converter_pool.convert(temp_ifc_path, str(output_path), timeout=timeout,
+                                                     cancel_event=cancel_event)
+            
+            print(f"📊 Resources: {describe_usage(pool_result.get('resources'))}")
+            if pool_result.get("cancelled"):
+                return _cancelled_result(output_path)
+            if pool_result["success"]:
+                return {
+                    "success": True,
+                    "message": f"Successfully converted {original_filename}",
+                    "output_file": output_filename,
+                    "size_mb": pool_result["file_size_mb"],
+                    "conversion_time": f"{pool_result['conversion_time']:.1f}s",
+                    "resources": pool_result.get("resources")
+                }
+            print(f"❌ Conversion error: {pool_result['error']}")
+            return {
+                "success": False,
+                "error": f"Conversion failed: {pool_result['error']}",
+                "resources": pool_result.get("resources")
+            }
+        
+        cmd = [
+            'node', *plan["node_options"],
+            str(CONVERTER_SCRIPT),
+            '--input', temp_ifc_path,
+            '--output', str(output_path)
+        ]
+        print(f"📏 File size {file_size_mb:.1f} MB: heap limit {plan['heap_limit_mb']} MB, "
+              f"estimated peak {plan['estimated_peak_mb']} MB, {timeout/60:.0f} minute timeout")
         
-        print(f"🔄 Converting: {file.filename} -> {output_filename}")
+        print(f"🔄 Converting: {original_filename} -> {output_filename}")
         print(f"📄 Command: {' '.join(cmd)}")
         print(f"📁 Working directory: {Path(__file__).parent}")
         print(f"🔧 Converter script exists: {CONVERTER_SCRIPT.exists()}")
@@ -218,70 +529,74 @@ def convert_ifc():
             print(f"❌ Node.js not found: {node_error}")
         
         # Try with UTF-8 encoding and timeout handling
+        resources = None
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, 
-                                   cwd=Path(__file__).parent, encoding='utf-8', errors='replace',
-                                   timeout=timeout)
+            with memory_scheduler.admit(plan["estimated_peak_mb"], original_filename, cancel_event):
+                result, resources = run_monitored(cmd, text=True, on_line=_print_converter_line, nice=nice,
+                                                  cwd=Path(__file__).parent, encoding='utf-8', errors='replace',
+                                                  timeout=timeout, cancel_event=cancel_event)
         except subprocess.TimeoutExpired:
-            # Clean up temp file
-            os.unlink(temp_ifc_path)
-            return jsonify({
+            output_path.unlink(missing_ok=True)
+            return {
                 "success": False,
                 "error": f"Conversion timed out after {timeout/60:.1f} minutes"
-            }), 500
+            }
+        except CANCELLED_ERRORS:
+            return _cancelled_result(output_path)
         except Exception as encoding_error:
             print(f"🔄 Encoding error, trying without capture: {encoding_error}")
             # Fallback: run without capturing output to see errors directly
             try:
-                result = subprocess.run(cmd, cwd=Path(__file__).parent, timeout=timeout)
+                with memory_scheduler.admit(plan["estimated_peak_mb"], original_filename, cancel_event):
+                    result, resources = run_monitored(cmd, cwd=Path(__file__).parent, timeout=timeout, nice=nice,
+                                                      cancel_event=cancel_event)
                 result.stdout = "No output captured"
                 result.stderr = "No stderr captured"
+            except CANCELLED_ERRORS:
+                return _cancelled_result(output_path)
             except subprocess.TimeoutExpired:
-                # Clean up temp file
-                os.unlink(temp_ifc_path)
-                return jsonify({
+                output_path.unlink(missing_ok=True)
+                return {
                     "success": False,
                     "error": f"Conversion timed out after {timeout/60:.1f} minutes"
-                }), 500
+                }
         
         print(f"📤 Return code: {result.returncode}")
-        print(f"📤 STDOUT: {result.stdout}")
-        print(f"📤 STDERR: {result.stderr}")
         print(f"📁 Output file exists after conversion: {output_path.exists()}")
-        
-        # Clean up temporary file
-        os.unlink(temp_ifc_path)
+        print(f"📊 Resources: {describe_usage(resources)} (heap limit {plan['heap_limit_mb']} MB)")
         
         if result.returncode == 0 and output_path.exists():
             # Get file stats
             stat = output_path.stat()
-            return jsonify({
+            return {
                 "success": True,
-                "message": f"Successfully converted {file.filename}",
+                "message": f"Successfully converted {original_filename}",
                 "output_file": output_filename,
                 "size_mb": round(stat.st_size / (1024 * 1024), 2),
-                "conversion_time": "< 1 minute"
-            })
+                "conversion_time": f"{resources['duration_s']:.1f}s" if resources else "< 1 minute",
+                "heap_limit_mb": plan["heap_limit_mb"],
+                "resources": resources
+            }
         else:
-            error_msg = result.stderr if result.stderr else "Conversion failed"
+            error_msg = result.stderr.strip() or result.stdout.strip() or "Conversion failed"
             print(f"❌ Conversion error: {error_msg}")
-            return jsonify({
-                "success": False,
-                "error": f"Conversion failed: {error_msg}"
-            }), 500
-            
-    except Exception as e:
-        # Clean up temp file if it exists
-        if 'temp_ifc_path' in locals() and os.path.exists(temp_ifc_path):
-            os.unlink(temp_ifc_path)
-            return jsonify({
+            return {
                 "success": False,
-                "error": f"Server error: {str(e)}"
-            }), 500
+                "error": f"Conversion failed: {error_msg}",
+                "heap_limit_mb": plan["heap_limit_mb"],
+                "resources": resources
+            }
+    
+    except CANCELLED_ERRORS:
+        # Cancelled while waiting for memory admission
+        return _cancelled_result(output_path)
+    finally:
+        # Clean up temporary file
+        _remove_file(temp_ifc_path)
 
 @app.route('/api/convert-subprocess', methods=['POST'])
 def convert_ifc_subprocess():
-    """Convert uploaded IFC file to fragments using external frag_convert package"""
+    """Queue uploaded IFC file for conversion using external frag_convert package"""
     print("🔥 SUBPROCESS ENDPOINT HIT!")  # Debug log
     
     if 'file' not in request.files:
@@ -297,6 +612,11 @@ def convert_ifc_subprocess():
         print(f"❌ Invalid file type: {file.filename}")
         return jsonify({"error": "File must be an IFC file"}), 400
     
+    try:
+        priority = _request_priority(request.form.get('priority'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
     print(f"✅ Processing file: {file.filename}")
     
     try:
@@ -315,152 +635,341 @@ def convert_ifc_subprocess():
                 "error": f"External converter not found at {converter_script}"
             }), 500
         
-        # Create temporary file for IFC data
-        with tempfile.NamedTemporaryFile(suffix='.ifc', delete=False) as temp_ifc:
-            file.save(temp_ifc.name)
-            temp_ifc_path = temp_ifc.name
+        # The upload was streamed to its staging file (and hashed) while parsing
+        upload = file.stream.claim()
+        temp_ifc_path = str(upload.path)
         
-        print(f"📄 Saved to temp file: {temp_ifc_path}")
+        print(f"📄 Staged upload: {temp_ifc_path} ({upload.size} bytes, sha256 {upload.sha256[:12]})")
         
-        # Generate output filename (sanitized)
-        base_name = secure_filename(file.filename)
-        base_name = base_name.replace('.ifc', '').replace(' ', '_')
-        output_filename = f"{base_name}_subprocess.frag"
-        output_path = FRAGMENTS_DIR / output_filename
+        # Truncated / non-STEP / unsupported schema files fail here, not in the converter
+        rejected = _rejected_upload(temp_ifc_path, file.filename)
+        if rejected:
+            return rejected
         
-        print(f"⚡ Subprocess Converting: {file.filename} -> {output_filename}")
-        print(f"📄 Using External Frag Convert Package")
-        
-        # Create temporary directory for processing
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_dir_path = Path(temp_dir)
-            print(f"📁 Created temp directory: {temp_dir_path}")
-            
-            # Save uploaded file to temp directory with original name
-            temp_ifc_file = temp_dir_path / file.filename
-            with open(temp_ifc_file, 'wb') as f:
-                file.seek(0)  # Reset file pointer
-                f.write(file.read())
+        job = job_manager.submit(
+            "convert-subprocess", file.filename, run_subprocess_conversion,
+            temp_ifc_path, file.filename, upload.sha256, priority,
+            on_cancel=lambda: _remove_file(temp_ifc_path),
+            expected_seconds=_expected_seconds("convert-subprocess", upload.size),
+            priority=priority, input_bytes=upload.size
+        )
+        print(f"📥 Queued {priority} subprocess conversion job {job.id}: {file.filename}")
+        return _job_accepted(job)
             
-            print(f"📄 Saved IFC to temp directory: {temp_ifc_file}")
-            print(f"📏 IFC file size: {temp_ifc_file.stat().st_size} bytes")
+    except Exception as e:
+        # Clean up temp file if it exists
+        if 'temp_ifc_path' in locals():
+            _remove_file(temp_ifc_path)
+        return jsonify({
+            "success": False,
+            "error": f"Subprocess converter error: {str(e)}"
+        }), 500
+
+def run_subprocess_conversion(temp_ifc_path, original_filename, content_hash=None, priority=INTERACTIVE):
+    """Convert a staged IFC file with frag_convert, reusing cached fragments (runs on the job executor)"""
+    base_name = secure_filename(original_filename)
+    base_name = base_name.replace('.ifc', '').replace(' ', '_')
+    output_filename = f"{base_name}_subprocess.frag"
+    
+    try:
+        cache_key = conversion_cache.key_for(Path(temp_ifc_path), FRAG_CONVERT_VERSION,
+                                             {"converter": "frag_convert"}, content_hash)
+        input_bytes, ifc_entities = Path(temp_ifc_path).stat().st_size, _ifc_entities(temp_ifc_path)
+        started = time.time()
+        outcome = conversion_cache.get_or_convert(
+            cache_key, FRAGMENTS_DIR / output_filename,
+            lambda: _tracked_conversion("frag_convert", temp_ifc_path, _convert_with_frag_convert,
+                                        temp_ifc_path, original_filename, priority),
+            source_name=original_filename
+        )
+        _record_conversion("backend_frag_convert", original_filename, output_filename, outcome,
+                           time.time() - started, FRAG_CONVERT_VERSION, content_hash,
+                           input_bytes, ifc_entities)
+        return _cached_conversion_result(outcome, original_filename, output_filename,
+                                         method="external_frag_convert")
+    finally:
+        _remove_file(temp_ifc_path)
+
+def _convert_with_frag_convert(temp_ifc_path, original_filename, priority=INTERACTIVE):
+    """Convert a staged IFC file with the external frag_convert package"""
+    frag_convert_dir = PROJECT_ROOT / "frag_convert"
+    converter_script = frag_convert_dir / "ifc_fragments_converter.py"
+    
+    # Generate output filename (sanitized)
+    base_name = secure_filename(original_filename)
+    base_name = base_name.replace('.ifc', '').replace(' ', '_')
+    output_filename = f"{base_name}_subprocess.frag"
+    output_path = FRAGMENTS_DIR / output_filename
+    # The converter writes <base name>.frag, which is renamed afterwards
+    possible_outputs = [
+        FRAGMENTS_DIR / f"{base_name}.frag",
+        FRAGMENTS_DIR / f"{original_filename.replace('.ifc', '')}.frag",
+        output_path
+    ]
+    cancel_event = current_cancel_event()
+    
+    print(f"⚡ Subprocess Converting: {original_filename} -> {output_filename}")
+    print(f"📄 Using External Frag Convert Package")
+    
+    try:
+        # The staged upload's directory holds only this file, so it is the
+        # converter's source directory as-is (no second copy of the upload)
+        temp_ifc_file = Path(temp_ifc_path)
+        temp_dir_path = temp_ifc_file.parent
+        
+        print(f"📄 Converting staged IFC: {temp_ifc_file}")
+        print(f"📏 IFC file size: {temp_ifc_file.stat().st_size} bytes")
+        
+        # The converter writes <base name>.frag in place, and /api/convert may
+        # have materialised that name as a hard link to a cached object
+        for possible_output in possible_outputs:
+            possible_output.unlink(missing_ok=True)
+
+        cmd = [
+            'python', str(converter_script),
+            str(temp_dir_path),  # source directory
+            str(FRAGMENTS_DIR),  # target directory  
+            '--single', temp_ifc_file.name,  # convert only this file
+            '--auto',  # auto-overwrite existing files without prompting
+            '--priority', priority  # batch runs Node.js at a lower CPU priority
+        ]
+        
+        print(f"📄 Subprocess Command: {' '.join(cmd)}")
+        print(f"🔧 Working directory: {frag_convert_dir}")
+        print(f"🔧 Using external converter: {converter_script}")
+        
+        # Run with subprocess isolation and extended timeout for large files
+        try:
+            print("⚡ Starting subprocess...")
             
-            cmd = [
-                'python', str(converter_script),
-                str(temp_dir_path),  # source directory
-                str(FRAGMENTS_DIR),  # target directory  
-                '--single', file.filename,  # convert only this file
-                '--auto'  # auto-overwrite existing files without prompting
-            ]
+            # Timeout from the predicted duration, size steps until there is history
+            file_size_mb = temp_ifc_file.stat().st_size / (1024 * 1024)
+            timeout = _conversion_timeout("convert-subprocess", temp_ifc_path, default_timeout(file_size_mb))
             
-            print(f"📄 Subprocess Command: {' '.join(cmd)}")
-            print(f"🔧 Working directory: {frag_convert_dir}")
-            print(f"🔧 Using external converter: {converter_script}")
+            print(f"📏 File size: {file_size_mb:.2f} MB, using timeout: {timeout/60:.1f} minutes")
             
-            # Run with subprocess isolation and extended timeout for large files
-            try:
-                print("⚡ Starting subprocess...")
-                
-                # Determine timeout based on file size
-                file_size_mb = temp_ifc_file.stat().st_size / (1024 * 1024)
-                if file_size_mb > 100:
-                    timeout = 3600  # 1 hour for files > 100MB
-                elif file_size_mb > 50:
-                    timeout = 1800  # 30 minutes for files > 50MB
-                elif file_size_mb > 10:
-                    timeout = 1200  # 20 minutes for files > 10MB
-                else:
-                    timeout = 600   # 10 minutes for smaller files
-                
-                print(f"📏 File size: {file_size_mb:.2f} MB, using timeout: {timeout/60:.1f} minutes")
-                
-                result = subprocess.run(
+            # The external converter runs Node.js with its default heap
+            estimated_peak_mb = node_memory_plan(file_size_mb)["estimated_peak_mb"]
+            with memory_scheduler.admit(estimated_peak_mb, original_filename, cancel_event):
+                result, resources = run_monitored(
                     cmd, 
-                    capture_output=True, 
                     text=True,
+                    on_line=_print_converter_line,
                     cwd=str(frag_convert_dir),  # Run from converter directory
                     encoding='utf-8', 
                     errors='replace',
-                    timeout=timeout  # Dynamic timeout based on file size
+                    timeout=timeout,  # Dynamic timeout based on file size
+                    cancel_event=cancel_event  # Kills the wrapper and its Node.js process
                 )
-                print("⚡ Subprocess completed")
-            except subprocess.TimeoutExpired:
-                print(f"❌ Subprocess timed out after {timeout/60:.1f} minutes")
-                return jsonify({
-                    "success": False,
-                    "error": f"External subprocess conversion timed out after {timeout/60:.1f} minutes"
-                }), 500
-            except Exception as subprocess_error:
-                print(f"❌ Subprocess error: {subprocess_error}")
-                return jsonify({
-                    "success": False,
-                    "error": f"Subprocess execution failed: {str(subprocess_error)}"
-                }), 500
-            
-            print(f"⚡ Subprocess Return code: {result.returncode}")
-            if result.stdout:
-                print(f"⚡ Subprocess STDOUT:\n{result.stdout}")
-            if result.stderr:
-                print(f"⚡ Subprocess STDERR:\n{result.stderr}")
-            
-            # Check if output file was created (the converter creates it with base name + .frag)
-            possible_outputs = [
-                FRAGMENTS_DIR / f"{base_name}.frag",
-                FRAGMENTS_DIR / f"{file.filename.replace('.ifc', '')}.frag",
-                output_path
-            ]
-            
-            print(f"🔍 Looking for output files:")
-            for possible_output in possible_outputs:
-                print(f"  - {possible_output}: {possible_output.exists()}")
-            
-            actual_output = None
+            print("⚡ Subprocess completed")
+        except CANCELLED_ERRORS:
+            return _cancelled_result(*possible_outputs)
+        except subprocess.TimeoutExpired:
+            print(f"❌ Subprocess timed out after {timeout/60:.1f} minutes")
             for possible_output in possible_outputs:
-                if possible_output.exists():
-                    actual_output = possible_output
-                    print(f"✅ Found output at: {actual_output}")
-                    break
-            
-            if actual_output and actual_output != output_path:
-                # Rename to our naming convention
-                print(f"📝 Renaming {actual_output} to {output_path}")
-                actual_output.rename(output_path)
-            
-            print(f"📁 Final output file exists: {output_path.exists()}")
+                possible_output.unlink(missing_ok=True)
+            return {
+                "success": False,
+                "error": f"External subprocess conversion timed out after {timeout/60:.1f} minutes"
+            }
+        except Exception as subprocess_error:
+            print(f"❌ Subprocess error: {subprocess_error}")
+            return {
+                "success": False,
+                "error": f"Subprocess execution failed: {str(subprocess_error)}"
+            }
         
-        # Clean up temporary file
-        print(f"🧹 Cleaning up temp file: {temp_ifc_path}")
-        os.unlink(temp_ifc_path)
+        print(f"⚡ Subprocess Return code: {result.returncode}")
+        print(f"📊 Resources: {describe_usage(resources)}")
+        
+        # Check if output file was created (the converter creates it with base name + .frag)
+        print(f"🔍 Looking for output files:")
+        for possible_output in possible_outputs:
+            print(f"  - {possible_output}: {possible_output.exists()}")
+        
+        actual_output = None
+        for possible_output in possible_outputs:
+            if possible_output.exists():
+                actual_output = possible_output
+                print(f"✅ Found output at: {actual_output}")
+                break
+        
+        if actual_output and actual_output != output_path:
+            # Rename to our naming convention
+            print(f"📝 Renaming {actual_output} to {output_path}")
+            actual_output.rename(output_path)
+        
+        print(f"📁 Final output file exists: {output_path.exists()}")
         
         if result.returncode == 0 and output_path.exists():
             # Get file stats
             stat = output_path.stat()
-            return jsonify({
+            return {
                 "success": True,
-                "message": f"Successfully converted {file.filename} using external subprocess converter",
+                "message": f"Successfully converted {original_filename} using external subprocess converter",
                 "output_file": output_filename,
                 "size_mb": round(stat.st_size / (1024 * 1024), 2),
-                "conversion_time": "< 10 minutes",
-                "method": "external_frag_convert"
-            })
+                "conversion_time": f"{resources['duration_s']:.1f}s" if resources else "< 10 minutes",
+                "method": "external_frag_convert",
+                "resources": resources
+            }
         else:
-            error_msg = result.stderr if result.stderr else "External subprocess conversion failed"
+            error_msg = result.stderr.strip() or result.stdout.strip() or "External subprocess conversion failed"
             print(f"❌ Subprocess conversion error: {error_msg}")
-            return jsonify({
+            return {
                 "success": False,
-                "error": f"External subprocess conversion failed: {error_msg}"
-            }), 500
+                "error": f"External subprocess conversion failed: {error_msg}",
+                "resources": resources
+            }
             
     except Exception as e:
-        # Clean up temp file if it exists
-        if 'temp_ifc_path' in locals() and os.path.exists(temp_ifc_path):
-            os.unlink(temp_ifc_path)
-        if 'output_path' in locals() and output_path.exists():
+        if output_path.exists():
             os.unlink(output_path)
-        return jsonify({
+        return {
             "success": False,
             "error": f"Subprocess converter error: {str(e)}"
-        }), 500
+        }
+    finally:
+        # Clean up temporary file
+        print(f"🧹 Cleaning up temp file: {temp_ifc_path}")
+        _remove_file(temp_ifc_path)
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List conversion jobs known to this server process"""
+    jobs = job_manager.list_jobs()
+    return jsonify({
+        "jobs": jobs,
+        "count": len(jobs),
+        "counts": job_manager.counts(),
+        "queue": job_manager.wait_stats()
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get status and result of a conversion job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def delete_job(job_id):
+    """Cancel a queued or running job, or delete a finished job's record"""
+    status = job_manager.cancel(job_id)
+    if status is None:
+        return jsonify({"error": f"Job not found: {job_id}"}), 404
+    if status == "cancelling":
+        # The converter's process tree is being killed; the job ends as cancelled
+        return jsonify({"job_id": job_id, "status": status, "status_url": f"/api/jobs/{job_id}"}), 202
+    return jsonify({"job_id": job_id, "status": status})
+
+@app.errorhandler(UploadSessionError)
+def upload_session_error(e):
+    return jsonify({"success": False, "error": str(e)}), e.status_code
+
+@app.route('/api/uploads', methods=['POST'])
+def create_upload():
+    """Open a resumable chunked upload session for a large IFC file"""
+    data = request.get_json(silent=True) or {}
+    converter = data.get("converter", "convert")
+    if converter not in ("convert", "convert-subprocess"):
+        return jsonify({"error": f"Unknown converter: {converter}"}), 400
+    try:
+        priority = _request_priority(data.get("priority"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        size = int(data.get("size", 0))
+        chunk_size = int(data["chunk_size"]) if data.get("chunk_size") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "size and chunk_size must be integers"}), 400
+    
+    session = upload_sessions.create(
+        data.get("filename", ""),
+        size,
+        sha256=data.get("sha256"),
+        chunk_size=chunk_size,
+        params={"converter": converter, "priority": priority}
+    )
+    print(f"📦 Upload session {session['upload_id']}: {session['filename']} "
+          f"({session['size'] / (1024 * 1024):.1f} MB in {session['total_chunks']} chunks)")
+    response = jsonify(session)
+    response.headers['Location'] = session["status_url"]
+    return response, 201
+
+@app.route('/api/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def put_upload_chunk(upload_id, index):
+    """Store one chunk of an upload (raw request body)"""
+    chunk = upload_sessions.put_chunk(
+        upload_id, index, request.stream,
+        chunk_sha256=request.headers.get('X-Chunk-SHA256')
+    )
+    return jsonify(chunk)
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def get_upload(upload_id):
+    """Report which chunks of an upload have been received"""
+    return jsonify(upload_sessions.status(upload_id))
+
+@app.route('/api/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    """Abort an upload session and discard its chunks"""
+    if not upload_sessions.abort(upload_id):
+        return jsonify({"error": f"Upload session not found: {upload_id}"}), 404
+    return jsonify({"upload_id": upload_id, "status": "aborted"})
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Assemble and verify an upload, then queue it like a direct upload"""
+    data = request.get_json(silent=True) or {}
+    upload = upload_sessions.finalize(upload_id, sha256=data.get("sha256"))
+    temp_ifc_path = str(upload["path"])
+    filename = upload["filename"]
+    print(f"📦 Assembled upload {upload_id}: {temp_ifc_path} ({upload['size']} bytes, sha256 {upload['sha256'][:12]})")
+    
+    rejected = _rejected_upload(temp_ifc_path, filename)
+    if rejected:
+        return rejected
+    
+    priority = upload["params"].get("priority", INTERACTIVE)
+    if upload["params"].get("converter") == "convert-subprocess":
+        job = job_manager.submit(
+            "convert-subprocess", filename, run_subprocess_conversion,
+            temp_ifc_path, filename, upload["sha256"], priority,
+            on_cancel=lambda: _remove_file(temp_ifc_path),
+            expected_seconds=_expected_seconds("convert-subprocess", upload["size"]),
+            priority=priority, input_bytes=upload["size"]
+        )
+    else:
+        base_name = secure_filename(filename)
+        base_name = base_name.replace('.ifc', '').replace(' ', '_')
+        job = job_manager.submit(
+            "convert", filename, run_conversion,
+            temp_ifc_path, filename, f"{base_name}.frag", upload["sha256"], priority,
+            on_cancel=lambda: _remove_file(temp_ifc_path),
+            expected_seconds=_expected_seconds("convert", upload["size"]),
+            priority=priority, input_bytes=upload["size"]
+        )
+    print(f"📥 Queued conversion job {job.id} for chunked upload {upload_id}")
+    return _job_accepted(job)
+
+@app.route('/api/history/stats', methods=['GET'])
+def history_stats():
+    """Conversion latency/throughput percentiles (?since=&until=&source=&status=&group_by=day|month)"""
+    group_by = request.args.get('group_by')
+    if group_by not in (None, 'day', 'month'):
+        return jsonify({"error": "group_by must be 'day' or 'month'"}), 400
+    
+    rows = conversion_history.stats(
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        source=request.args.get('source'),
+        status=request.args.get('status', 'success'),
+        group_by=group_by
+    )
+    return jsonify({"stats": rows, "database": str(conversion_history.db_path)})
 
 if __name__ == '__main__':
     print("🚀 Starting QGEN_IMPFRAG Backend API Server...")
@@ -468,4 +977,8 @@ if __name__ == '__main__':
     print(f"📁 Fragments Directory: {FRAGMENTS_DIR}")
     print(f"🌐 Server will run on http://127.0.0.1:8111")
     
+    # Exit through atexit on SIGTERM too, so running conversions are cancelled
+    # and their process trees killed instead of being orphaned
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     app.run(host='127.0.0.1', port=8111, debug=False)
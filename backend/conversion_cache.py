@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Conversion Cache
+==================================
+Maps SHA-256(IFC bytes + converter version + options) to a stored `.frag`
+so that re-uploads of the same model, under any file name, are served
+from disk instead of being converted again.
+
+- Objects live in `<cache_dir>/objects/<key[:2]>/<key>.frag`, with an
+  `index.json` holding size and last-access time per key.
+- Concurrent requests for the same key share one in-flight conversion
+  (single-flight); followers wait for the leader and reuse its output.
+- The cache is bounded by `max_size_mb` and evicts least-recently-used
+  objects after each store.
+
+Outputs are hard-linked out of the cache where the filesystem allows it.
+A miss unlinks the target path before converting, so a converter writing
+in place never truncates a cached object through a shared inode.
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+# File hash and converter version are shared with the conversion history
+sys.path.append(str(Path(__file__).parent.parent / "frag_convert"))
+from conversion_history import converter_version, file_sha256
+
+
+class ConversionCache:
+    """
+    Size-bounded LRU cache of converted fragments keyed by content hash
+    """
+    
+    def __init__(self, cache_dir: Path, max_size_mb: int = 10240):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.index_file = self.cache_dir / "index.json"
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._index = self._load_index()
+        self.stats = {'hits': 0, 'misses': 0, 'shared': 0, 'evictions': 0}
+    
+    def _load_index(self) -> Dict[str, Dict]:
+        if self.index_file.exists():
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                # Drop entries whose objects were removed behind our back
+                return {key: entry for key, entry in index.items() if self._object_path(key).exists()}
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️  Rebuilding conversion cache index: {e}")
+        
+        index = {}
+        for object_file in self.objects_dir.glob("*/*.frag"):
+            stat = object_file.stat()
+            index[object_file.stem] = {"size": stat.st_size, "last_access": stat.st_mtime}
+        return index
+    
+    def _save_index(self):
+        """Write the index atomically (caller holds the lock)"""
+        tmp_file = self.index_file.with_suffix(".json.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        tmp_file.replace(self.index_file)
+    
+    def _object_path(self, key: str) -> Path:
+        return self.objects_dir / key[:2] / f"{key}.frag"
+    
+    def key_for(self, ifc_path: Path, version: str, options: Optional[Dict] = None,
+                content_hash: Optional[str] = None) -> str:
+        """Cache key for an IFC file; pass `content_hash` if the upload was already hashed"""
+        content_hash = content_hash or file_sha256(ifc_path)
+        key_material = json.dumps({
+            "ifc_sha256": content_hash,
+            "converter_version": version,
+            "options": options or {}
+        }, sort_keys=True)
+        return hashlib.sha256(key_material.encode()).hexdigest()
+    
+    def lookup(self, key: str) -> Optional[Path]:
+        """Path of a cached fragment, refreshing its LRU position"""
+        with self._lock:
+            entry = self._index.get(key)
+            object_path = self._object_path(key)
+            if entry is None or not object_path.exists():
+                self._index.pop(key, None)
+                return None
+            entry["last_access"] = time.time()
+            self._save_index()
+            return object_path
+    
+    def store(self, key: str, fragment_file: Path, source_name: str = "") -> Optional[Path]:
+        """
+        Add a converted fragment to the cache and evict old objects if over
+        budget; a fragment larger than the whole cache is not stored (None)
+        """
+        size = Path(fragment_file).stat().st_size
+        if size > self.max_size_bytes:
+            print(f"⚠️  Not caching {key[:12]}: {size / (1024 * 1024):.1f} MB exceeds the "
+                  f"{self.max_size_bytes / (1024 * 1024):.0f} MB cache")
+            return None
+        object_path = self._object_path(key)
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = object_path.with_suffix(f".tmp{threading.get_ident()}")
+        _link_or_copy(fragment_file, tmp_path)
+        tmp_path.replace(object_path)
+        
+        with self._lock:
+            self._index[key] = {
+                "size": object_path.stat().st_size,
+                "last_access": time.time(),
+                "source_name": source_name
+            }
+            self._evict()
+            self._save_index()
+        return object_path
+    
+    def _evict(self):
+        """Remove least-recently-used objects until under the size limit (caller holds the lock)"""
+        total = sum(entry["size"] for entry in self._index.values())
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_size_bytes:
+                break
+            self._object_path(key).unlink(missing_ok=True)
+            del self._index[key]
+            total -= entry["size"]
+            self.stats['evictions'] += 1
+            print(f"🧹 Evicted cached fragment {key[:12]} ({entry['size'] / (1024 * 1024):.1f} MB)")
+    
+    def get_or_convert(self, key: str, output_path: Path, convert: Callable[[], Dict],
+                       source_name: str = "") -> Dict:
+        """
+        Materialise the fragment for `key` at `output_path`, converting at most once
+        
+        `convert()` must write `output_path` and return a result dict with a
+        "success" key. Returns {"success", "cache": "hit"|"miss"|"shared",
+        "result": <convert() result on a miss>, "error"}.
+        """
+        output_path = Path(output_path)
+        
+        cached = self.lookup(key)
+        if cached:
+            _materialize(cached, output_path)
+            self.stats['hits'] += 1
+            print(f"⚡ Conversion cache hit {key[:12]} -> {output_path.name}")
+            return {"success": True, "cache": "hit", "result": None, "error": None}
+        
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not leader:
+            print(f"🔗 Waiting for in-flight conversion {key[:12]}")
+            outcome = future.result()
+            self.stats['shared'] += 1
+            cached = self.lookup(key) if outcome["success"] else None
+            if cached:
+                _materialize(cached, output_path)
+                return {"success": True, "cache": "shared", "result": None, "error": None}
+            if outcome["success"] and outcome["output_path"].exists():
+                # Not cached (larger than the cache): copy the leader's output
+                if outcome["output_path"] != output_path:
+                    _materialize(outcome["output_path"], output_path, copy=True)
+                return {"success": True, "cache": "shared", "result": None, "error": None}
+            return {"success": False, "cache": "shared", "result": outcome.get("result"),
+                    "error": outcome.get("error") or "Shared conversion failed"}
+        
+        outcome = {"success": False, "cache": "miss", "result": None, "error": None, "output_path": output_path}
+        try:
+            self.stats['misses'] += 1
+            # Never let the converter write through a hard link into the cache
+            output_path.unlink(missing_ok=True)
+            result = convert()
+            outcome["result"] = result
+            if result.get("success") and output_path.exists():
+                self.store(key, output_path, source_name)
+                outcome["success"] = True
+            else:
+                outcome["error"] = result.get("error", "Conversion failed")
+        except Exception as e:
+            outcome["error"] = str(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            future.set_result(outcome)
+        return outcome
+    
+    def summary(self) -> Dict:
+        with self._lock:
+            total = sum(entry["size"] for entry in self._index.values())
+            return {
+                "entries": len(self._index),
+                "size_mb": round(total / (1024 * 1024), 2),
+                "max_size_mb": round(self.max_size_bytes / (1024 * 1024), 2),
+                **self.stats
+            }
+
+
+def _link_or_copy(source: Path, destination: Path):
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def _materialize(cached: Path, output_path: Path, copy: bool = False):
+    """Place a cached object (or, with `copy`, a copy of any file) at output_path without touching its inode"""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp{threading.get_ident()}")
+    if copy:
+        shutil.copyfile(cached, tmp_path)
+    else:
+        _link_or_copy(cached, tmp_path)
+    tmp_path.replace(output_path)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Warm Node.js Converter Worker Pool
+==================================
+Keeps a small pool of long-lived `node ifc_converter.js --worker` processes
+so that Node startup, the @thatopen/fragments import and the web-ifc WASM
+instantiation are paid once per worker instead of once per conversion.
+
+Protocol (one JSON object per line):
+    stdin  -> {"id": "...", "input": "model.ifc", "output": "model.frag"}
+    stdout <- WORKER_RESULT_JSON:{"type": "result", "id": "...", "success": true, ...}
+
+Workers are recycled after `max_jobs_per_worker` conversions or once their
+reported V8 heap exceeds `max_heap_mb`. Each worker leads its own process
+group; a job that times out or is cancelled takes its worker down with it
+(the conversion cannot be aborted inside the worker).
+"""
+
+import os
+import json
+import queue
+import threading
+import subprocess
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from resource_monitor import monitor_process
+# resource_monitor puts frag_convert on the path
+from output_capture import kill_tree
+
+RESULT_PREFIX = "WORKER_RESULT_JSON:"
+BACKEND_DIR = Path(__file__).parent
+CONVERTER_SCRIPT = BACKEND_DIR / "ifc_converter.js"
+
+# How often a job waiting for its result checks its cancel event
+CANCEL_POLL_SECONDS = 0.5
+
+
+class ConverterWorker:
+    """A single long-lived Node.js converter process"""
+
+    def __init__(self, converter_script: Path, node_options: List[str], startup_timeout: int = 120):
+        self.converter_script = converter_script
+        self.node_options = node_options
+        self.startup_timeout = startup_timeout
+        self.jobs_done = 0
+        self.heap_used_mb = 0
+        self.rss_mb = 0
+        self.process = None
+        self._messages: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self._reader = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Spawn the Node.js process and wait for its ready message"""
+        cmd = ['node', *self.node_options, str(self.converter_script), '--worker']
+        print(f"♻️  Starting converter worker: {' '.join(cmd)}")
+
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1,
+            cwd=str(self.converter_script.parent),
+            start_new_session=hasattr(os, 'killpg')
+        )
+        self._reader = threading.Thread(target=self._read_output, daemon=True)
+        self._reader.start()
+
+        ready = self._next_message(self.startup_timeout)
+        if not ready or ready.get('type') != 'ready':
+            self.stop()
+            raise RuntimeError("Converter worker did not become ready")
+        self._update_memory(ready)
+        print(f"✅ Converter worker ready (pid {self.pid}, heap {self.heap_used_mb} MB)")
+
+    def _read_output(self):
+        """Forward worker output and queue protocol messages"""
+        for line in self.process.stdout:
+            line = line.rstrip('\n')
+            if line.startswith(RESULT_PREFIX):
+                try:
+                    self._messages.put(json.loads(line[len(RESULT_PREFIX):]))
+                except json.JSONDecodeError:
+                    print(f"⚠️  [worker {self.pid}] Unparseable result: {line}")
+            elif line.strip():
+                print(f"🔧 [worker {self.pid}] {line}")
+        # EOF: the process exited, wake up anyone waiting for a result
+        self._messages.put(None)
+
+    def _next_message(self, timeout: float) -> Optional[Dict]:
+        try:
+            return self._messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _update_memory(self, message: Dict):
+        self.heap_used_mb = message.get('heapUsedMB', self.heap_used_mb)
+        self.rss_mb = message.get('rssMB', self.rss_mb)
+
+    def convert(self, input_path: str, output_path: str, timeout: int,
+                cancel_event: Optional[threading.Event] = None) -> Dict:
+        """Send one job to the worker and wait for its result (or until `cancel_event` is set)"""
+        job_id = uuid.uuid4().hex
+        job = {"id": job_id, "input": str(input_path), "output": str(output_path)}
+
+        try:
+            self.process.stdin.write(json.dumps(job) + '\n')
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            return {"success": False, "error": f"Converter worker unavailable: {e}"}
+
+        deadline = time.time() + timeout
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                self.stop()
+                return {"success": False, "error": "Conversion cancelled", "cancelled": True}
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                # A worker stuck on a job cannot be reused
+                self.stop()
+                return {"success": False, "error": f"Conversion timed out after {timeout} seconds", "timeout": timeout}
+            try:
+                message = self._messages.get(
+                    timeout=min(remaining, CANCEL_POLL_SECONDS) if cancel_event is not None else remaining
+                )
+            except queue.Empty:
+                continue
+            if message is None:
+                return {"success": False, "error": "Converter worker exited unexpectedly"}
+            if message.get('type') == 'result' and message.get('id') == job_id:
+                self.jobs_done += 1
+                self._update_memory(message)
+                return message
+
+    def stop(self):
+        """Terminate the worker process"""
+        if self.process is None:
+            return
+        try:
+            if self.process.stdin:
+                self.process.stdin.close()
+        except OSError:
+            pass
+        if self.process.poll() is None:
+            kill_tree(self.process, grace=10, group=hasattr(os, 'killpg'))
+        print(f"🛑 Converter worker stopped (pid {self.process.pid}, {self.jobs_done} jobs)")
+
+
+class ConverterWorkerPool:
+    """
+    Pool of warm converter workers with job- and heap-based recycling
+    """
+
+    def __init__(self, size: int = 2, max_jobs_per_worker: int = 50, max_heap_mb: int = 2048,
+                 max_file_mb: float = 20, node_options: Optional[List[str]] = None,
+                 converter_script: Path = CONVERTER_SCRIPT):
+        self.size = size
+        # Large models keep their own process with a tuned heap size
+        self.max_file_mb = max_file_mb
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_heap_mb = max_heap_mb
+        self.node_options = node_options if node_options is not None else ['--expose-gc']
+        self.converter_script = Path(converter_script)
+
+        self._idle: "queue.Queue[ConverterWorker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._spawned = 0
+        self._closed = False
+        self.stats = {'jobs': 0, 'recycled': 0, 'started': 0}
+
+        if not self.converter_script.exists():
+            raise FileNotFoundError(f"JavaScript converter not found: {self.converter_script}")
+
+    @classmethod
+    def from_env(cls) -> Optional["ConverterWorkerPool"]:
+        """Build a pool from QGEN_IMPFRAG_POOL_* environment variables (size 0 disables it)"""
+        size = int(os.getenv("QGEN_IMPFRAG_POOL_SIZE", "2"))
+        if size <= 0:
+            return None
+        return cls(
+            size=size,
+            max_jobs_per_worker=int(os.getenv("QGEN_IMPFRAG_POOL_MAX_JOBS", "50")),
+            max_heap_mb=int(os.getenv("QGEN_IMPFRAG_POOL_MAX_HEAP_MB", "2048")),
+            max_file_mb=float(os.getenv("QGEN_IMPFRAG_POOL_MAX_FILE_MB", "20"))
+        )
+
+    def accepts(self, input_file: str) -> bool:
+        """Whether a file is small enough to run on a shared worker"""
+        return Path(input_file).stat().st_size / (1024 * 1024) <= self.max_file_mb
+
+    def _acquire(self) -> ConverterWorker:
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                spawn = self._spawned < self.size
+                if spawn:
+                    self._spawned += 1
+            if spawn:
+                break
+
+            # Recycled workers free a slot without returning to the idle queue
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+
+        worker = ConverterWorker(self.converter_script, self.node_options)
+        try:
+            worker.start()
+        except Exception:
+            with self._lock:
+                self._spawned -= 1
+            raise
+        self.stats['started'] += 1
+        return worker
+
+    def _release(self, worker: ConverterWorker):
+        recycle_reason = None
+        if not worker.is_alive():
+            recycle_reason = "process exited"
+        elif worker.jobs_done >= self.max_jobs_per_worker:
+            recycle_reason = f"reached {worker.jobs_done} jobs"
+        elif worker.heap_used_mb > self.max_heap_mb:
+            recycle_reason = f"heap {worker.heap_used_mb} MB > {self.max_heap_mb} MB"
+
+        if recycle_reason or self._closed:
+            if recycle_reason:
+                print(f"♻️  Recycling converter worker {worker.pid}: {recycle_reason}")
+                self.stats['recycled'] += 1
+            worker.stop()
+            with self._lock:
+                self._spawned -= 1
+        else:
+            self._idle.put(worker)
+
+    def convert(self, input_file: str, output_file: str, timeout: int = 600,
+                cancel_event: Optional[threading.Event] = None) -> Dict:
+        """
+        Convert an IFC file on a warm worker
+
+        Setting `cancel_event` stops the job's worker; the result then has
+        "cancelled": True and a replacement worker is started on demand.
+
+        Returns:
+            Dict shaped like XFRGSubprocessConverter.convert_ifc_file results
+        """
+        if self._closed:
+            raise RuntimeError("Converter pool has been shut down")
+
+        start_time = time.time()
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        worker = self._acquire()
+        # Counters start at the job, so the warm worker's earlier jobs are excluded
+        monitor = monitor_process(worker.pid)
+        try:
+            message = worker.convert(input_file, str(output_path), timeout, cancel_event)
+        finally:
+            resources = monitor.stop() if monitor else None
+            self._release(worker)
+
+        self.stats['jobs'] += 1
+        conversion_time = time.time() - start_time
+
+        if message.get('success') and output_path.exists():
+            file_size = output_path.stat().st_size
+            return {
+                "success": True,
+                "output_file": output_path.name,
+                "file_size": file_size,
+                "file_size_mb": round(file_size / (1024 * 1024), 2),
+                "conversion_time": round(conversion_time, 2),
+                "method": "warm_worker_pool",
+                "converter": "thatopen_components_worker",
+                "worker_pid": worker.pid,
+                "worker_heap_mb": worker.heap_used_mb,
+                "resources": resources
+            }
+
+        result = {
+            "success": False,
+            "error": message.get('error') or "Conversion failed",
+            "conversion_time": round(conversion_time, 2),
+            "worker_pid": worker.pid,
+            "resources": resources
+        }
+        if 'timeout' in message:
+            result["timeout"] = message['timeout']
+        if message.get('cancelled'):
+            result["cancelled"] = True
+        return result
+
+    def shutdown(self):
+        """Stop all idle workers; busy workers are stopped when released"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+            with self._lock:
+                self._spawned -= 1
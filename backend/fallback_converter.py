@@ -2,12 +2,43 @@
 """
 Alternative IFC converter using Python libraries as fallback
 This can be used if Node.js dependencies fail to install
+
+Tessellates every product with ifcopenshell.geom.iterator on all CPU cores
+and streams the triangles to disk as elements come out of the iterator, so
+memory stays bounded by the iterator's own buffers, not by the model size.
+
+Output (all numbers little-endian):
+    model.geom        "XGEO" magic, uint32 format version, then one record
+                      per element:
+                          22 bytes   IFC GlobalId (ASCII)
+                          uint32     vertex count V
+                          uint32     index count I (3 per triangle)
+                          float32    V * 3 world coordinates (x, y, z)
+                          uint32     I vertex indices
+    model.geom.json   manifest: schema, source, one entry per element
+                      (GlobalId, IFC type, name, byte offset of its record,
+                      vertex / triangle counts, bounding box) and totals
+
+Usage:
+    python fallback_converter.py input.ifc output.geom [--threads N]
 """
 
 import os
 import sys
+import json
+import time
+import array
+import struct
+import argparse
 from pathlib import Path
 
+GEOMETRY_MAGIC = b"XGEO"
+GEOMETRY_FORMAT_VERSION = 1
+GLOBAL_ID_LENGTH = 22
+
+# Threads for the geometry iterator (0 = all cores)
+FALLBACK_THREADS = int(os.getenv("QGEN_IMPFRAG_FALLBACK_THREADS", "0"))
+
 def check_python_ifc_libraries():
     """Check if Python IFC libraries are available"""
     try:
@@ -19,47 +50,167 @@ def check_python_ifc_libraries():
         print("💡 Install with: pip install ifcopenshell")
         return False
 
-def convert_ifc_python(ifc_path, output_path):
-    """Convert IFC to a simplified format using Python"""
+def _geometry_settings(ifcopenshell_geom):
+    """Triangulated shapes in world coordinates"""
+    settings = ifcopenshell_geom.settings()
+    try:
+        settings.set("use-world-coords", True)              # ifcopenshell >= 0.8
+    except Exception:
+        settings.set(settings.USE_WORLD_COORDS, True)       # ifcopenshell 0.7
+    return settings
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tobytes()
+
+def _bounding_box(verts):
+    return [
+        [min(verts[0::3]), min(verts[1::3]), min(verts[2::3])],
+        [max(verts[0::3]), max(verts[1::3]), max(verts[2::3])]
+    ]
+
+def _merge_box(total, box):
+    if total is None:
+        return [list(box[0]), list(box[1])]
+    return [[min(a, b) for a, b in zip(total[0], box[0])],
+            [max(a, b) for a, b in zip(total[1], box[1])]]
+
+def convert_ifc_python(ifc_path, output_path, threads=None):
+    """
+    Tessellate an IFC file into binary vertex / index buffers plus a manifest
+    
+    `threads` defaults to QGEN_IMPFRAG_FALLBACK_THREADS, or all cores.
+    Returns a result dict with a boolean "success" key like the other
+    converters; partial outputs are removed on failure.
+    """
+    output_path = Path(output_path)
+    manifest_path = output_path.with_name(output_path.name + ".json")
+    tmp_output = output_path.with_name(output_path.name + ".tmp")
+    tmp_manifest = manifest_path.with_name(manifest_path.name + ".tmp")
+    threads = threads or FALLBACK_THREADS or os.cpu_count() or 1
+    start_time = time.time()
+    
     try:
         import ifcopenshell
-        import json
+        import ifcopenshell.geom
         
-        print(f"🔄 Converting {ifc_path} using Python...")
+        print(f"🔄 Converting {ifc_path} using Python ({threads} geometry threads)...")
         
-        # Open IFC file
-        model = ifcopenshell.open(ifc_path)
+        model = ifcopenshell.open(str(ifc_path))
+        settings = _geometry_settings(ifcopenshell.geom)
+        iterator = ifcopenshell.geom.iterator(settings, model, threads)
         
-        # Extract basic information
-        data = {
-            "schema": model.schema,
-            "elements": len(model.by_type("IfcElement")),
-            "spaces": len(model.by_type("IfcSpace")),
-            "walls": len(model.by_type("IfcWall")),
-            "converted_by": "Python fallback converter"
-        }
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        totals = {"elements": 0, "vertices": 0, "triangles": 0, "skipped": 0}
+        types = {}
+        model_box = None
         
-        # Save as JSON (not a real fragment, but a placeholder)
-        with open(output_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        with open(tmp_output, "wb") as geometry, open(tmp_manifest, "w", encoding="utf-8") as manifest:
+            geometry.write(GEOMETRY_MAGIC + struct.pack("<I", GEOMETRY_FORMAT_VERSION))
+            # The element list is written as the elements arrive; totals follow it
+            manifest.write('{\n  "format": "xsba-geometry", "version": %d,\n' % GEOMETRY_FORMAT_VERSION)
+            manifest.write(f'  "schema": {json.dumps(model.schema)},\n')
+            manifest.write(f'  "source": {json.dumps(Path(ifc_path).name)},\n')
+            manifest.write(f'  "geometry_file": {json.dumps(output_path.name)},\n')
+            manifest.write('  "elements": [')
+            
+            reported = 0
+            if iterator.initialize():
+                while True:
+                    shape = iterator.get()
+                    verts = shape.geometry.verts
+                    faces = shape.geometry.faces
+                    global_id = (shape.guid or "").encode("ascii", "replace")[:GLOBAL_ID_LENGTH]
+                    
+                    if verts and faces:
+                        offset = geometry.tell()
+                        geometry.write(global_id.ljust(GLOBAL_ID_LENGTH, b" "))
+                        geometry.write(struct.pack("<II", len(verts) // 3, len(faces)))
+                        geometry.write(_little_endian(array.array("f", verts)))
+                        geometry.write(_little_endian(array.array("I", faces)))
+                        
+                        box = _bounding_box(verts)
+                        model_box = _merge_box(model_box, box)
+                        entry = {
+                            "global_id": shape.guid,
+                            "type": shape.type,
+                            "name": shape.name or None,
+                            "offset": offset,
+                            "vertices": len(verts) // 3,
+                            "triangles": len(faces) // 3,
+                            "bbox": box
+                        }
+                        manifest.write(("\n    " if not totals["elements"] else ",\n    ") + json.dumps(entry))
+                        totals["elements"] += 1
+                        totals["vertices"] += entry["vertices"]
+                        totals["triangles"] += entry["triangles"]
+                        types[shape.type] = types.get(shape.type, 0) + 1
+                    else:
+                        totals["skipped"] += 1
+                    
+                    progress = iterator.progress()
+                    if progress >= reported + 10:
+                        reported = progress - progress % 10
+                        print(f"📊 {reported}% ({totals['elements']} elements, {totals['triangles']} triangles)")
+                    
+                    if not iterator.next():
+                        break
+            
+            conversion_time = time.time() - start_time
+            manifest.write("\n  ],\n")
+            manifest.write(f'  "types": {json.dumps(types, sort_keys=True)},\n')
+            manifest.write(f'  "bbox": {json.dumps(model_box)},\n')
+            manifest.write(f'  "totals": {json.dumps(totals)},\n')
+            manifest.write(f'  "threads": {threads},\n')
+            manifest.write(f'  "conversion_time": {conversion_time:.2f},\n')
+            manifest.write(f'  "converted_by": "Python fallback converter (ifcopenshell {ifcopenshell.version})"\n')
+            manifest.write("}\n")
         
-        print(f"✅ Converted to {output_path}")
-        return True
+        if not totals["elements"]:
+            raise ValueError("No element geometry could be tessellated")
         
+        tmp_output.replace(output_path)
+        tmp_manifest.replace(manifest_path)
+        
+        file_size = output_path.stat().st_size
+        print(f"✅ Converted to {output_path}: {totals['elements']} elements, {totals['triangles']} triangles, "
+              f"{file_size / (1024 * 1024):.2f} MB in {conversion_time:.1f}s")
+        return {
+            "success": True,
+            "output_file": output_path.name,
+            "manifest_file": manifest_path.name,
+            "file_size": file_size,
+            "file_size_mb": round(file_size / (1024 * 1024), 2),
+            "conversion_time": round(conversion_time, 2),
+            "method": "python_fallback",
+            "converter": "ifcopenshell_geom_iterator",
+            "threads": threads,
+            **totals
+        }
+    
     except Exception as e:
         print(f"❌ Python conversion failed: {e}")
-        return False
+        return {
+            "success": False,
+            "error": str(e),
+            "conversion_time": round(time.time() - start_time, 2)
+        }
+    finally:
+        tmp_output.unlink(missing_ok=True)
+        tmp_manifest.unlink(missing_ok=True)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python fallback_converter.py input.ifc output.json")
-        sys.exit(1)
-    
-    ifc_path = sys.argv[1]
-    output_path = sys.argv[2]
+    parser = argparse.ArgumentParser(description="Tessellate an IFC file with ifcopenshell (Node.js fallback)")
+    parser.add_argument("ifc_path", help="Input IFC file")
+    parser.add_argument("output_path", help="Binary geometry file; the manifest is written next to it as <output>.json")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Geometry threads (default: QGEN_IMPFRAG_FALLBACK_THREADS or all cores)")
+    args = parser.parse_args()
     
     if check_python_ifc_libraries():
-        convert_ifc_python(ifc_path, output_path)
+        result = convert_ifc_python(args.ifc_path, args.output_path, args.threads)
+        sys.exit(0 if result["success"] else 1)
     else:
         print("Install ifcopenshell first: pip install ifcopenshell")
         sys.exit(1)
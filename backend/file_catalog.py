@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+In-Memory File Catalog
+======================
+Keeps the IFC and fragment directory listings in memory so that listing
+endpoints no longer glob and `stat()` every file on each request.
+
+The catalog is built by one scan at startup and then updated per file
+from watchdog events (created / modified / deleted / moved). Every change
+bumps `version`, which the endpoints expose as an ETag so that clients can
+revalidate a listing with `If-None-Match` and skip unchanged ones. The
+version restarts with the process, so ETags also carry a per-process
+nonce: a tag from before a restart never matches a listing after it.
+"""
+
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+SORT_KEYS = {
+    "name": lambda entry: entry["filename"].lower(),
+    "size": lambda entry: entry["size"],
+    "modified": lambda entry: entry["mtime"],
+}
+
+
+def fragment_name_for(ifc_name: str) -> str:
+    """Fragment file name the converters produce for an IFC file"""
+    stem = Path(ifc_name).stem
+    return f"{stem.replace(' ', '_').replace('(', '').replace(')', '')}.frag"
+
+
+class DirectoryIndex:
+    """Entries for the files with one suffix in one directory"""
+    
+    def __init__(self, directory: Path, suffix: str, on_change: Callable[[], None]):
+        self.directory = Path(directory)
+        self.suffix = suffix.lower()
+        self.entries: Dict[str, Dict] = {}
+        self._on_change = on_change
+    
+    def matches(self, path: str) -> bool:
+        path = Path(path)
+        return path.parent == self.directory and path.suffix.lower() == self.suffix
+    
+    def scan(self):
+        self.entries = {}
+        for file_path in self.directory.glob(f"*{self.suffix}"):
+            self.update(file_path, notify=False)
+    
+    def update(self, path, notify: bool = True):
+        path = Path(path)
+        try:
+            stat = path.stat()
+        except OSError:
+            self.remove(path, notify)
+            return
+        self.entries[path.name] = {
+            "filename": path.name,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "ctime": stat.st_ctime,
+        }
+        if notify:
+            self._on_change()
+    
+    def remove(self, path, notify: bool = True):
+        if self.entries.pop(Path(path).name, None) is not None and notify:
+            self._on_change()
+
+
+class _CatalogEventHandler(FileSystemEventHandler):
+    def __init__(self, catalog: "FileCatalog"):
+        self.catalog = catalog
+    
+    def on_created(self, event):
+        if not event.is_directory:
+            self.catalog.file_changed(event.src_path)
+    
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.catalog.file_changed(event.src_path)
+    
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.catalog.file_removed(event.src_path)
+    
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.catalog.file_removed(event.src_path)
+            self.catalog.file_changed(event.dest_path)
+
+
+class FileCatalog:
+    """
+    Versioned in-memory listing of IFC and fragment files
+    """
+    
+    def __init__(self, ifc_dir: Path, fragments_dir: Path):
+        self._lock = threading.RLock()
+        self.version = 0
+        self.nonce = uuid.uuid4().hex[:8]
+        self.ifc = DirectoryIndex(ifc_dir, ".ifc", self._bump)
+        self.fragments = DirectoryIndex(fragments_dir, ".frag", self._bump)
+        self.observer = None
+        self.rescan()
+    
+    def _bump(self):
+        self.version += 1
+    
+    def _index_for(self, path: str) -> Optional[DirectoryIndex]:
+        for index in (self.ifc, self.fragments):
+            if index.matches(path):
+                return index
+        return None
+    
+    def rescan(self):
+        """Rebuild both listings from disk"""
+        with self._lock:
+            self.ifc.scan()
+            self.fragments.scan()
+            self._bump()
+    
+    def file_changed(self, path: str):
+        index = self._index_for(path)
+        if index:
+            with self._lock:
+                index.update(path)
+    
+    def file_removed(self, path: str):
+        index = self._index_for(path)
+        if index:
+            with self._lock:
+                index.remove(path)
+    
+    def start(self):
+        """Follow filesystem events for both directories"""
+        self.observer = Observer()
+        handler = _CatalogEventHandler(self)
+        for directory in {self.ifc.directory, self.fragments.directory}:
+            self.observer.schedule(handler, str(directory), recursive=False)
+        self.observer.daemon = True
+        self.observer.start()
+    
+    def stop(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+    
+    @property
+    def etag(self) -> str:
+        return self.etag_for(self.version)
+    
+    def etag_for(self, version: int) -> str:
+        return f"catalog-{self.nonce}-{version}"
+    
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {"ifc_files": len(self.ifc.entries), "fragment_files": len(self.fragments.entries)}
+    
+    def fragment_names(self) -> List[str]:
+        with self._lock:
+            return sorted(self.fragments.entries)
+    
+    def list_fragments(self, **query) -> Dict:
+        with self._lock:
+            version = self.version
+            items = [{
+                "filename": entry["filename"],
+                "size": entry["size"],
+                "mtime": entry["mtime"],
+                "size_mb": round(entry["size"] / (1024 * 1024), 2),
+                "created": datetime.fromtimestamp(entry["ctime"]).isoformat(),
+                "modified": datetime.fromtimestamp(entry["mtime"]).isoformat(),
+                "url": f"/api/fragments/{entry['filename']}"
+            } for entry in self.fragments.entries.values()]
+        return _paginate(items, version, **query)
+    
+    def list_ifc_files(self, has_fragments: Optional[bool] = None, **query) -> Dict:
+        with self._lock:
+            version = self.version
+            items = []
+            for entry in self.ifc.entries.values():
+                fragment_name = fragment_name_for(entry["filename"])
+                fragment = self.fragments.entries.get(fragment_name)
+                if has_fragments is not None and bool(fragment) != has_fragments:
+                    continue
+                items.append({
+                    "filename": entry["filename"],
+                    "size": entry["size"],
+                    "mtime": entry["mtime"],
+                    "size_mb": round(entry["size"] / (1024 * 1024), 2),
+                    "modified": datetime.fromtimestamp(entry["mtime"]).isoformat(),
+                    "has_fragments": fragment is not None,
+                    "fragment_file": fragment_name if fragment else None,
+                    "fragment_size_mb": round(fragment["size"] / (1024 * 1024), 2) if fragment else None
+                })
+        return _paginate(items, version, **query)
+
+
+def _paginate(items: List[Dict], version: int, search: Optional[str] = None, sort: str = "name",
+              order: str = "asc", page: int = 1, per_page: Optional[int] = None) -> Dict:
+    """Filter, sort and slice catalog items; per_page=None returns every match"""
+    if search:
+        needle = search.lower()
+        items = [item for item in items if needle in item["filename"].lower()]
+    
+    items.sort(key=SORT_KEYS.get(sort, SORT_KEYS["name"]), reverse=(order == "desc"))
+    total = len(items)
+    total_size = sum(item["size"] for item in items)
+    
+    page = max(page, 1)
+    if per_page:
+        items = items[(page - 1) * per_page:page * per_page]
+    
+    for item in items:
+        del item["size"], item["mtime"]
+    
+    return {
+        "items": items,
+        "count": total,
+        "total_size_mb": round(total_size / (1024 * 1024), 2),
+        "page": page,
+        "per_page": per_page,
+        "pages": -(-total // per_page) if per_page else 1,
+        "version": version
+    }
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Fragment Download Serving
+=========================
+Serves `.frag` files with validators so viewers can revalidate instead of
+re-downloading multi-hundred-MB fragments on every page load.
+
+- Strong ETag: SHA-256 of the file contents, computed once per
+  (path, size, mtime) and remembered in memory.
+- Conditional GET: `If-None-Match` / `If-Modified-Since` answer 304.
+- Byte ranges: `Range` (with `If-Range`) answers 206, so interrupted
+  downloads resume where they stopped.
+- Cache-Control: fragment names are reused across reconversions, so by
+  default clients must revalidate (`no-cache`); QGEN_IMPFRAG_FRAGMENT_MAX_AGE
+  allows a freshness window in seconds instead.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+from flask import send_file
+
+from conversion_cache import file_sha256
+from metrics import count_fragment_bytes
+
+FRAGMENT_MAX_AGE = int(os.getenv("QGEN_IMPFRAG_FRAGMENT_MAX_AGE", "0"))
+
+_etags: Dict[str, Tuple[int, int, str]] = {}
+_etags_lock = threading.Lock()
+
+
+def fragment_etag(fragment_file: Path) -> str:
+    """Content-hash ETag of a fragment, re-hashed only when the file changes"""
+    stat = fragment_file.stat()
+    key = str(fragment_file.resolve())
+    with _etags_lock:
+        cached = _etags.get(key)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+        return cached[2]
+    
+    etag = file_sha256(fragment_file)
+    with _etags_lock:
+        _etags[key] = (stat.st_size, stat.st_mtime_ns, etag)
+    return etag
+
+
+def send_fragment(fragment_file: Path, as_attachment: bool = False, max_age: int = FRAGMENT_MAX_AGE):
+    """send_file with a strong content ETag, conditional/range handling and cache policy"""
+    response = send_file(
+        fragment_file,
+        mimetype='application/octet-stream',
+        as_attachment=as_attachment,
+        etag=fragment_etag(fragment_file),
+        conditional=True,
+        max_age=max_age
+    )
+    response.headers['Accept-Ranges'] = 'bytes'
+    if max_age:
+        response.cache_control.must_revalidate = True
+    else:
+        response.cache_control.no_cache = True
+    return count_fragment_bytes(response)
@@ -8,10 +8,12 @@
  * 
  * Usage:
  *   node ifc_converter.js --input input.ifc --output output.frag
+ *   node ifc_converter.js --worker   (long-lived mode used by converter_pool.py)
  */
 
 import fs from 'fs';
 import path from 'path';
+import readline from 'readline';
 import { fileURLToPath } from 'url';
 
 // Get current directory for ES modules
@@ -47,10 +49,37 @@ try {
 }
 
 class IfcFragmentsConverter {
-    constructor() {
+    constructor(options = {}) {
+        // Worker mode keeps one importer (and its WASM instance) alive across jobs
+        this.reuseImporter = options.reuseImporter || false;
+        this.importer = null;
         console.log('🔧 IFC Fragments Converter initialized (using IfcImporter API)');
     }
 
+    getImporter() {
+        if (this.reuseImporter && this.importer) {
+            return this.importer;
+        }
+        
+        // Create IFC importer using the correct API from documentation
+        const serializer = new FRAGS.IfcImporter();
+        
+        // Configure WASM path (use local node_modules for Node.js environment)
+        // Ensure proper path formatting for Windows
+        const wasmPath = path.join(rootNodeModules, 'web-ifc') + path.sep;
+        console.log(`🔧 Setting WASM path to: ${wasmPath}`);
+        
+        serializer.wasm = {
+            path: wasmPath,
+            absolute: true
+        };
+        
+        if (this.reuseImporter) {
+            this.importer = serializer;
+        }
+        return serializer;
+    }
+
     async convertFile(inputPath, outputPath) {
         try {
             console.log(`🔄 Converting: ${inputPath} -> ${outputPath}`);
@@ -64,18 +93,7 @@ class IfcFragmentsConverter {
             const ifcData = fs.readFileSync(inputPath);
             console.log(`📖 Read IFC file: ${(ifcData.length / 1024 / 1024).toFixed(2)} MB`);
             
-            // Create IFC importer using the correct API from documentation
-            const serializer = new FRAGS.IfcImporter();
-            
-            // Configure WASM path (use local node_modules for Node.js environment)
-            // Ensure proper path formatting for Windows
-            const wasmPath = path.join(rootNodeModules, 'web-ifc') + path.sep;
-            console.log(`🔧 Setting WASM path to: ${wasmPath}`);
-            
-            serializer.wasm = {
-                path: wasmPath,
-                absolute: true
-            };
+            const serializer = this.getImporter();
             
             console.log('🏗️  Converting IFC to fragments...');
             
@@ -161,6 +179,51 @@ class IfcFragmentsConverter {
     }
 }
 
+// Worker mode: one JSON job per stdin line, one WORKER_RESULT_JSON line per job on stdout
+async function runWorker(converter) {
+    const memoryStats = () => {
+        const usage = process.memoryUsage();
+        return {
+            heapUsedMB: Math.round(usage.heapUsed / 1024 / 1024),
+            rssMB: Math.round(usage.rss / 1024 / 1024)
+        };
+    };
+    const reply = (payload) => {
+        console.log(`WORKER_RESULT_JSON:${JSON.stringify({ pid: process.pid, ...payload, ...memoryStats() })}`);
+    };
+    
+    reply({ type: 'ready' });
+    
+    const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+    for await (const line of rl) {
+        if (!line.trim()) {
+            continue;
+        }
+        
+        let job;
+        try {
+            job = JSON.parse(line);
+        } catch (error) {
+            reply({ type: 'result', id: null, success: false, error: `Invalid job: ${error.message}` });
+            continue;
+        }
+        
+        const startTime = Date.now();
+        try {
+            const result = await converter.convertFile(job.input, job.output);
+            reply({ type: 'result', id: job.id, ...result, conversionTime: (Date.now() - startTime) / 1000 });
+        } catch (error) {
+            reply({ type: 'result', id: job.id, success: false, error: error.message, conversionTime: (Date.now() - startTime) / 1000 });
+        }
+        
+        // Release conversion buffers before reporting heap to the pool
+        if (global.gc) {
+            global.gc();
+        }
+    }
+    process.exit(0);
+}
+
 // CLI interface
 async function main() {
     const args = process.argv.slice(2);
@@ -171,10 +234,16 @@ Usage:
   Single file:    node ifc_converter.js --input file.ifc --output file.frag
   Directory:      node ifc_converter.js --input-dir ./ifc --output-dir ./fragments
   Test mode:      node ifc_converter.js --test
+  Worker mode:    node ifc_converter.js --worker
         `);
         process.exit(1);
     }
     
+    if (args.includes('--worker')) {
+        await runWorker(new IfcFragmentsConverter({ reuseImporter: true }));
+        return;
+    }
+    
     const converter = new IfcFragmentsConverter();
     
     if (args.includes('--test')) {
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Conversion Job Manager
+======================
+Runs conversions on a bounded thread pool so that request threads return
+immediately with a job id instead of blocking on `subprocess.run`.
+
+Each job's metadata (status, timings and the result dict the synchronous
+endpoints used to return) is written to `<jobs_dir>/<job_id>.json`, so it
+survives a server restart and can be served by `GET /api/jobs/<id>`. Jobs
+a restart interrupted (queued or running) are marked failed on startup.
+
+Queued jobs are dispatched shortest-job-first with aging instead of in
+arrival order. A job's score is its expected run time (duration model,
+else estimated from the input size) plus the penalty of its priority
+class, minus the time it has waited times QGEN_IMPFRAG_QUEUE_AGING; the
+lowest score runs next. Small and interactive jobs overtake large batch
+jobs, and aging bounds how long any job can be passed over.
+
+Running jobs are cancelled through their cancel event: the conversion
+function reads it with `current_cancel_event()` and hands it to the
+converter, which kills the converter's process tree as soon as it is set.
+"""
+
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+# Priority classes
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITY_CLASSES = (INTERACTIVE, BATCH)
+
+# Seconds added to a batch job's score; it overtakes interactive jobs only by aging
+CLASS_PENALTY_SECONDS = {
+    INTERACTIVE: 0.0,
+    BATCH: float(os.getenv("QGEN_IMPFRAG_BATCH_PENALTY_SECONDS", "600"))
+}
+
+# Score seconds gained per second waited
+QUEUE_AGING = float(os.getenv("QGEN_IMPFRAG_QUEUE_AGING", "1.0"))
+
+# Run time estimate for jobs without a duration prediction
+SECONDS_PER_INPUT_MB = 5.0
+
+# Niceness increment of batch conversion processes
+BATCH_NICE = int(os.getenv("QGEN_IMPFRAG_BATCH_NICE", "10"))
+
+# Recent queue waits kept per class for the wait statistics
+WAIT_SAMPLES = 500
+
+# Seconds shutdown() waits for cancelled running jobs to stop
+SHUTDOWN_TIMEOUT = 30
+
+_current = threading.local()
+
+
+def current_cancel_event() -> Optional[threading.Event]:
+    """Cancel event of the job running on this thread (None outside jobs)"""
+    job = getattr(_current, "job", None)
+    return job.cancel_event if job else None
+
+
+class ConversionJob:
+    """State of a single queued conversion"""
+
+    def __init__(self, kind: str, filename: str, params: Optional[Dict] = None,
+                 expected_seconds: Optional[float] = None, priority: str = INTERACTIVE,
+                 input_bytes: Optional[int] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.filename = filename
+        self.params = params or {}
+        self.status = QUEUED
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.on_cancel: Optional[Callable[[], None]] = None
+        self.call: Optional[tuple] = None
+        # Predicted run time (duration model), used for ordering and the queue ETA
+        self.expected_seconds = expected_seconds
+        self.priority = priority
+        self.input_bytes = input_bytes
+        self.cancel_event = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def estimated_seconds(self) -> float:
+        if self.expected_seconds is not None:
+            return self.expected_seconds
+        return (self.input_bytes or 0) / (1024 * 1024) * SECONDS_PER_INPUT_MB
+
+    def score(self, now: datetime) -> float:
+        """Dispatch score; the queued job with the lowest score runs next"""
+        waited = (now - self.created_at).total_seconds()
+        return self.estimated_seconds + CLASS_PENALTY_SECONDS[self.priority] - QUEUE_AGING * waited
+
+    def to_dict(self, eta: Optional[datetime] = None) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "filename": self.filename,
+            "params": self.params,
+            "priority": self.priority,
+            "status": self.status,
+            "cancel_requested": self.cancel_event.is_set(),
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "result": self.result,
+            "error": self.error,
+            "expected_seconds": self.expected_seconds,
+            "eta": eta.isoformat(timespec="seconds") if eta else None,
+            "status_url": f"/api/jobs/{self.id}"
+        }
+
+
+class JobManager:
+    """
+    Bounded worker pool for conversion jobs with a priority queue and
+    on-disk result metadata
+    """
+
+    def __init__(self, jobs_dir: Path, max_workers: int = 2, retention_seconds: int = 3600,
+                 on_dispatch: Optional[Callable[[str, float], None]] = None):
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max_workers
+        self.retention_seconds = retention_seconds
+        # Called with (priority, seconds waited) when a job leaves the queue
+        self.on_dispatch = on_dispatch
+        self._jobs: Dict[str, ConversionJob] = {}
+        self._queue: List[ConversionJob] = []
+        self._waits = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITY_CLASSES}
+        self._lock = threading.Lock()
+        self._queue_changed = threading.Condition(self._lock)
+        self._stopped = False
+        self._recover_interrupted()
+        self._workers = [threading.Thread(target=self._work, name=f"conversion-job_{i}", daemon=True)
+                         for i in range(max_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, kind: str, filename: str, fn: Callable[..., Dict], *args,
+               params: Optional[Dict] = None, on_cancel: Optional[Callable[[], None]] = None,
+               expected_seconds: Optional[float] = None, priority: str = INTERACTIVE,
+               input_bytes: Optional[int] = None, **kwargs) -> ConversionJob:
+        """
+        Queue `fn(*args, **kwargs)` as a job.
+
+        `fn` must return a result dict with a boolean "success" key; the
+        job is marked completed or failed accordingly. `on_cancel` runs if
+        the job is cancelled before it starts (e.g. to remove its upload).
+        `expected_seconds` is the predicted run time and `input_bytes` the
+        fallback size estimate, both used for ordering and ETAs;
+        `priority` is one of PRIORITY_CLASSES.
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        job = ConversionJob(kind, filename, params, expected_seconds, priority, input_bytes)
+        job.on_cancel = on_cancel
+        job.call = (fn, args, kwargs)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._persist(job)
+        with self._queue_changed:
+            self._queue.append(job)
+            self._queue_changed.notify()
+        return job
+
+    def _next_job(self) -> Optional[ConversionJob]:
+        """Take the lowest-scoring queued job, waiting for one if the queue is empty"""
+        with self._queue_changed:
+            while not self._queue and not self._stopped:
+                self._queue_changed.wait()
+            if self._stopped:
+                return None
+            now = datetime.now()
+            job = min(self._queue, key=lambda j: j.score(now))
+            self._queue.remove(job)
+            job.status = RUNNING
+            job.started_at = now
+            waited = (now - job.created_at).total_seconds()
+            self._waits[job.priority].append(waited)
+        if self.on_dispatch:
+            try:
+                self.on_dispatch(job.priority, waited)
+            except Exception:
+                pass
+        return job
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            self._run(job)
+
+    def _run(self, job: ConversionJob):
+        self._persist(job)
+        fn, args, kwargs = job.call
+        job.call = None
+        _current.job = job
+
+        try:
+            result = fn(*args, **kwargs)
+            job.result = result
+            if result.get("success"):
+                job.status = COMPLETED
+            elif job.cancel_event.is_set():
+                job.status = CANCELLED
+                job.error = "Cancelled while running"
+            else:
+                job.status = FAILED
+                job.error = result.get("error", "Conversion failed")
+        except Exception as e:
+            if job.cancel_event.is_set():
+                job.status = CANCELLED
+                job.error = "Cancelled while running"
+            else:
+                print(f"❌ Job {job.id} crashed: {e}")
+                traceback.print_exc()
+                job.status = FAILED
+                job.error = f"Server error: {str(e)}"
+        finally:
+            _current.job = None
+            job.finished_at = datetime.now()
+            self._persist(job)
+
+    def _prune(self):
+        """Drop finished jobs older than the retention period from memory (caller holds the lock)"""
+        now = datetime.now()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and (now - job.finished_at).total_seconds() > self.retention_seconds]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _persist(self, job: ConversionJob):
+        """Write job metadata atomically next to the other jobs"""
+        self._write(job.id, job.to_dict())
+
+    def _write(self, job_id: str, metadata: Dict):
+        job_file = self.jobs_dir / f"{job_id}.json"
+        tmp_file = job_file.with_suffix(".json.tmp")
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, indent=2, default=str)
+            tmp_file.replace(job_file)
+        except Exception as e:
+            print(f"⚠️  Could not save job metadata for {job_id}: {e}")
+
+    def _recover_interrupted(self):
+        """
+        Fail jobs a previous run left queued or running
+
+        Their functions and staged inputs belonged to that process, so
+        they cannot be resumed; failing them lets clients polling the
+        job stop instead of seeing it queued forever.
+        """
+        interrupted = 0
+        for job_file in self.jobs_dir.glob("*.json"):
+            try:
+                with open(job_file, 'r', encoding='utf-8') as f:
+                    metadata = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Skipping unreadable job metadata {job_file.name}: {e}")
+                continue
+            if metadata.get("status") in FINISHED_STATES:
+                continue
+            metadata["status"] = FAILED
+            metadata["error"] = "Interrupted by server restart"
+            metadata["finished_at"] = datetime.now().isoformat()
+            metadata["eta"] = None
+            self._write(metadata.get("job_id") or job_file.stem, metadata)
+            interrupted += 1
+        if interrupted:
+            print(f"⚠️  Marked {interrupted} job(s) interrupted by the restart as failed")
+
+    def _etas(self) -> Dict[str, datetime]:
+        """
+        Expected finish time of running and queued jobs (caller holds the lock)
+
+        Replays the queue in current score order over the workers with
+        each job's predicted run time (approximate, as aging reorders the
+        queue over time); jobs behind one without a prediction get no ETA.
+        """
+        now = datetime.now()
+        etas = {}
+        free_at = []
+        for job in sorted((j for j in self._jobs.values() if j.status == RUNNING), key=lambda j: j.started_at):
+            if job.expected_seconds is None:
+                free_at.append(None)
+                continue
+            finish = max(job.started_at + timedelta(seconds=job.expected_seconds), now)
+            etas[job.id] = finish
+            free_at.append(finish)
+        free_at.extend([now] * max(self.max_workers - len(free_at), 0))
+
+        for job in sorted(self._queue, key=lambda j: j.score(now)):
+            index = min(range(len(free_at)), key=lambda i: free_at[i] or datetime.max)
+            if free_at[index] is None or job.expected_seconds is None:
+                break
+            free_at[index] += timedelta(seconds=job.expected_seconds)
+            etas[job.id] = free_at[index]
+        return etas
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return job metadata from memory, or from disk for jobs of a previous run"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            eta = self._etas().get(job_id) if job else None
+        if job:
+            return job.to_dict(eta)
+
+        job_file = self.jobs_dir / f"{Path(job_id).name}.json"
+        if job_file.exists():
+            with open(job_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return None
+
+    def list_jobs(self) -> List[Dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+            etas = self._etas()
+        return [job.to_dict(etas.get(job.id)) for job in sorted(jobs, key=lambda j: j.created_at, reverse=True)]
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        """
+        Cancel a queued or running job, or delete a finished one.
+
+        Returns the resulting status ("deleted" for finished jobs), or None
+        when the job is unknown. A running job returns "cancelling": its
+        cancel event is set, the converter's process tree is killed and
+        the job ends as cancelled (or completed, if it finished first).
+        """
+        job_file = self.jobs_dir / f"{Path(job_id).name}.json"
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                if job_file.exists():
+                    job_file.unlink()
+                    return "deleted"
+                return None
+            if job.finished:
+                del self._jobs[job_id]
+                job_file.unlink(missing_ok=True)
+                return "deleted"
+            if job.status == QUEUED:
+                self._queue.remove(job)
+                job.status = CANCELLED
+                job.finished_at = datetime.now()
+            elif job.status == RUNNING:
+                if not job.cancel_event.is_set():
+                    print(f"🛑 Cancelling running job {job.id}: {job.filename}")
+                job.cancel_event.set()
+        if job.status == RUNNING:
+            self._persist(job)
+            return "cancelling"
+        if job.status == CANCELLED and job.on_cancel:
+            job.on_cancel()
+        self._persist(job)
+        return job.status
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {state: sum(1 for j in jobs if j.status == state)
+                for state in (QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED)}
+
+    def wait_stats(self) -> Dict[str, Dict]:
+        """Per priority class: jobs waiting now and queue waits of recently started jobs"""
+        with self._lock:
+            waiting = {priority: sum(1 for j in self._queue if j.priority == priority)
+                       for priority in PRIORITY_CLASSES}
+            waits = {priority: sorted(samples) for priority, samples in self._waits.items()}
+        stats = {}
+        for priority in PRIORITY_CLASSES:
+            samples = waits[priority]
+            stats[priority] = {
+                "waiting": waiting[priority],
+                "started": len(samples),
+                "mean_wait_s": round(sum(samples) / len(samples), 2) if samples else None,
+                "p95_wait_s": round(samples[int(0.95 * (len(samples) - 1))], 2) if samples else None,
+                "max_wait_s": round(samples[-1], 2) if samples else None
+            }
+        return stats
+
+    def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT):
+        """
+        Stop the workers; jobs still queued are failed as interrupted on the next start
+
+        Running jobs are cancelled, so their converters do not outlive the
+        server as orphaned process trees.
+        """
+        with self._queue_changed:
+            self._stopped = True
+            running = [job for job in self._jobs.values() if job.status == RUNNING]
+            for job in running:
+                job.cancel_event.set()
+            self._queue_changed.notify_all()
+        deadline = time.time() + timeout
+        for worker in self._workers:
+            worker.join(max(deadline - time.time(), 0))
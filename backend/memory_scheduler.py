@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Memory-Budget Admission Scheduler
+=================================
+Keeps concurrent Node.js conversions within the machine's memory budget.
+
+Each conversion gets a memory plan from its IFC size: the Node.js heap
+flags and timeout of the existing size tiers, plus an estimated peak
+memory use. Jobs are admitted in arrival order while the sum of the
+running estimates fits the budget; the rest wait in the queue.
+
+The budget comes from QGEN_IMPFRAG_MEMORY_BUDGET_MB, or else the cgroup
+memory limit (v2 `memory.max`, v1 `memory.limit_in_bytes`), or else the
+host's MemTotal, minus QGEN_IMPFRAG_MEMORY_RESERVE_MB for everything that
+is not a conversion.
+
+A reservation is released as soon as its conversion ends, including a
+cancelled one (whose process tree has been killed by then), so the freed
+memory goes to the queued jobs right away. A job cancelled while it waits
+for admission leaves the queue with AdmissionCancelled.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from collections import deque
+from pathlib import Path
+from typing import Dict, Optional
+
+# Size tiers: (min IFC size in MB, Node.js flags, V8 heap limit in MB, timeout in seconds)
+NODE_MEMORY_TIERS = [
+    (50, ['--max-old-space-size=8192', '--max-semi-space-size=1024', '--expose-gc'], 8192, 3600),
+    (20, ['--max-old-space-size=4096', '--expose-gc'], 4096, 1800),
+    (0, [], 2048, 600),
+]
+
+# Resident memory of an idle Node.js process with web-ifc loaded
+NODE_BASELINE_MB = 300
+
+# Peak resident memory per MB of IFC input (web-ifc geometry + fragment buffers)
+PEAK_MB_PER_IFC_MB = float(os.getenv("QGEN_IMPFRAG_PEAK_MB_PER_IFC_MB", "40"))
+
+CGROUP_LIMIT_FILES = [
+    Path("/sys/fs/cgroup/memory.max"),                        # cgroup v2
+    Path("/sys/fs/cgroup/memory/memory.limit_in_bytes"),      # cgroup v1
+]
+
+
+class AdmissionCancelled(Exception):
+    """The job was cancelled while it waited for memory"""
+
+
+def node_memory_plan(file_size_mb: float) -> Dict:
+    """
+    Node.js flags, timeout and estimated peak memory for an IFC file
+    
+    The heap limit of the tier caps the V8 heap, so the estimate never
+    exceeds heap limit + baseline even for very large files.
+    """
+    for min_size_mb, node_options, heap_limit_mb, timeout in NODE_MEMORY_TIERS:
+        if file_size_mb > min_size_mb or min_size_mb == 0:
+            break
+    
+    estimated_peak_mb = NODE_BASELINE_MB + file_size_mb * PEAK_MB_PER_IFC_MB
+    estimated_peak_mb = min(estimated_peak_mb, heap_limit_mb + NODE_BASELINE_MB)
+    
+    return {
+        "node_options": list(node_options),
+        "heap_limit_mb": heap_limit_mb,
+        "timeout": timeout,
+        "estimated_peak_mb": int(estimated_peak_mb)
+    }
+
+
+def _read_cgroup_limit_mb() -> Optional[int]:
+    for limit_file in CGROUP_LIMIT_FILES:
+        try:
+            value = limit_file.read_text().strip()
+        except OSError:
+            continue
+        if value == "max":
+            return None
+        limit_mb = int(value) // (1024 * 1024)
+        # cgroup v1 reports an enormous number when unlimited
+        if limit_mb < 1024 * 1024 * 1024:
+            return limit_mb
+    return None
+
+
+def _read_host_memory_mb() -> Optional[int]:
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+def detect_memory_budget_mb() -> int:
+    """Memory available to conversions, in MB"""
+    configured = os.getenv("QGEN_IMPFRAG_MEMORY_BUDGET_MB")
+    if configured:
+        return int(configured)
+    
+    total_mb = _read_cgroup_limit_mb() or _read_host_memory_mb() or 8192
+    reserve_mb = int(os.getenv("QGEN_IMPFRAG_MEMORY_RESERVE_MB", "1024"))
+    return max(total_mb - reserve_mb, NODE_BASELINE_MB)
+
+
+class MemoryBudgetScheduler:
+    """
+    FIFO admission control over a shared memory budget
+    """
+    
+    def __init__(self, budget_mb: Optional[int] = None):
+        self.budget_mb = budget_mb or detect_memory_budget_mb()
+        self._condition = threading.Condition()
+        self._queue = deque()
+        self._running: Dict[int, Dict] = {}
+        self._reserved_mb = 0
+        self._next_ticket = 0
+    
+    @contextmanager
+    def admit(self, estimated_peak_mb: int, label: str = "", cancel_event: Optional[threading.Event] = None):
+        """
+        Block until the job fits in the budget, then hold its reservation
+        
+        Raises AdmissionCancelled when `cancel_event` is set while waiting.
+        
+        A job larger than the whole budget is admitted once nothing else is
+        running, so oversized files still convert (alone).
+        """
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._queue.append(ticket)
+            queued_at = time.time()
+            
+            if self._queue[0] != ticket or not self._fits(estimated_peak_mb):
+                print(f"⏳ Queued {label or 'conversion'} (~{estimated_peak_mb} MB): "
+                      f"{self._reserved_mb}/{self.budget_mb} MB reserved, {len(self._queue) - 1} ahead")
+            
+            while self._queue[0] != ticket or not self._fits(estimated_peak_mb):
+                if cancel_event is not None and cancel_event.is_set():
+                    self._queue.remove(ticket)
+                    # The job behind this one may be first in line now
+                    self._condition.notify_all()
+                    raise AdmissionCancelled(f"{label or 'Conversion'} cancelled while queued for memory")
+                self._condition.wait(0.5 if cancel_event is not None else None)
+            
+            self._queue.popleft()
+            self._reserved_mb += estimated_peak_mb
+            self._running[ticket] = {
+                "label": label,
+                "estimated_peak_mb": estimated_peak_mb,
+                "waited_seconds": round(time.time() - queued_at, 2)
+            }
+            # The next job in line may fit as well
+            self._condition.notify_all()
+        
+        try:
+            yield self._running[ticket]
+        finally:
+            with self._condition:
+                self._reserved_mb -= estimated_peak_mb
+                del self._running[ticket]
+                self._condition.notify_all()
+    
+    def _fits(self, estimated_peak_mb: int) -> bool:
+        if not self._running:
+            return True
+        return self._reserved_mb + estimated_peak_mb <= self.budget_mb
+    
+    def snapshot(self) -> Dict:
+        """Current reservations, for status endpoints"""
+        with self._condition:
+            return {
+                "budget_mb": self.budget_mb,
+                "reserved_mb": self._reserved_mb,
+                "running": list(self._running.values()),
+                "queued": len(self._queue)
+            }
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Prometheus Metrics
+==================
+`/metrics` endpoint in Prometheus text format for the Flask backends
+(app.py and QgenImpfragProcessor).
+
+- HTTP request latency per method / route / status
+- Conversion duration and input size per converter
+- Conversion outcomes (success / failure / timeout / cancelled) per converter
+- In-flight conversions per converter
+- Job queue wait time per priority class
+- Fragment bytes served
+- Queue depth gauges read at scrape time (jobs, memory admission)
+
+prometheus_client metrics are thread-safe, so this works under Flask
+`threaded=True`. Under gunicorn with several workers, set
+PROMETHEUS_MULTIPROC_DIR to an empty directory before start-up; the
+endpoint then aggregates all workers, and a gunicorn config should call
+`mark_worker_dead(worker.pid)` from its `child_exit` hook. Scrape-time
+gauges only see the process that answers the scrape.
+    
+    init_metrics(app)
+    
+    with track_conversion("node", input_bytes) as conversion:
+        result = convert(...)
+        conversion.result(result)
+"""
+
+import os
+import subprocess
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+from flask import Response, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               REGISTRY, generate_latest, multiprocess)
+from prometheus_client.core import GaugeMetricFamily
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_LATENCY = Histogram(
+    "xsba_http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+CONVERSION_DURATION = Histogram(
+    "xsba_conversion_duration_seconds", "IFC to fragments conversion duration",
+    ["converter"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+)
+CONVERSION_INPUT_BYTES = Histogram(
+    "xsba_conversion_input_bytes", "IFC input size per conversion",
+    ["converter"],
+    buckets=tuple(mb * 1024 * 1024 for mb in (1, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000))
+)
+CONVERSIONS = Counter(
+    "xsba_conversions_total", "Conversions by outcome",
+    ["converter", "outcome"]
+)
+CONVERSIONS_IN_FLIGHT = Gauge(
+    "xsba_conversions_in_flight", "Conversions currently running",
+    ["converter"], multiprocess_mode="livesum"
+)
+QUEUE_WAIT = Histogram(
+    "xsba_job_queue_wait_seconds", "Time conversion jobs waited in the job queue",
+    ["priority"],
+    buckets=(0.1, 1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+)
+FRAGMENT_BYTES_SERVED = Counter(
+    "xsba_fragment_bytes_served_total", "Fragment bytes sent to clients (full and partial responses)"
+)
+
+
+class _CallbackCollector:
+    """Gauges whose values are read when the endpoint is scraped"""
+    
+    def __init__(self):
+        self.callbacks: Dict[str, tuple] = {}
+    
+    def collect(self):
+        for name, (documentation, callback, label) in self.callbacks.items():
+            try:
+                values = callback()
+            except Exception:
+                continue
+            if isinstance(values, dict):
+                family = GaugeMetricFamily(name, documentation, labels=[label])
+                for key, value in values.items():
+                    family.add_metric([key], value)
+            else:
+                family = GaugeMetricFamily(name, documentation, value=values)
+            yield family
+
+
+_callbacks = _CallbackCollector()
+
+
+def register_gauge(name: str, documentation: str, callback: Callable, label: str = "state"):
+    """Scrape-time gauge; the callback returns a number or {label value: number}"""
+    _callbacks.callbacks[name] = (documentation, callback, label)
+
+
+class ConversionTracker:
+    """Outcome of the conversion being tracked"""
+    
+    def __init__(self):
+        self.outcome = "failure"
+    
+    def result(self, result: Dict):
+        """Classify a converter result dict as success / timeout / cancelled / failure"""
+        if result.get("success"):
+            self.outcome = "success"
+        elif result.get("cancelled"):
+            self.outcome = "cancelled"
+        elif "timeout" in result or "timed out" in str(result.get("error", "")).lower():
+            self.outcome = "timeout"
+        else:
+            self.outcome = "failure"
+
+
+@contextmanager
+def track_conversion(converter: str, input_bytes: int = None):
+    """Time one conversion and count its outcome; exceptions count as failures (or timeouts)"""
+    tracker = ConversionTracker()
+    if input_bytes is not None:
+        CONVERSION_INPUT_BYTES.labels(converter).observe(input_bytes)
+    CONVERSIONS_IN_FLIGHT.labels(converter).inc()
+    start = time.perf_counter()
+    try:
+        yield tracker
+    except subprocess.TimeoutExpired:
+        tracker.outcome = "timeout"
+        raise
+    finally:
+        CONVERSIONS_IN_FLIGHT.labels(converter).dec()
+        CONVERSION_DURATION.labels(converter).observe(time.perf_counter() - start)
+        CONVERSIONS.labels(converter, tracker.outcome).inc()
+
+
+def observe_queue_wait(priority: str, seconds: float):
+    """JobManager on_dispatch hook"""
+    QUEUE_WAIT.labels(priority).observe(seconds)
+
+
+def count_fragment_bytes(response):
+    """Add the body size of a 200/206 fragment response to the served bytes"""
+    if response.status_code in (200, 206) and response.content_length:
+        FRAGMENT_BYTES_SERVED.inc(response.content_length)
+    return response
+
+
+def metrics_response() -> Response:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_callbacks)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def mark_worker_dead(pid: int):
+    """gunicorn child_exit hook: drop a dead worker's live gauges"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid)
+
+
+def init_metrics(app):
+    """Register request timing hooks and the /metrics route on a Flask app"""
+    
+    @app.before_request
+    def start_request_timer():
+        g.metrics_start = time.perf_counter()
+    
+    @app.after_request
+    def observe_request_latency(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "<unmatched>"
+            REQUEST_LATENCY.labels(request.method, route, str(response.status_code)).observe(
+                time.perf_counter() - start
+            )
+        return response
+    
+    app.add_url_rule("/metrics", "metrics", metrics_response, methods=["GET"])
+
+
+if not MULTIPROCESS:
+    REGISTRY.register(_callbacks)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Conversion Resource Monitor
+===========================
+Samples the resource use of a conversion's process tree from `/proc`, so
+that the Node.js heap tiers can be checked against what conversions
+actually use instead of being guessed.
+
+A background thread follows the root process and all its descendants at a
+fixed interval and records, summed over the tree:
+
+- resident memory (`/proc/<pid>/statm`)
+- CPU time, including reaped children (`/proc/<pid>/stat`)
+- storage read / write bytes (`/proc/<pid>/io`)
+
+Each sample costs three small file reads per process, and the number of
+stored samples is capped (older samples are thinned out as a run gets
+longer), so the monitor is cheap enough to leave on in production. The
+interval comes from QGEN_IMPFRAG_MONITOR_INTERVAL (seconds, 0 disables).
+On systems without `/proc` the monitor reports nothing.
+
+    completed, usage = run_monitored(cmd, timeout=600, text=True, on_line=log_line)
+    usage["peak_rss_mb"], usage["cpu_seconds"], usage["samples"]
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(str(Path(__file__).parent.parent / "frag_convert"))
+from output_capture import run_streaming
+
+PROC_DIR = Path("/proc")
+MONITOR_INTERVAL = float(os.getenv("QGEN_IMPFRAG_MONITOR_INTERVAL", "1.0"))
+MAX_SAMPLES = 300
+SAMPLE_FIELDS = ["t", "rss_mb", "cpu_percent", "read_mb", "write_mb", "processes"]
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_MB = 1024 * 1024
+
+
+def monitoring_available() -> bool:
+    return MONITOR_INTERVAL > 0 and (PROC_DIR / "self" / "stat").exists()
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text()
+    except OSError:
+        return None
+
+
+def _children(pid: int) -> List[int]:
+    """Direct children from /proc/<pid>/task/<tid>/children"""
+    children = []
+    try:
+        tasks = list((PROC_DIR / str(pid) / "task").iterdir())
+    except OSError:
+        return children
+    for task in tasks:
+        text = _read(task / "children")
+        if text:
+            children.extend(int(child) for child in text.split())
+    return children
+
+
+def process_tree(pid: int) -> List[int]:
+    """The process and all its live descendants"""
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(_children(current))
+    return tree
+
+
+def read_process(pid: int) -> Optional[Tuple[int, float, int, int]]:
+    """(rss bytes, cpu seconds incl. reaped children, read bytes, write bytes)"""
+    proc = PROC_DIR / str(pid)
+    stat = _read(proc / "stat")
+    statm = _read(proc / "statm")
+    if not stat or not statm:
+        return None
+
+    # Fields after the parenthesised command name; utime is field 14
+    fields = stat[stat.rfind(")") + 2:].split()
+    cpu_ticks = sum(int(value) for value in fields[11:15])
+    rss = int(statm.split()[1]) * _PAGE_SIZE
+
+    read_bytes = write_bytes = 0
+    for line in (_read(proc / "io") or "").splitlines():
+        key, _, value = line.partition(":")
+        if key == "read_bytes":
+            read_bytes = int(value)
+        elif key == "write_bytes":
+            write_bytes = int(value)
+    return rss, cpu_ticks / _CLOCK_TICKS, read_bytes, write_bytes
+
+
+class ProcessTreeMonitor:
+    """
+    Samples a process tree in a background thread until stopped
+    """
+
+    def __init__(self, pid: int, interval: float = MONITOR_INTERVAL, max_samples: int = MAX_SAMPLES):
+        self.pid = pid
+        self.interval = interval
+        self.max_samples = max_samples
+        self.samples: List[List[float]] = []
+        self.peak_rss = 0
+        self.peak_cpu_percent = 0.0
+        self.peak_processes = 0
+        self._stride = 1
+        self._tick = 0
+        self._baseline = None
+        self._last = None
+        self._totals = (0.0, 0, 0)
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    def sample(self):
+        """Take one sample of the tree (also called by the thread)"""
+        now = time.time()
+        rss = 0
+        cpu = 0.0
+        read_bytes = write_bytes = 0
+        processes = 0
+        for pid in process_tree(self.pid):
+            usage = read_process(pid)
+            if usage is None:
+                continue
+            processes += 1
+            rss += usage[0]
+            cpu += usage[1]
+            read_bytes += usage[2]
+            write_bytes += usage[3]
+        if not processes:
+            return
+
+        # Counters are relative to the first sample, so long-lived
+        # processes (pool workers) report only what this job used
+        if self._baseline is None:
+            self._baseline = (cpu, read_bytes, write_bytes)
+            self._last = (now, cpu)
+        cpu_seconds = max(cpu - self._baseline[0], self._totals[0])
+        read_total = max(read_bytes - self._baseline[1], self._totals[1])
+        write_total = max(write_bytes - self._baseline[2], self._totals[2])
+        self._totals = (cpu_seconds, read_total, write_total)
+
+        elapsed = now - self._last[0]
+        cpu_percent = (cpu - self._last[1]) / elapsed * 100 if elapsed > 0 else 0.0
+        self._last = (now, cpu)
+
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_cpu_percent = max(self.peak_cpu_percent, cpu_percent)
+        self.peak_processes = max(self.peak_processes, processes)
+
+        self._tick += 1
+        if self._tick % self._stride == 0:
+            self.samples.append([
+                round(now - self._started_at, 2),
+                round(rss / _MB, 1),
+                round(cpu_percent, 1),
+                round(read_total / _MB, 2),
+                round(write_total / _MB, 2),
+                processes
+            ])
+            if len(self.samples) >= self.max_samples:
+                # Keep every other sample and halve the recording rate
+                self.samples = self.samples[::2]
+                self._stride *= 2
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self) -> "ProcessTreeMonitor":
+        self._started_at = time.time()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name=f"monitor-{self.pid}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Dict:
+        """Stop sampling and return the usage summary"""
+        self.sample()
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.summary()
+
+    def summary(self) -> Dict:
+        duration = time.time() - self._started_at if self._started_at else 0
+        cpu_seconds, read_bytes, write_bytes = self._totals
+        return {
+            "interval_s": self.interval,
+            "duration_s": round(duration, 2),
+            "peak_rss_mb": round(self.peak_rss / _MB, 1),
+            "peak_processes": self.peak_processes,
+            "cpu_seconds": round(cpu_seconds, 2),
+            "avg_cpu_percent": round(cpu_seconds / duration * 100, 1) if duration else 0.0,
+            "peak_cpu_percent": round(self.peak_cpu_percent, 1),
+            "read_mb": round(read_bytes / _MB, 2),
+            "write_mb": round(write_bytes / _MB, 2),
+            "sample_fields": SAMPLE_FIELDS,
+            "samples": self.samples
+        }
+
+
+def monitor_process(pid: int, interval: float = MONITOR_INTERVAL) -> Optional[ProcessTreeMonitor]:
+    """Start a monitor for a running process, or None when monitoring is off"""
+    if not monitoring_available() or interval <= 0:
+        return None
+    return ProcessTreeMonitor(pid, interval).start()
+
+
+def run_monitored(cmd, timeout: Optional[float] = None, **kwargs) -> Tuple[subprocess.CompletedProcess, Optional[Dict]]:
+    """
+    subprocess.run() that also samples the child's process tree
+
+    Output is read through output_capture.run_streaming, so stdout / stderr
+    are bounded tails and `on_line` / `tail_kb` / `nice` / `cancel_event`
+    are accepted next to subprocess.run's keywords. Returns
+    (CompletedProcess, usage summary or None); on timeout the whole process
+    tree is killed and TimeoutExpired is raised as with run(), on cancel
+    ConversionCancelled.
+    """
+    monitor = None
+
+    def start_monitor(process):
+        nonlocal monitor
+        monitor = monitor_process(process.pid)
+
+    try:
+        result = run_streaming(cmd, timeout=timeout, on_start=start_monitor, **kwargs)
+    finally:
+        usage = monitor.stop() if monitor else None
+    return result, usage
+
+
+def describe_usage(usage: Optional[Dict]) -> str:
+    """One-line summary for logs"""
+    if not usage:
+        return "resource monitoring unavailable"
+    return (f"peak RSS {usage['peak_rss_mb']} MB, CPU {usage['cpu_seconds']}s "
+            f"(avg {usage['avg_cpu_percent']}%), read {usage['read_mb']} MB, "
+            f"write {usage['write_mb']} MB, {usage['peak_processes']} process(es)")
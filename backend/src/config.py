@@ -51,8 +51,38 @@ class Config:
         
         # Processing options
         self.WATCH_ENABLED = os.getenv("QGEN_IMPFRAG_WATCH_ENABLED", "false").lower() == "true"
+        self.WATCH_QUIET_SECONDS = float(os.getenv("QGEN_IMPFRAG_WATCH_QUIET_SECONDS", "2"))
+        self.WATCH_WORKERS = int(os.getenv("QGEN_IMPFRAG_WATCH_WORKERS", "1"))
         self.AUTO_CONVERT = os.getenv("QGEN_IMPFRAG_AUTO_CONVERT", "true").lower() == "true"
         self.MAX_FILE_SIZE_MB = int(os.getenv("QGEN_IMPFRAG_MAX_FILE_SIZE_MB", "500"))
+        self.MAX_CHUNKED_UPLOAD_MB = int(os.getenv("QGEN_IMPFRAG_MAX_CHUNKED_UPLOAD_MB", "5120"))
+        self.UPLOAD_CHUNK_MB = int(os.getenv("QGEN_IMPFRAG_UPLOAD_CHUNK_MB", "8"))
+        
+        # Warm converter worker pool (0 disables the pool)
+        self.POOL_SIZE = int(os.getenv("QGEN_IMPFRAG_POOL_SIZE", "2"))
+        self.POOL_MAX_JOBS = int(os.getenv("QGEN_IMPFRAG_POOL_MAX_JOBS", "50"))
+        self.POOL_MAX_HEAP_MB = int(os.getenv("QGEN_IMPFRAG_POOL_MAX_HEAP_MB", "2048"))
+        self.POOL_MAX_FILE_MB = float(os.getenv("QGEN_IMPFRAG_POOL_MAX_FILE_MB", "20"))
+        
+        # Asynchronous conversion jobs
+        self.JOB_WORKERS = int(os.getenv("QGEN_IMPFRAG_JOB_WORKERS", "2"))
+        
+        # Memory admission (unset: cgroup memory.max or host MemTotal minus reserve)
+        self.MEMORY_BUDGET_MB = int(os.getenv("QGEN_IMPFRAG_MEMORY_BUDGET_MB", "0")) or None
+        self.MEMORY_RESERVE_MB = int(os.getenv("QGEN_IMPFRAG_MEMORY_RESERVE_MB", "1024"))
+        
+        # Content-addressed conversion cache (LRU-evicted above CACHE_MAX_MB)
+        self.CACHE_DIR = Path(os.getenv(
+            "QGEN_IMPFRAG_CACHE_DIR",
+            self.PROJECT_ROOT / "data" / "cache"
+        ))
+        self.CACHE_MAX_MB = int(os.getenv("QGEN_IMPFRAG_CACHE_MAX_MB", "10240"))
+        
+        # Append-only SQLite conversion history
+        self.HISTORY_DB = Path(os.getenv(
+            "QGEN_IMPFRAG_HISTORY_DB",
+            self.PROJECT_ROOT / "data" / "conversion_history.db"
+        ))
         
         # Logging
         self.LOG_LEVEL = os.getenv("QGEN_IMPFRAG_LOG_LEVEL", "INFO")
@@ -90,8 +120,22 @@ class Config:
             "port": self.PORT,
             "debug": self.DEBUG,
             "watch_enabled": self.WATCH_ENABLED,
+            "watch_quiet_seconds": self.WATCH_QUIET_SECONDS,
+            "watch_workers": self.WATCH_WORKERS,
             "auto_convert": self.AUTO_CONVERT,
             "max_file_size_mb": self.MAX_FILE_SIZE_MB,
+            "max_chunked_upload_mb": self.MAX_CHUNKED_UPLOAD_MB,
+            "upload_chunk_mb": self.UPLOAD_CHUNK_MB,
+            "pool_size": self.POOL_SIZE,
+            "pool_max_jobs": self.POOL_MAX_JOBS,
+            "pool_max_heap_mb": self.POOL_MAX_HEAP_MB,
+            "pool_max_file_mb": self.POOL_MAX_FILE_MB,
+            "job_workers": self.JOB_WORKERS,
+            "memory_budget_mb": self.MEMORY_BUDGET_MB,
+            "memory_reserve_mb": self.MEMORY_RESERVE_MB,
+            "cache_dir": str(self.CACHE_DIR),
+            "cache_max_mb": self.CACHE_MAX_MB,
+            "history_db": str(self.HISTORY_DB),
             "log_level": self.LOG_LEVEL,
             "frag_convert_dir": str(self.FRAG_CONVERT_DIR)
         }
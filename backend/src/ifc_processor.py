@@ -35,11 +35,12 @@ import argparse
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional, Any
-import subprocess
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Web framework imports
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 import click
 
@@ -58,6 +59,21 @@ sys.path.append(str(BACKEND_DIR))
 # Node.js converter integration
 CONVERTER_SCRIPT = BACKEND_DIR / "ifc_converter.js"
 
+from memory_scheduler import MemoryBudgetScheduler, node_memory_plan
+from conversion_cache import ConversionCache, converter_version
+from fragment_serving import send_fragment
+from resource_monitor import run_monitored, describe_usage
+from metrics import init_metrics, register_gauge, track_conversion
+
+# Shared stdlib helpers that ship with the portable frag_convert package
+sys.path.append(str(BACKEND_DIR.parent / "frag_convert"))
+from conversion_history import ConversionHistory
+from duration_model import DurationModel
+from ifc_prescan import describe, prescan
+
+# History sources whose durations predict this processor's conversions (same converter script)
+DURATION_SOURCES = ["processor_node", "backend_node"]
+
 
 class Config(BaseSettings):
     """Application configuration with environment variable support"""
@@ -77,7 +93,13 @@ class Config(BaseSettings):
     # Processing options
     watch_enabled: bool = False
     auto_convert: bool = True
+    watch_quiet_seconds: float = 2.0  # Events per file are coalesced until it is quiet this long
+    watch_workers: int = 1
     max_file_size_mb: int = 500
+    memory_budget_mb: Optional[int] = None  # Default: cgroup limit or host memory
+    cache_dir: Path = Field(default_factory=lambda: Path("/data/XVUE/XQG4_AXIS/QGEN_IMPFRAG/data/cache"))
+    cache_max_mb: int = 10240
+    history_db: Optional[Path] = None  # Default: <reports_dir>/conversion_history.db
     
     # Logging
     log_level: str = "INFO"
@@ -107,24 +129,115 @@ class ConversionStatus(BaseModel):
 
 
 class IfcFileHandler(FileSystemEventHandler):
-    """File system event handler for automatic IFC processing"""
+    """
+    File system event handler for automatic IFC processing
+    
+    Events are coalesced per path: every event restarts the path's quiet
+    period, and once it elapses the file must also report the same size and
+    mtime on two consecutive checks before it is considered fully written.
+    Stable files are handed to a worker pool, so the observer thread never
+    blocks on a conversion.
+    """
     
-    def __init__(self, processor):
+    def __init__(self, processor, quiet_period: float = 2.0, workers: int = 1):
         self.processor = processor
         self.logger = logging.getLogger(__name__)
+        self.quiet_period = quiet_period
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ifc-watch")
+        
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        # path -> {"last_event": time of the latest event, "signature": (size, mtime) at the last check}
+        self._pending: Dict[str, Dict] = {}
+        # Paths queued or converting; new events for them wait until the run finishes
+        self._active: set = set()
+        self._debouncer = threading.Thread(target=self._debounce_loop, name="ifc-watch-debounce", daemon=True)
+        self._debouncer.start()
+    
+    def _is_ifc(self, path: str) -> bool:
+        return path.lower().endswith('.ifc')
+    
+    def _schedule(self, path: str):
+        with self._lock:
+            entry = self._pending.setdefault(path, {"signature": None})
+            entry["last_event"] = time.monotonic()
+        self._wakeup.set()
     
     def on_created(self, event):
-        if not event.is_dir and event.src_path.lower().endswith('.ifc'):
+        if not event.is_directory and self._is_ifc(event.src_path):
             self.logger.info(f"📁 New IFC file detected: {event.src_path}")
-            # Add a small delay to ensure file is fully written
-            time.sleep(2)
-            self.processor.convert_file(Path(event.src_path))
+            self._schedule(event.src_path)
     
     def on_modified(self, event):
-        if not event.is_dir and event.src_path.lower().endswith('.ifc'):
-            self.logger.info(f"📝 IFC file modified: {event.src_path}")
-            time.sleep(2)
-            self.processor.convert_file(Path(event.src_path))
+        if not event.is_directory and self._is_ifc(event.src_path):
+            self.logger.debug(f"📝 IFC file modified: {event.src_path}")
+            self._schedule(event.src_path)
+    
+    def on_moved(self, event):
+        # Copy tools often write a temporary name and rename it when done
+        if not event.is_directory and self._is_ifc(event.dest_path):
+            self.logger.info(f"📁 IFC file moved into place: {event.dest_path}")
+            self._schedule(event.dest_path)
+    
+    def _file_signature(self, path: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+    
+    def _debounce_loop(self):
+        while not self._stopped:
+            ready = []
+            next_check = self.quiet_period
+            now = time.monotonic()
+            
+            with self._lock:
+                for path, entry in list(self._pending.items()):
+                    if path in self._active:
+                        continue
+                    remaining = entry["last_event"] + self.quiet_period - now
+                    if remaining > 0:
+                        next_check = min(next_check, remaining)
+                        continue
+                    
+                    signature = self._file_signature(path)
+                    if signature is None:
+                        # Deleted (or renamed away) before it settled
+                        del self._pending[path]
+                    elif signature != entry["signature"]:
+                        # Still growing without events (or first check): look again after a quiet period
+                        entry["signature"] = signature
+                        entry["last_event"] = now
+                    else:
+                        del self._pending[path]
+                        self._active.add(path)
+                        ready.append(path)
+            
+            for path in ready:
+                self.logger.info(f"📥 IFC file stable, queued for conversion: {path}")
+                self.executor.submit(self._convert, path)
+            
+            self._wakeup.wait(timeout=max(next_check, 0.1))
+            self._wakeup.clear()
+    
+    def _convert(self, path: str):
+        try:
+            self.processor.convert_file(Path(path))
+        except Exception as e:
+            self.logger.error(f"❌ Watched conversion failed for {path}: {e}")
+        finally:
+            with self._lock:
+                self._active.discard(path)
+            self._wakeup.set()
+    
+    def stop(self):
+        """Stop debouncing and wait for queued conversions to finish"""
+        self._stopped = True
+        self._wakeup.set()
+        self._debouncer.join(timeout=5)
+        self.executor.shutdown(wait=True)
 
 
 class QgenImpfragProcessor:
@@ -134,12 +247,20 @@ class QgenImpfragProcessor:
         self.config = config
         self.logger = self._setup_logging()
         self.conversion_status: Dict[str, ConversionStatus] = {}
+        self.memory_scheduler = MemoryBudgetScheduler(config.memory_budget_mb)
         self.setup_directories()
+        self.conversion_cache = ConversionCache(config.cache_dir, config.cache_max_mb)
+        self.converter_version = converter_version(CONVERTER_SCRIPT)
+        
+        # Conversion durations are recorded and fitted to set the converter timeout
+        self.conversion_history = ConversionHistory(config.history_db or config.reports_dir / "conversion_history.db")
+        self.duration_model = DurationModel(self.conversion_history)
         
         # Initialize Flask app
         self.app = Flask(__name__)
         CORS(self.app)
         self.setup_routes()
+        self.setup_metrics()
         
         # File watcher
         self.observer = None
@@ -188,14 +309,27 @@ class QgenImpfragProcessor:
     def setup_file_watcher(self):
         """Setup file system monitoring for automatic processing"""
         self.observer = Observer()
-        event_handler = IfcFileHandler(self)
+        self.file_handler = IfcFileHandler(
+            self,
+            quiet_period=self.config.watch_quiet_seconds,
+            workers=self.config.watch_workers
+        )
         self.observer.schedule(
-            event_handler, 
+            self.file_handler, 
             str(self.config.ifc_input_dir), 
             recursive=False
         )
         self.logger.info(f"👀 File watcher configured for: {self.config.ifc_input_dir}")
     
+    def setup_metrics(self):
+        """Prometheus /metrics with conversion status and memory admission gauges"""
+        init_metrics(self.app)
+        register_gauge("xsba_processor_conversions", "Tracked conversions by status",
+                       lambda: {state: sum(1 for s in list(self.conversion_status.values()) if s.status == state)
+                                for state in ("processing", "completed", "failed")})
+        register_gauge("xsba_memory_admission_queued", "Conversions waiting for memory admission",
+                       lambda: self.memory_scheduler.snapshot()["queued"])
+    
     def setup_routes(self):
         """Configure Flask API routes"""
         
@@ -247,9 +381,9 @@ class QgenImpfragProcessor:
         @self.app.route('/api/fragments/<filename>', methods=['GET'])
         def download_fragment(filename):
             """Download a fragments file"""
-            fragment_file = self.config.fragments_output_dir / filename
+            fragment_file = self.config.fragments_output_dir / Path(filename).name
             if fragment_file.exists():
-                return send_file(fragment_file, as_attachment=True)
+                return send_fragment(fragment_file, as_attachment=True)
             return jsonify({"error": "Fragment file not found"}), 404
     
     def convert_file(self, ifc_file: Path, force_reconvert: bool = False, output_filename: str = None) -> ConversionStatus:
@@ -258,7 +392,8 @@ class QgenImpfragProcessor:
         output_filename = output_filename or f"{ifc_file.stem}.frag"
         output_file = self.config.fragments_output_dir / output_filename
         
-        # Check if already converted
+        # Check if already converted (the cache key, a full read of the IFC,
+        # is only computed when a conversion is actually needed)
         if output_file.exists() and not force_reconvert:
             self.logger.info(f"✅ Fragment already exists for {filename}, skipping conversion")
             status = ConversionStatus(
@@ -283,30 +418,32 @@ class QgenImpfragProcessor:
         try:
             self.logger.info(f"🔄 Starting conversion of {filename}")
             
-            # Use the Node.js converter script
-            cmd = [
-                "node", 
-                str(CONVERTER_SCRIPT),
-                "--input", str(ifc_file),
-                "--output", str(output_file)
-            ]
-            
-            self.logger.info(f"Running converter: {' '.join(cmd)}")
+            # Truncated / non-STEP / unsupported schema files fail in milliseconds
+            # (the same pass hashes the file for the cache key and the history)
+            scan = prescan(ifc_file, sha256=True)
+            if not scan["valid"]:
+                raise Exception(f"Invalid IFC file: {'; '.join(scan['errors'])}")
+            self.logger.info(f"🔎 {filename}: {describe(scan)}")
             
-            # Run the Node.js converter
-            result = subprocess.run(
-                cmd,
-                cwd=str(BACKEND_DIR),
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
-            )
-            
-            if result.returncode != 0:
-                error_msg = result.stderr.strip() or result.stdout.strip() or "Unknown conversion error"
-                raise Exception(f"Converter failed: {error_msg}")
-            
-            self.logger.info(f"Converter output: {result.stdout.strip()}")
+            # Identical IFC content (under any file name) is converted once;
+            # force_reconvert bypasses the cache and refreshes the stored object
+            cache_key = self.conversion_cache.key_for(ifc_file, self.converter_version,
+                                                      {"converter": CONVERTER_SCRIPT.name}, scan["sha256"])
+            if force_reconvert:
+                output_file.unlink(missing_ok=True)
+                outcome = {"cache": "miss", **self._run_converter(ifc_file, output_file, scan["entities"], scan["sha256"])}
+                if outcome["success"]:
+                    self.conversion_cache.store(cache_key, output_file, filename)
+            else:
+                outcome = self.conversion_cache.get_or_convert(
+                    cache_key, output_file,
+                    lambda: self._run_converter(ifc_file, output_file, scan["entities"], scan["sha256"]),
+                    source_name=filename
+                )
+            if not outcome["success"]:
+                raise Exception(outcome["error"])
+            if outcome["cache"] != "miss":
+                self.logger.info(f"⚡ Reused cached fragment for {filename} ({outcome['cache']})")
             
             # Check if conversion was successful
             if output_file.exists():
@@ -336,6 +473,83 @@ class QgenImpfragProcessor:
         self.conversion_status[filename] = status
         return status
     
+    def _run_converter(self, ifc_file: Path, output_file: Path, entities: Optional[int] = None,
+                       content_hash: Optional[str] = None) -> Dict:
+        """Run the Node.js converter for one file; raises if the converter fails"""
+        started = time.time()
+        result = None
+        try:
+            with track_conversion("processor_node", ifc_file.stat().st_size) as conversion:
+                result = self._execute_converter(ifc_file, output_file, entities)
+                conversion.result(result)
+        finally:
+            self._record_conversion(ifc_file, output_file, entities, time.time() - started, result, content_hash)
+        return result
+    
+    def _record_conversion(self, ifc_file: Path, output_file: Path, entities: int, duration: float,
+                           result: Optional[Dict], content_hash: Optional[str] = None):
+        """Append a converter run to the history the duration model is fitted on"""
+        success = bool(result and result.get("success"))
+        try:
+            self.conversion_history.record(
+                "processor_node", ifc_file.name, "success" if success else "failed",
+                duration_s=round(duration, 3),
+                ifc_path=ifc_file,
+                ifc_sha256=content_hash,
+                output_path=output_file if success else None,
+                peak_memory_mb=((result or {}).get("resources") or {}).get("peak_rss_mb"),
+                converter_version=self.converter_version,
+                ifc_entities=entities
+            )
+        except Exception as e:
+            self.logger.warning(f"Could not record conversion history: {e}")
+    
+    def _log_converter_line(self, stream: str, line: str):
+        """Forward converter output to the log as it arrives"""
+        if not line.strip():
+            return
+        if stream == "stderr":
+            self.logger.warning(f"Converter: {line}")
+        else:
+            self.logger.info(f"Converter: {line}")
+    
+    def _execute_converter(self, ifc_file: Path, output_file: Path, entities: Optional[int] = None) -> Dict:
+        # Heap flags and memory estimate come from the file size tiers
+        plan = node_memory_plan(ifc_file.stat().st_size / (1024 * 1024))
+        
+        # Timeout from the predicted duration; the tier timeout until there is history
+        timeout = self.duration_model.timeout(ifc_file.stat().st_size, entities, DURATION_SOURCES,
+                                              default=plan["timeout"])
+        
+        # Use the Node.js converter script
+        cmd = [
+            "node", 
+            *plan["node_options"],
+            str(CONVERTER_SCRIPT),
+            "--input", str(ifc_file),
+            "--output", str(output_file)
+        ]
+        
+        self.logger.info(f"Running converter: {' '.join(cmd)} (timeout {timeout}s)")
+        
+        # Run the Node.js converter once its memory estimate fits the budget
+        with self.memory_scheduler.admit(plan["estimated_peak_mb"], ifc_file.name):
+            result, resources = run_monitored(
+                cmd,
+                cwd=str(BACKEND_DIR),
+                text=True,
+                on_line=self._log_converter_line,
+                timeout=timeout
+            )
+        self.logger.info(f"Converter resources: {describe_usage(resources)} (heap limit {plan['heap_limit_mb']} MB)")
+        
+        if result.returncode != 0:
+            error_msg = result.stderr.strip() or result.stdout.strip() or "Unknown conversion error"
+            raise Exception(f"Converter failed: {error_msg}")
+        
+        return {"success": output_file.exists(), "error": "Conversion completed but output file not found",
+                "resources": resources}
+    
     def convert_all_files(self):
         """Convert all IFC files in the input directory"""
         ifc_files = list(self.config.ifc_input_dir.glob("*.ifc"))
@@ -362,6 +576,7 @@ class QgenImpfragProcessor:
         if self.observer:
             self.observer.stop()
             self.observer.join()
+            self.file_handler.stop()
             self.logger.info("🛑 File watcher stopped")
     
     def run_server(self):
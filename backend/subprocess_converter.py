@@ -12,15 +12,21 @@ import subprocess
 import tempfile
 import json
 import time
+import contextlib
 from pathlib import Path
 from typing import Dict, Optional
 
+from converter_pool import ConverterWorkerPool
+from memory_scheduler import MemoryBudgetScheduler, node_memory_plan
+from resource_monitor import run_monitored, describe_usage
+
 class XFRGSubprocessConverter:
     """
     Standalone subprocess converter for XFRG using ThatOpen Components
     """
     
-    def __init__(self):
+    def __init__(self, pool: Optional[ConverterWorkerPool] = None,
+                 scheduler: Optional[MemoryBudgetScheduler] = None):
         self.backend_dir = Path(__file__).parent
         self.project_root = self.backend_dir.parent
         self.converter_script = self.backend_dir / "ifc_converter.js"
@@ -28,6 +34,24 @@ class XFRGSubprocessConverter:
         # Validate that the JavaScript converter exists
         if not self.converter_script.exists():
             raise FileNotFoundError(f"JavaScript converter not found: {self.converter_script}")
+        
+        # Optional warm worker pool for small files (see converter_pool.py)
+        self.pool = pool
+        
+        # Optional shared memory budget across concurrent conversions
+        self.scheduler = scheduler
+    
+    def _admit(self, plan: Dict, label: str):
+        """Reserve the estimated peak memory if a scheduler is configured"""
+        if self.scheduler is None:
+            return contextlib.nullcontext()
+        return self.scheduler.admit(plan["estimated_peak_mb"], label)
+    
+    @staticmethod
+    def _print_output_line(stream: str, line: str):
+        """Echo converter output as it arrives (only the tail is kept in memory)"""
+        if line.strip():
+            print(f"{'📤' if stream == 'stdout' else '📥'} {line}")
     
     def convert_ifc_file(self, input_file: str, output_file: str, timeout: int = 600) -> Dict:
         """
@@ -59,40 +83,50 @@ class XFRGSubprocessConverter:
         # Ensure output directory exists
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
+        # Heap flags and memory estimate come from the file size tiers
+        plan = node_memory_plan(input_path.stat().st_size / (1024 * 1024))
+        
+        if self.pool is not None and self.pool.accepts(str(input_path)):
+            print(f"♻️  Using warm converter pool")
+            with self._admit(plan, input_path.name):
+                result = self.pool.convert(str(input_path), str(output_path), timeout=timeout)
+            if result["success"]:
+                print(f"✅ Success: {output_path.name} ({result['file_size_mb']:.2f} MB)")
+            else:
+                print(f"❌ Failed: {result['error']}")
+            return result
+        
         try:
             # Build Node.js command with memory allocation
             cmd = [
                 'node', 
-                '--max-old-space-size=8192',  # 8GB memory for large files
+                *plan["node_options"],
                 str(self.converter_script),
                 '--input', str(input_path),
                 '--output', str(output_path)
             ]
             
             print(f"🔧 Command: {' '.join(cmd)}")
-            print(f"🧠 Memory: 8GB allocated for subprocess")
+            print(f"🧠 Memory: {plan['heap_limit_mb']} MB heap limit, ~{plan['estimated_peak_mb']} MB estimated peak")
             print(f"⏰ Timeout: {timeout} seconds")
             
             # Execute with subprocess isolation
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                cwd=self.backend_dir,
-                encoding='utf-8',
-                errors='replace',
-                timeout=timeout
-            )
+            with self._admit(plan, input_path.name):
+                result, resources = run_monitored(
+                    cmd,
+                    text=True,
+                    on_line=self._print_output_line,
+                    cwd=self.backend_dir,
+                    encoding='utf-8',
+                    errors='replace',
+                    timeout=timeout
+                )
             
             conversion_time = time.time() - start_time
             
             print(f"🔄 Return code: {result.returncode}")
             print(f"⏱️  Conversion time: {conversion_time:.2f}s")
-            
-            if result.stdout.strip():
-                print(f"📤 STDOUT: {result.stdout}")
-            if result.stderr.strip():
-                print(f"📥 STDERR: {result.stderr}")
+            print(f"📊 Resources: {describe_usage(resources)}")
             
             # Check if conversion was successful
             if result.returncode == 0 and output_path.exists():
@@ -108,10 +142,12 @@ class XFRGSubprocessConverter:
                     "file_size_mb": round(file_size_mb, 2),
                     "conversion_time": round(conversion_time, 2),
                     "method": "subprocess_isolation",
-                    "converter": "thatopen_components_subprocess"
+                    "converter": "thatopen_components_subprocess",
+                    "heap_limit_mb": plan["heap_limit_mb"],
+                    "resources": resources
                 }
             else:
-                error_msg = result.stderr if result.stderr else f"Conversion failed with return code {result.returncode}"
+                error_msg = result.stderr.strip() or f"Conversion failed with return code {result.returncode}"
                 print(f"❌ Failed: {error_msg}")
                 
                 return {
@@ -120,13 +156,17 @@ class XFRGSubprocessConverter:
                     "conversion_time": round(conversion_time, 2),
                     "return_code": result.returncode,
                     "stdout": result.stdout,
-                    "stderr": result.stderr
+                    "stderr": result.stderr,
+                    "heap_limit_mb": plan["heap_limit_mb"],
+                    "resources": resources
                 }
         
         except subprocess.TimeoutExpired:
             conversion_time = time.time() - start_time
             error_msg = f"Conversion timed out after {timeout} seconds"
             print(f"⏰ {error_msg}")
+            # The converter's process tree is gone; drop what it wrote so far
+            output_path.unlink(missing_ok=True)
             
             return {
                 "success": False,
@@ -149,16 +189,22 @@ class XFRGSubprocessConverter:
 
 def main():
     """Command line interface for standalone usage"""
-    if len(sys.argv) != 3:
-        print("Usage: python subprocess_converter.py <input_file> <output_file>")
+    args = [arg for arg in sys.argv[1:] if arg != '--pool']
+    if len(args) != 2:
+        print("Usage: python subprocess_converter.py <input_file> <output_file> [--pool]")
         print("Example: python subprocess_converter.py model.ifc model.frag")
         sys.exit(1)
     
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
+    input_file = args[0]
+    output_file = args[1]
     
-    converter = XFRGSubprocessConverter()
-    result = converter.convert_ifc_file(input_file, output_file)
+    pool = ConverterWorkerPool(size=1) if '--pool' in sys.argv else None
+    converter = XFRGSubprocessConverter(pool=pool)
+    try:
+        result = converter.convert_ifc_file(input_file, output_file)
+    finally:
+        if pool:
+            pool.shutdown()
     
     # Print result as JSON for programmatic usage
     print("\n" + "="*50)
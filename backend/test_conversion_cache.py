@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed conversion cache
+    
+    python -m pytest backend/test_conversion_cache.py
+"""
+import time
+import threading
+from pathlib import Path
+
+import pytest
+
+from conversion_cache import ConversionCache
+
+
+def _converter(output_path: Path, content: bytes, calls: list, delay: float = 0):
+    """A convert() callback that writes `content` in place, like the Node converters"""
+    def convert():
+        calls.append(output_path)
+        time.sleep(delay)
+        with open(output_path, 'wb') as f:
+            f.write(content)
+        return {"success": True}
+    return convert
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ConversionCache(tmp_path / "cache", max_size_mb=1)
+
+
+def _convert_concurrently(cache, tmp_path, content, count=6):
+    """Run `count` requests for one key at once; the first one converts slowly"""
+    calls, outcomes = [], {}
+    
+    def request(i):
+        output_path = tmp_path / "out" / f"model-{i}.frag"
+        output_path.parent.mkdir(exist_ok=True)
+        # Followers block on the leader while it is still converting
+        outcomes[i] = cache.get_or_convert("k" * 64, output_path, _converter(output_path, content, calls, 0.3))
+    
+    leader = threading.Thread(target=request, args=(0,))
+    leader.start()
+    while not calls:
+        time.sleep(0.01)
+    followers = [threading.Thread(target=request, args=(i,)) for i in range(1, count)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join()
+    return calls, outcomes
+
+
+def test_concurrent_requests_convert_once(cache, tmp_path):
+    calls, outcomes = _convert_concurrently(cache, tmp_path, b"fragment")
+    
+    assert len(calls) == 1
+    assert outcomes[0]["cache"] == "miss"
+    assert all(outcomes[i]["cache"] == "shared" and outcomes[i]["success"] for i in range(1, 6))
+    assert all((tmp_path / "out" / f"model-{i}.frag").read_bytes() == b"fragment" for i in range(6))
+    assert cache.stats["misses"] == 1 and cache.stats["shared"] == 5
+
+
+def test_oversize_output_is_shared_but_not_cached(tmp_path):
+    cache = ConversionCache(tmp_path / "cache", max_size_mb=0)
+    calls, outcomes = _convert_concurrently(cache, tmp_path, b"larger than the cache")
+    
+    assert len(calls) == 1
+    assert all(outcome["success"] for outcome in outcomes.values())
+    assert all((tmp_path / "out" / f"model-{i}.frag").read_bytes() == b"larger than the cache" for i in range(6))
+    assert cache.summary()["entries"] == 0
+
+
+def test_hit_materialises_cached_output(cache, tmp_path):
+    first, second = tmp_path / "first.frag", tmp_path / "second.frag"
+    calls = []
+    cache.get_or_convert("a" * 64, first, _converter(first, b"model a", calls))
+    outcome = cache.get_or_convert("a" * 64, second, _converter(second, b"converted again", calls))
+    
+    assert outcome["cache"] == "hit"
+    assert len(calls) == 1
+    assert second.read_bytes() == b"model a"
+
+
+def test_miss_does_not_write_through_hard_link(cache, tmp_path):
+    output_path = tmp_path / "model.frag"
+    cache.get_or_convert("a" * 64, output_path, _converter(output_path, b"model a", []))
+    # The output is a link to the cached object; converting a new version in place must not change it
+    cache.get_or_convert("b" * 64, output_path, _converter(output_path, b"model b", []))
+    
+    assert output_path.read_bytes() == b"model b"
+    assert cache.lookup("a" * 64).read_bytes() == b"model a"
+
+
+def test_failed_conversion_is_not_cached(cache, tmp_path):
+    outcome = cache.get_or_convert("a" * 64, tmp_path / "model.frag",
+                                   lambda: {"success": False, "error": "broken model"})
+    
+    assert not outcome["success"]
+    assert outcome["error"] == "broken model"
+    assert cache.lookup("a" * 64) is None
+
+
+def test_least_recently_used_objects_are_evicted(cache, tmp_path):
+    block = b"x" * (400 * 1024)
+    for name in "abc":
+        output_path = tmp_path / f"{name}.frag"
+        cache.get_or_convert(name * 64, output_path, _converter(output_path, block, []))
+        if name == "b":
+            # Use "a" again, so "b" is the oldest when "c" pushes the cache over 1 MB
+            assert cache.lookup("a" * 64)
+    
+    assert cache.lookup("b" * 64) is None
+    assert cache.lookup("a" * 64) and cache.lookup("c" * 64)
+    assert cache.stats["evictions"] == 1
+    
+    # A new instance reads the same index
+    assert ConversionCache(tmp_path / "cache", max_size_mb=1).summary()["entries"] == 2
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests for the conversion job manager
+    
+    python -m pytest backend/test_job_manager.py
+"""
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from job_manager import (BATCH, CANCELLED, COMPLETED, FAILED, INTERACTIVE, QUEUED, RUNNING,
+                         JobManager, current_cancel_event)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = JobManager(tmp_path / "jobs", max_workers=1)
+    yield manager
+    manager.shutdown()
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def _block(manager, expected_seconds=None):
+    """Occupy the only worker until the returned event is set"""
+    release = threading.Event()
+    job = manager.submit("convert", "blocker.ifc", lambda: {"success": release.wait(5)},
+                         expected_seconds=expected_seconds)
+    _wait_for(lambda: job.status == RUNNING)
+    return release
+
+
+def _run_in_order(manager, jobs, blocker_seconds=None):
+    """Submit (name, submit kwargs) pairs behind a blocker; return the order they ran in"""
+    order = []
+    release = _block(manager, blocker_seconds)
+    submitted = [manager.submit("convert", name, lambda name=name: order.append(name) or {"success": True},
+                                **kwargs)
+                 for name, kwargs in jobs]
+    return release, submitted, order
+
+
+def test_shortest_job_first(manager):
+    release, submitted, order = _run_in_order(manager, [
+        ("large.ifc", {"expected_seconds": 300}),
+        ("small.ifc", {"expected_seconds": 5}),
+        ("unknown.ifc", {"input_bytes": 10 * 1024 * 1024}),
+    ])
+    release.set()
+    _wait_for(lambda: len(order) == 3)
+    
+    assert order == ["small.ifc", "unknown.ifc", "large.ifc"]
+    assert all(job.status == COMPLETED for job in submitted)
+
+
+def test_batch_jobs_yield_to_interactive_ones(manager):
+    release, _, order = _run_in_order(manager, [
+        ("batch.ifc", {"expected_seconds": 5, "priority": BATCH}),
+        ("interactive.ifc", {"expected_seconds": 300, "priority": INTERACTIVE}),
+    ])
+    release.set()
+    _wait_for(lambda: len(order) == 2)
+    
+    assert order == ["interactive.ifc", "batch.ifc"]
+
+
+def test_aging_lets_waiting_jobs_through(manager):
+    release, submitted, order = _run_in_order(manager, [
+        ("old-batch.ifc", {"expected_seconds": 600, "priority": BATCH}),
+        ("new-interactive.ifc", {"expected_seconds": 5}),
+    ])
+    # The batch job has waited long enough to make up its class penalty and size
+    submitted[0].created_at -= timedelta(hours=1)
+    release.set()
+    _wait_for(lambda: len(order) == 2)
+    
+    assert order == ["old-batch.ifc", "new-interactive.ifc"]
+    assert manager.wait_stats()[BATCH]["max_wait_s"] >= 3600
+
+
+def test_unknown_priority_is_rejected(manager):
+    with pytest.raises(ValueError):
+        manager.submit("convert", "model.ifc", lambda: {"success": True}, priority="urgent")
+
+
+def test_queue_eta(manager):
+    release, submitted, _ = _run_in_order(manager, [
+        ("first.ifc", {"expected_seconds": 60}),
+        ("second.ifc", {"expected_seconds": 60}),
+    ], blocker_seconds=30)
+    first, second = (manager.get(job.id) for job in submitted)
+    release.set()
+    
+    assert first["status"] == QUEUED
+    assert first["expected_seconds"] == 60
+    eta_first, eta_second = (datetime.fromisoformat(job["eta"]) for job in (first, second))
+    assert eta_second - eta_first == timedelta(seconds=60)
+    assert timedelta(seconds=85) <= eta_first - datetime.now() <= timedelta(seconds=91)
+
+
+def test_cancel_queued_job(manager):
+    release = _block(manager)
+    ran, cancelled = [], []
+    job = manager.submit("convert", "model.ifc", lambda: ran.append(1) or {"success": True},
+                         on_cancel=lambda: cancelled.append(1))
+    
+    assert manager.cancel(job.id) == CANCELLED
+    release.set()
+    _wait_for(lambda: manager.counts()[COMPLETED] == 1)
+    assert cancelled == [1] and ran == []
+    assert manager.get(job.id)["status"] == CANCELLED
+
+
+def test_cancel_running_job(manager):
+    started = threading.Event()
+    
+    def convert():
+        # Converters hand this event to run_monitored, which kills the process tree
+        cancel_event = current_cancel_event()
+        started.set()
+        cancel_event.wait(5)
+        return {"success": False, "error": "Converter killed"}
+    
+    job = manager.submit("convert", "model.ifc", convert)
+    assert started.wait(5)
+    
+    assert manager.cancel(job.id) == "cancelling"
+    assert manager.get(job.id)["cancel_requested"]
+    _wait_for(lambda: job.finished)
+    assert job.status == CANCELLED
+    assert job.error == "Cancelled while running"
+
+
+def test_cancel_finished_or_unknown_job(manager):
+    job = manager.submit("convert", "model.ifc", lambda: {"success": True})
+    _wait_for(lambda: job.finished)
+    
+    assert manager.cancel(job.id) == "deleted"
+    assert manager.get(job.id) is None
+    assert manager.cancel("no-such-job") is None
+
+
+def test_restart_fails_interrupted_jobs(tmp_path):
+    jobs_dir = tmp_path / "jobs"
+    jobs_dir.mkdir()
+    for job_id, status in (("queued-job", QUEUED), ("running-job", RUNNING), ("done-job", COMPLETED)):
+        (jobs_dir / f"{job_id}.json").write_text(json.dumps({"job_id": job_id, "status": status}))
+    
+    manager = JobManager(jobs_dir, max_workers=1)
+    try:
+        for job_id in ("queued-job", "running-job"):
+            job = manager.get(job_id)
+            assert job["status"] == FAILED
+            assert job["error"] == "Interrupted by server restart"
+        assert manager.get("done-job")["status"] == COMPLETED
+    finally:
+        manager.shutdown()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the resumable chunked upload sessions
+    
+    python -m pytest backend/test_upload_sessions.py
+"""
+import io
+import hashlib
+
+import pytest
+
+from upload_sessions import MIN_CHUNK_SIZE, UploadSessionError, UploadSessionManager
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    return UploadSessionManager(tmp_path / "sessions", tmp_path / "staging", max_bytes=200 * MB, chunk_size=8 * MB)
+
+
+def test_chunked_upload_round_trip(sessions):
+    content = bytes(range(256)) * (12 * MB // 256 + 1)
+    session = sessions.create("model.ifc", len(content), sha256=hashlib.sha256(content).hexdigest(),
+                              chunk_size=4 * MB)
+    assert session["total_chunks"] == 4
+    
+    # Out of order, with one chunk sent twice
+    for index in (3, 1, 0, 1, 2):
+        chunk = content[index * 4 * MB:(index + 1) * 4 * MB]
+        sessions.put_chunk(session["upload_id"], index, io.BytesIO(chunk))
+    assert sessions.status(session["upload_id"])["complete"]
+    
+    staged = sessions.finalize(session["upload_id"])
+    assert staged["path"].read_bytes() == content
+
+
+def test_chunk_size_is_capped_by_the_server(sessions):
+    assert sessions.create("model.ifc", 100 * MB, chunk_size=64 * MB)["chunk_size"] == 8 * MB
+    assert sessions.create("model.ifc", 100 * MB)["chunk_size"] == 8 * MB
+
+
+@pytest.mark.parametrize("chunk_size", [0, -7])
+def test_non_positive_chunk_size_is_rejected(sessions, chunk_size):
+    with pytest.raises(UploadSessionError, match="positive"):
+        sessions.create("model.ifc", 100, chunk_size=chunk_size)
+
+
+def test_tiny_chunks_are_rejected(sessions):
+    with pytest.raises(UploadSessionError, match="at least 1 MB"):
+        sessions.create("model.ifc", 100 * MB, chunk_size=1)
+    with pytest.raises(UploadSessionError, match="at least 1 MB"):
+        sessions.create("model.ifc", 2 * MB, chunk_size=MIN_CHUNK_SIZE - 1)
+
+
+def test_small_file_may_be_one_short_chunk(sessions):
+    session = sessions.create("model.ifc", 100, chunk_size=100)
+    assert session["total_chunks"] == 1
+    assert session["missing_chunks"] == [0]
+
+
+@pytest.mark.parametrize("filename, size, status_code", [
+    ("model.zip", 100, 400),
+    ("model.ifc", 0, 400),
+    ("model.ifc", 201 * MB, 413),
+])
+def test_invalid_sessions_are_rejected(sessions, filename, size, status_code):
+    with pytest.raises(UploadSessionError) as error:
+        sessions.create(filename, size)
+    assert error.value.status_code == status_code
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Resumable Chunked Upload Sessions
+=================================
+Lets clients upload multi-GB IFC files as numbered chunks that can be
+retried individually instead of restarting a single multipart POST.
+    
+    POST   /api/uploads                        -> create a session
+    PUT    /api/uploads/<id>/chunks/<index>    -> store one chunk (raw body)
+    GET    /api/uploads/<id>                   -> received / missing chunks
+    POST   /api/uploads/<id>/complete          -> assemble, verify, convert
+    DELETE /api/uploads/<id>                   -> abort
+
+Chunks are streamed to `<sessions_dir>/<id>/chunks/<index>.part` as they
+arrive, so memory use is independent of the file size. Finalizing
+concatenates them into the upload staging directory while computing the
+SHA-256, which must match the digest the client declared (if any).
+"""
+
+import json
+import shutil
+import hashlib
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+from werkzeug.utils import secure_filename
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+# Smallest chunk size a client may ask for (only the last chunk may be shorter);
+# bounds the number of chunks, and so the size of every status response
+MIN_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadSessionError(Exception):
+    """Client-visible upload session error with an HTTP status code"""
+    
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UploadSessionManager:
+    """
+    On-disk chunked upload sessions with expiry
+    """
+    
+    def __init__(self, sessions_dir: Path, staging_dir: Path, max_bytes: int,
+                 chunk_size: int = 8 * 1024 * 1024, expiry_seconds: int = 24 * 3600):
+        self.sessions_dir = Path(sessions_dir)
+        self.staging_dir = Path(staging_dir)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.expiry_seconds = expiry_seconds
+        self.sessions_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+    
+    def _session_dir(self, upload_id: str) -> Path:
+        return self.sessions_dir / Path(upload_id).name
+    
+    def _load(self, upload_id: str) -> Dict:
+        session_file = self._session_dir(upload_id) / "session.json"
+        if not session_file.exists():
+            raise UploadSessionError(f"Upload session not found: {upload_id}", 404)
+        with open(session_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _save(self, session: Dict):
+        session_file = self._session_dir(session["upload_id"]) / "session.json"
+        tmp_file = session_file.with_suffix(".json.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(session, f, indent=2)
+        tmp_file.replace(session_file)
+    
+    def _expected_chunk_size(self, session: Dict, index: int) -> int:
+        if index == session["total_chunks"] - 1:
+            return session["size"] - index * session["chunk_size"]
+        return session["chunk_size"]
+    
+    def _received_chunks(self, session: Dict):
+        chunks_dir = self._session_dir(session["upload_id"]) / "chunks"
+        return sorted(int(part.stem) for part in chunks_dir.glob("*.part"))
+    
+    def create(self, filename: str, size: int, sha256: Optional[str] = None,
+               chunk_size: Optional[int] = None, params: Optional[Dict] = None) -> Dict:
+        """Open an upload session for a file of `size` bytes"""
+        self.prune_expired()
+        
+        if not filename or not filename.lower().endswith('.ifc'):
+            raise UploadSessionError("File must be an IFC file")
+        if size <= 0:
+            raise UploadSessionError("File size must be positive")
+        if size > self.max_bytes:
+            raise UploadSessionError(
+                f"File exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit", 413
+            )
+        
+        if chunk_size is not None and chunk_size <= 0:
+            raise UploadSessionError("Chunk size must be positive")
+        if chunk_size is not None and chunk_size < min(MIN_CHUNK_SIZE, size):
+            raise UploadSessionError(f"Chunk size must be at least {MIN_CHUNK_SIZE // (1024 * 1024)} MB")
+        chunk_size = min(chunk_size or self.chunk_size, self.chunk_size)
+        session = {
+            "upload_id": uuid.uuid4().hex,
+            "filename": filename,
+            "size": size,
+            "sha256": sha256.lower() if sha256 else None,
+            "chunk_size": chunk_size,
+            "total_chunks": -(-size // chunk_size),
+            "params": params or {},
+            "created_at": time.time(),
+            "updated_at": time.time()
+        }
+        (self._session_dir(session["upload_id"]) / "chunks").mkdir(parents=True)
+        self._save(session)
+        return self.status(session["upload_id"])
+    
+    def put_chunk(self, upload_id: str, index: int, stream: BinaryIO,
+                  chunk_sha256: Optional[str] = None) -> Dict:
+        """Stream one chunk to disk; re-sending a chunk replaces it"""
+        session = self._load(upload_id)
+        if not 0 <= index < session["total_chunks"]:
+            raise UploadSessionError(
+                f"Chunk index {index} out of range (0-{session['total_chunks'] - 1})"
+            )
+        
+        expected_size = self._expected_chunk_size(session, index)
+        chunk_file = self._session_dir(upload_id) / "chunks" / f"{index}.part"
+        tmp_file = chunk_file.with_suffix(f".tmp{threading.get_ident()}")
+        
+        hash_sha256 = hashlib.sha256()
+        received = 0
+        try:
+            with open(tmp_file, 'wb') as f:
+                for block in iter(lambda: stream.read(COPY_CHUNK_SIZE), b""):
+                    received += len(block)
+                    if received > expected_size:
+                        raise UploadSessionError(f"Chunk {index} is larger than {expected_size} bytes")
+                    hash_sha256.update(block)
+                    f.write(block)
+            
+            if received != expected_size:
+                raise UploadSessionError(
+                    f"Chunk {index} has {received} bytes, expected {expected_size}"
+                )
+            if chunk_sha256 and hash_sha256.hexdigest() != chunk_sha256.lower():
+                raise UploadSessionError(f"Chunk {index} checksum mismatch", 422)
+            tmp_file.replace(chunk_file)
+        finally:
+            tmp_file.unlink(missing_ok=True)
+        
+        with self._lock:
+            session["updated_at"] = time.time()
+            self._save(session)
+        return {"upload_id": upload_id, "index": index, "size": received,
+                "sha256": hash_sha256.hexdigest()}
+    
+    def status(self, upload_id: str) -> Dict:
+        """Session metadata plus the chunk indexes still missing"""
+        session = self._load(upload_id)
+        received = set(self._received_chunks(session))
+        missing = [i for i in range(session["total_chunks"]) if i not in received]
+        return {
+            **session,
+            "received_chunks": len(received),
+            "missing_chunks": missing,
+            "complete": not missing,
+            "status_url": f"/api/uploads/{upload_id}"
+        }
+    
+    def finalize(self, upload_id: str, sha256: Optional[str] = None) -> Dict:
+        """
+        Assemble the chunks into a staged upload and verify its checksum
+        
+        Returns {"path", "filename", "size", "sha256", "params"}; the session
+        is removed, and the caller owns the staged file.
+        """
+        status = self.status(upload_id)
+        if status["missing_chunks"]:
+            raise UploadSessionError(
+                f"Upload incomplete: {len(status['missing_chunks'])} chunks missing", 409
+            )
+        
+        expected_sha256 = (sha256 or status["sha256"] or "").lower() or None
+        chunks_dir = self._session_dir(upload_id) / "chunks"
+        staged_dir = self.staging_dir / uuid.uuid4().hex
+        staged_dir.mkdir(parents=True)
+        staged_path = staged_dir / (secure_filename(status["filename"]) or "upload.ifc")
+        
+        hash_sha256 = hashlib.sha256()
+        size = 0
+        with open(staged_path, 'wb') as out:
+            for index in range(status["total_chunks"]):
+                with open(chunks_dir / f"{index}.part", 'rb') as part:
+                    for block in iter(lambda: part.read(COPY_CHUNK_SIZE), b""):
+                        hash_sha256.update(block)
+                        size += len(block)
+                        out.write(block)
+        
+        digest = hash_sha256.hexdigest()
+        if size != status["size"] or (expected_sha256 and digest != expected_sha256):
+            shutil.rmtree(staged_dir, ignore_errors=True)
+            raise UploadSessionError(
+                f"Checksum mismatch: assembled {size} bytes with SHA-256 {digest}", 422
+            )
+        
+        self.abort(upload_id)
+        return {
+            "path": staged_path,
+            "filename": status["filename"],
+            "size": size,
+            "sha256": digest,
+            "params": status["params"]
+        }
+    
+    def abort(self, upload_id: str) -> bool:
+        session_dir = self._session_dir(upload_id)
+        if not session_dir.exists():
+            return False
+        shutil.rmtree(session_dir, ignore_errors=True)
+        return True
+    
+    def prune_expired(self):
+        """Remove sessions without activity for longer than the expiry period"""
+        cutoff = time.time() - self.expiry_seconds
+        for session_file in self.sessions_dir.glob("*/session.json"):
+            try:
+                if session_file.stat().st_mtime < cutoff:
+                    shutil.rmtree(session_file.parent, ignore_errors=True)
+            except OSError:
+                continue
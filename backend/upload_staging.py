@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Streaming Upload Staging
+========================
+Writes multipart file uploads straight to their staging location while the
+request body is parsed, instead of letting Werkzeug spool them to a
+temporary file that the endpoint then copies again.
+
+Each uploaded file lands in `<staging_dir>/<uuid>/<secure name>` in the
+chunks handed over by the multipart parser. The SHA-256 digest and byte
+count are updated on every write, and an upload is aborted with 413 as
+soon as it passes the configured size limit, without buffering the rest.
+    
+    app.request_class = StreamingUploadRequest
+    app.config["UPLOAD_STAGING_DIR"] = ...
+    app.config["MAX_UPLOAD_BYTES"] = ...
+    
+    upload = request.files['file'].stream.claim()
+    upload.path, upload.sha256, upload.size
+
+Uploads not claimed by the endpoint are removed when the request ends.
+"""
+
+import io
+import shutil
+import hashlib
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+
+class StagedUpload(io.RawIOBase):
+    """Write-only file stream that hashes, counts and size-checks upload bytes"""
+    
+    def __init__(self, staging_dir: Path, filename: Optional[str], max_bytes: Optional[int] = None):
+        super().__init__()
+        self.directory = Path(staging_dir) / uuid.uuid4().hex
+        self.directory.mkdir(parents=True)
+        self.path = self.directory / (secure_filename(filename or "") or "upload.ifc")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.claimed = False
+        self._hash = hashlib.sha256()
+        self._file = open(self.path, 'wb')
+    
+    def writable(self) -> bool:
+        return True
+    
+    def readable(self) -> bool:
+        return False
+    
+    def write(self, chunk) -> int:
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self.discard()
+            raise RequestEntityTooLarge(
+                f"File exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit"
+            )
+        self._hash.update(chunk)
+        return self._file.write(chunk)
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        # The parser rewinds the stream once the part is complete
+        return self._file.seek(offset, whence) if not self._file.closed else 0
+    
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        super().close()
+    
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+    
+    def claim(self) -> "StagedUpload":
+        """Keep the staged file past the request; the caller now owns its cleanup"""
+        self.close()
+        self.claimed = True
+        return self
+    
+    def discard(self):
+        """Delete the staged file and its directory"""
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class StreamingUploadRequest(Request):
+    """Flask request whose file parts are streamed into StagedUpload objects"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.staged_uploads: List[StagedUpload] = []
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        upload = StagedUpload(
+            current_app.config["UPLOAD_STAGING_DIR"],
+            filename,
+            current_app.config.get("MAX_UPLOAD_BYTES")
+        )
+        self.staged_uploads.append(upload)
+        return upload
+    
+    def discard_unclaimed_uploads(self):
+        for upload in self.staged_uploads:
+            if not upload.claimed:
+                upload.discard()
+
+
+def remove_staged_file(path):
+    """Remove a staged upload (file and its per-upload directory)"""
+    path = Path(path)
+    path.unlink(missing_ok=True)
+    try:
+        path.parent.rmdir()
+    except OSError:
+        pass
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Synthetic IFC Corpus Generator
+==============================
+
+Writes valid IFC4 STEP files with a controlled number of building elements
+so converter performance can be measured on reproducible inputs.
+
+Every file has the usual spatial structure (project / site / building /
+storeys) and, per storey, extruded walls and slabs, openings voiding the
+walls, and property sets attached to each element. Given the same
+parameters and seed the output is byte-for-byte identical.
+
+Usage:
+    # One file with explicit element counts
+    python -m benchmarks.generate_ifc model.ifc --storeys 4 --walls 200 --slabs 8 --openings 1 --psets 2
+    
+    # Grow a file until it reaches a target size
+    python -m benchmarks.generate_ifc model.ifc --target-mb 100
+    
+    # Standard corpus (1, 10, 100 and 1000 MB)
+    python -m benchmarks.generate_ifc --corpus benchmarks/corpus
+    python -m benchmarks.generate_ifc --corpus benchmarks/corpus --sizes 1 10
+"""
+
+import argparse
+import random
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+CORPUS_SIZES_MB = [1, 10, 100, 1000]
+
+IFC_GUID_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$"
+
+PRODUCT_TYPES = ("IFCWALL", "IFCOPENINGELEMENT", "IFCSLAB")
+
+# Products as the generator writes them: GlobalId, OwnerHistory, Name,
+# Description, ObjectType, ObjectPlacement, then Representation
+_PRODUCT = re.compile(r"#(\d+)=(" + "|".join(PRODUCT_TYPES) + r")\('[^']*',\$,'[^']*',\$,\$,#\d+,([^,]*),")
+_SHAPE = re.compile(r"#(\d+)=IFCPRODUCTDEFINITIONSHAPE\(")
+
+
+class StepWriter:
+    """Numbers STEP entities and counts the bytes written"""
+    
+    def __init__(self, stream, seed: int):
+        self.stream = stream
+        self.next_id = 1
+        self.bytes_written = 0
+        self._random = random.Random(seed)
+    
+    def raw(self, text: str):
+        data = text + "\n"
+        self.stream.write(data)
+        self.bytes_written += len(data)
+    
+    def add(self, entity: str) -> int:
+        entity_id = self.next_id
+        self.next_id += 1
+        self.raw(f"#{entity_id}={entity};")
+        return entity_id
+    
+    def guid(self) -> str:
+        """Deterministic 22-character IFC GlobalId"""
+        value = self._random.getrandbits(128)
+        chars = []
+        for _ in range(22):
+            chars.append(IFC_GUID_CHARS[value % 64])
+            value //= 64
+        return "".join(reversed(chars))
+    
+    def uniform(self, low: float, high: float) -> float:
+        return round(self._random.uniform(low, high), 3)
+
+
+def _refs(ids: List[int]) -> str:
+    return "(" + ",".join(f"#{i}" for i in ids) + ")"
+
+
+class _Context:
+    """Shared entities every element refers to"""
+    
+    def __init__(self, w: StepWriter, name: str):
+        self.origin = w.add("IFCCARTESIANPOINT((0.,0.,0.))")
+        self.z_axis = w.add("IFCDIRECTION((0.,0.,1.))")
+        self.x_axis = w.add("IFCDIRECTION((1.,0.,0.))")
+        self.world = w.add(f"IFCAXIS2PLACEMENT3D(#{self.origin},#{self.z_axis},#{self.x_axis})")
+        self.origin_2d = w.add("IFCCARTESIANPOINT((0.,0.))")
+        self.placement_2d = w.add(f"IFCAXIS2PLACEMENT2D(#{self.origin_2d},$)")
+        
+        context = w.add(f"IFCGEOMETRICREPRESENTATIONCONTEXT($,'Model',3,1.E-05,#{self.world},$)")
+        self.body = w.add(f"IFCGEOMETRICREPRESENTATIONSUBCONTEXT('Body','Model',*,*,*,*,#{context},$,.MODEL_VIEW.,$)")
+        units = [
+            w.add("IFCSIUNIT(*,.LENGTHUNIT.,$,.METRE.)"),
+            w.add("IFCSIUNIT(*,.AREAUNIT.,$,.SQUARE_METRE.)"),
+            w.add("IFCSIUNIT(*,.VOLUMEUNIT.,$,.CUBIC_METRE.)"),
+            w.add("IFCSIUNIT(*,.PLANEANGLEUNIT.,$,.RADIAN.)"),
+        ]
+        unit_assignment = w.add(f"IFCUNITASSIGNMENT({_refs(units)})")
+        self.project = w.add(f"IFCPROJECT('{w.guid()}',$,'{name}',$,$,$,$,(#{context}),#{unit_assignment})")
+        
+        self.site_placement = w.add(f"IFCLOCALPLACEMENT($,#{self.world})")
+        site = w.add(f"IFCSITE('{w.guid()}',$,'Site',$,$,#{self.site_placement},$,$,.ELEMENT.,$,$,$,$,$)")
+        self.building_placement = w.add(f"IFCLOCALPLACEMENT(#{self.site_placement},#{self.world})")
+        self.building = w.add(f"IFCBUILDING('{w.guid()}',$,'Building',$,$,#{self.building_placement},$,$,.ELEMENT.,$,$,$)")
+        w.add(f"IFCRELAGGREGATES('{w.guid()}',$,$,$,#{self.project},(#{site}))")
+        w.add(f"IFCRELAGGREGATES('{w.guid()}',$,$,$,#{site},(#{self.building}))")
+
+
+def _placement(w: StepWriter, ctx: _Context, parent: int, x: float, y: float, z: float = 0.0) -> int:
+    point = w.add(f"IFCCARTESIANPOINT(({x},{y},{z}))")
+    axis = w.add(f"IFCAXIS2PLACEMENT3D(#{point},$,$)")
+    return w.add(f"IFCLOCALPLACEMENT(#{parent},#{axis})")
+
+
+def _box(w: StepWriter, ctx: _Context, x_dim: float, y_dim: float, depth: float) -> int:
+    """Product shape of an extruded rectangle"""
+    profile = w.add(f"IFCRECTANGLEPROFILEDEF(.AREA.,$,#{ctx.placement_2d},{x_dim},{y_dim})")
+    solid = w.add(f"IFCEXTRUDEDAREASOLID(#{profile},#{ctx.world},#{ctx.z_axis},{depth})")
+    shape = w.add(f"IFCSHAPEREPRESENTATION(#{ctx.body},'Body','SweptSolid',(#{solid}))")
+    return w.add(f"IFCPRODUCTDEFINITIONSHAPE($,$,(#{shape}))")
+
+
+def _property_sets(w: StepWriter, element: int, prefix: str, psets: int, properties: int):
+    for p in range(psets):
+        values = []
+        for i in range(properties):
+            if i % 3 == 0:
+                value = f"IFCLABEL('{prefix} value {i}')"
+            elif i % 3 == 1:
+                value = f"IFCREAL({w.uniform(0, 1000)})"
+            else:
+                value = f"IFCBOOLEAN(.{'T' if i % 2 else 'F'}.)"
+            values.append(w.add(f"IFCPROPERTYSINGLEVALUE('Property{i}',$,{value},$)"))
+        pset_name = f"Pset_{prefix}Common" if p == 0 else f"XSBA_{prefix}Set{p}"
+        pset = w.add(f"IFCPROPERTYSET('{w.guid()}',$,'{pset_name}',$,{_refs(values)})")
+        w.add(f"IFCRELDEFINESBYPROPERTIES('{w.guid()}',$,$,$,(#{element}),#{pset})")
+
+
+def _storey(w: StepWriter, ctx: _Context, level: int, walls: int, slabs: int,
+            openings: int, psets: int, properties: int, counts: Dict[str, int]) -> int:
+    elevation = level * 3.5
+    storey_placement = _placement(w, ctx, ctx.building_placement, 0.0, 0.0, elevation)
+    storey = w.add(f"IFCBUILDINGSTOREY('{w.guid()}',$,'Level {level}',$,$,#{storey_placement},$,$,.ELEMENT.,{elevation})")
+    contained = []
+    
+    for i in range(walls):
+        length = w.uniform(2, 12)
+        placement = _placement(w, ctx, storey_placement, float((i % 50) * 13), float((i // 50) * 5))
+        wall = w.add(f"IFCWALL('{w.guid()}',$,'Wall L{level}-{i}',$,$,#{placement},#{_box(w, ctx, length, 0.2, 3.0)},$,.STANDARD.)")
+        contained.append(wall)
+        _property_sets(w, wall, "Wall", psets, properties)
+        counts["walls"] += 1
+        
+        for j in range(openings):
+            opening_placement = _placement(w, ctx, placement, round(length * (j + 1) / (openings + 1), 3), 0.0, 0.9)
+            opening = w.add(f"IFCOPENINGELEMENT('{w.guid()}',$,'Opening L{level}-{i}-{j}',$,$,#{opening_placement},#{_box(w, ctx, 0.9, 0.4, 1.2)},$,.OPENING.)")
+            w.add(f"IFCRELVOIDSELEMENT('{w.guid()}',$,$,$,#{wall},#{opening})")
+            counts["openings"] += 1
+    
+    for i in range(slabs):
+        placement = _placement(w, ctx, storey_placement, float(i * 20), 0.0)
+        slab = w.add(f"IFCSLAB('{w.guid()}',$,'Slab L{level}-{i}',$,$,#{placement},#{_box(w, ctx, 20.0, 20.0, 0.25)},$,.FLOOR.)")
+        contained.append(slab)
+        _property_sets(w, slab, "Slab", psets, properties)
+        counts["slabs"] += 1
+    
+    if contained:
+        w.add(f"IFCRELCONTAINEDINSPATIALSTRUCTURE('{w.guid()}',$,$,$,{_refs(contained)},#{storey})")
+    counts["storeys"] += 1
+    return storey
+
+
+def generate_ifc(output_path: Path, storeys: int = 4, walls: int = 100, slabs: int = 4,
+                 openings: int = 1, psets: int = 2, properties: int = 6,
+                 target_mb: Optional[float] = None, seed: int = 42) -> Dict:
+    """
+    Write a synthetic IFC4 file
+    
+    Args:
+        output_path: File to write
+        storeys: Number of storeys (ignored when target_mb is set)
+        walls, slabs: Elements per storey
+        openings: Openings voiding each wall
+        psets, properties: Property sets per element and properties per set
+        target_mb: Keep adding storeys until the file reaches this size
+        seed: Random seed for GlobalIds and dimensions
+    
+    Returns:
+        Dict with the element counts, the number of products checked by
+        `check_representations` and the file size
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    counts = {"storeys": 0, "walls": 0, "slabs": 0, "openings": 0}
+    name = output_path.stem
+    
+    with open(output_path, "w", encoding="ascii", newline="\n") as f:
+        w = StepWriter(f, seed)
+        w.raw("ISO-10303-21;")
+        w.raw("HEADER;")
+        w.raw("FILE_DESCRIPTION(('ViewDefinition [ReferenceView_V1.2]'),'2;1');")
+        w.raw(f"FILE_NAME('{name}.ifc','{datetime(2025, 1, 1).isoformat()}',(''),(''),'XSBA benchmark generator','','');")
+        w.raw("FILE_SCHEMA(('IFC4'));")
+        w.raw("ENDSEC;")
+        w.raw("DATA;")
+        
+        ctx = _Context(w, name)
+        target_bytes = target_mb * 1024 * 1024 if target_mb else None
+        storey_ids = []
+        level = 0
+        while (w.bytes_written < target_bytes) if target_bytes else (level < storeys):
+            storey_ids.append(_storey(w, ctx, level, walls, slabs, openings, psets, properties, counts))
+            level += 1
+        if storey_ids:
+            w.add(f"IFCRELAGGREGATES('{w.guid()}',$,$,$,#{ctx.building},{_refs(storey_ids)})")
+        
+        w.raw("ENDSEC;")
+        w.raw("END-ISO-10303-21;")
+    
+    products = check_representations(output_path)
+    return {
+        "file": str(output_path),
+        "size_mb": round(output_path.stat().st_size / (1024 * 1024), 2),
+        "entities": w.next_id - 1,
+        "products": products,
+        **counts
+    }
+
+
+def check_representations(ifc_path: Path) -> int:
+    """
+    Check that every product's Representation refers to an
+    IfcProductDefinitionShape; returns the number of products checked
+    
+    Raises:
+        ValueError: A product has no shape, or its Representation is not a
+            reference to one
+    """
+    shapes = set()
+    products = []
+    with open(ifc_path, "r", encoding="ascii") as f:
+        for line in f:
+            shape = _SHAPE.match(line)
+            if shape:
+                shapes.add(int(shape.group(1)))
+                continue
+            product = _PRODUCT.match(line)
+            if product:
+                products.append((int(product.group(1)), product.group(2), product.group(3)))
+    
+    broken = [f"#{product_id}={entity}(...{representation}...)" for product_id, entity, representation in products
+              if not (representation.startswith("#") and int(representation[1:]) in shapes)]
+    if broken:
+        raise ValueError(f"{len(broken)} of {len(products)} products without an IfcProductDefinitionShape "
+                         f"in {Path(ifc_path).name}: {', '.join(broken[:5])}")
+    return len(products)
+
+
+def generate_corpus(corpus_dir: Path, sizes_mb: List[float] = CORPUS_SIZES_MB, seed: int = 42,
+                    force: bool = False) -> List[Dict]:
+    """Generate `synthetic_<size>mb.ifc` files, skipping ones that already exist"""
+    corpus_dir = Path(corpus_dir)
+    generated = []
+    for size_mb in sizes_mb:
+        output_path = corpus_dir / f"synthetic_{size_mb:g}mb.ifc"
+        if output_path.exists() and not force:
+            print(f"[SKIP] {output_path.name} already exists")
+            continue
+        print(f"[GENERATE] {output_path.name} ...")
+        info = generate_ifc(output_path, target_mb=size_mb, seed=seed)
+        print(f"[OK] {output_path.name}: {info['size_mb']} MB, {info['entities']} entities, "
+              f"{info['walls']} walls, {info['slabs']} slabs, {info['openings']} openings")
+        generated.append(info)
+    return generated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic IFC4 files for benchmarking")
+    parser.add_argument("output", nargs="?", help="Output .ifc file")
+    parser.add_argument("--corpus", help="Generate the standard corpus into this directory")
+    parser.add_argument("--sizes", nargs="+", type=float, default=CORPUS_SIZES_MB, help="Corpus sizes in MB")
+    parser.add_argument("--force", action="store_true", help="Regenerate existing corpus files")
+    parser.add_argument("--target-mb", type=float, help="Grow the file to this size")
+    parser.add_argument("--storeys", type=int, default=4)
+    parser.add_argument("--walls", type=int, default=100, help="Walls per storey")
+    parser.add_argument("--slabs", type=int, default=4, help="Slabs per storey")
+    parser.add_argument("--openings", type=int, default=1, help="Openings per wall")
+    parser.add_argument("--psets", type=int, default=2, help="Property sets per element")
+    parser.add_argument("--properties", type=int, default=6, help="Properties per property set")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    if args.corpus:
+        generate_corpus(Path(args.corpus), args.sizes, args.seed, args.force)
+        return 0
+    if not args.output:
+        parser.error("an output file or --corpus is required")
+    
+    info = generate_ifc(Path(args.output), args.storeys, args.walls, args.slabs, args.openings,
+                        args.psets, args.properties, args.target_mb, args.seed)
+    print(f"[OK] {info['file']}: {info['size_mb']} MB, {info['entities']} entities")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
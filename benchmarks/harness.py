@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Conversion Benchmark Harness
+============================
+
+Runs each converter over the IFC corpus and writes machine-readable results
+that can be compared against a stored baseline.
+
+Converters:
+    ifc_converter  - node backend/ifc_converter.js --input <ifc> --output <frag>
+    frag_convert   - node frag_convert/convert_ifc_to_fragments.js <ifc> <frag>
+    subprocess     - python backend/subprocess_converter.py <ifc> <frag>
+                     (XFRGSubprocessConverter, measured with its Node child)
+
+Per file and converter the harness records the median wall time, the peak
+RSS of the process tree, the output size and the throughput in MB/s.
+
+Usage:
+    # Run every converter over the corpus (generate it first)
+    python -m benchmarks.harness run --corpus benchmarks/corpus --repeat 3
+    
+    # Only some converters / files, and store the result as the new baseline
+    python -m benchmarks.harness run --converters frag_convert --files synthetic_1mb.ifc --save-baseline
+    
+    # Compare a result file against the baseline (exit code 1 on regression)
+    python -m benchmarks.harness compare benchmarks/results/<run>.json --threshold 10
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BACKEND_DIR = PROJECT_ROOT / "backend"
+FRAG_CONVERT_DIR = PROJECT_ROOT / "frag_convert"
+
+sys.path.append(str(FRAG_CONVERT_DIR))
+from conversion_history import converter_version, run_measured
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DEFAULT_CORPUS_DIR = BENCHMARKS_DIR / "corpus"
+DEFAULT_RESULTS_DIR = BENCHMARKS_DIR / "results"
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baseline.json"
+
+CONVERTERS = {
+    "ifc_converter": {
+        "script": BACKEND_DIR / "ifc_converter.js",
+        "cwd": BACKEND_DIR,
+        "command": lambda ifc, frag: ["node", str(BACKEND_DIR / "ifc_converter.js"), "--input", str(ifc), "--output", str(frag)],
+    },
+    "frag_convert": {
+        "script": FRAG_CONVERT_DIR / "convert_ifc_to_fragments.js",
+        "cwd": FRAG_CONVERT_DIR,
+        "command": lambda ifc, frag: ["node", str(FRAG_CONVERT_DIR / "convert_ifc_to_fragments.js"), str(ifc), str(frag)],
+    },
+    "subprocess": {
+        "script": BACKEND_DIR / "subprocess_converter.py",
+        "cwd": BACKEND_DIR,
+        "command": lambda ifc, frag: [sys.executable, str(BACKEND_DIR / "subprocess_converter.py"), str(ifc), str(frag)],
+    },
+}
+
+# Metrics compared against the baseline and whether a larger value is better
+COMPARED_METRICS = {
+    "wall_s": False,
+    "peak_rss_mb": False,
+    "mb_per_s": True,
+}
+
+
+def _tool_version(cmd: List[str]) -> Optional[str]:
+    try:
+        return subprocess.run(cmd, capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment_info() -> Dict:
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "node": _tool_version(["node", "--version"]),
+        "git_commit": _tool_version(["git", "-C", str(PROJECT_ROOT), "rev-parse", "--short", "HEAD"]),
+    }
+
+
+def run_once(converter: str, ifc_file: Path, output_dir: Path, timeout: float) -> Dict:
+    """One measured conversion; the output file is removed afterwards"""
+    spec = CONVERTERS[converter]
+    frag_file = output_dir / f"{ifc_file.stem}.{converter}.frag"
+    frag_file.unlink(missing_ok=True)
+    
+    start = time.perf_counter()
+    try:
+        completed, peak_mb = run_measured(spec["command"](ifc_file, frag_file), timeout=timeout,
+                                          cwd=str(spec["cwd"]))
+        wall_s = time.perf_counter() - start
+        success = completed.returncode == 0 and frag_file.exists()
+        error = None if success else (completed.stderr or completed.stdout or b"").decode(errors="replace")[-500:]
+    except subprocess.TimeoutExpired:
+        wall_s, peak_mb, success, error = time.perf_counter() - start, None, False, f"Timed out after {timeout}s"
+    except OSError as e:
+        wall_s, peak_mb, success, error = time.perf_counter() - start, None, False, str(e)
+    
+    output_bytes = frag_file.stat().st_size if success else None
+    frag_file.unlink(missing_ok=True)
+    return {"success": success, "wall_s": round(wall_s, 3), "peak_rss_mb": peak_mb,
+            "output_bytes": output_bytes, "error": error}
+
+
+def benchmark(converters: List[str], ifc_files: List[Path], repeat: int = 3, warmup: int = 1,
+              timeout: float = 3600) -> Dict:
+    """Run every converter over every file; returns the result document"""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="xsba_bench_") as tmp:
+        output_dir = Path(tmp)
+        for ifc_file in ifc_files:
+            input_mb = ifc_file.stat().st_size / (1024 * 1024)
+            for converter in converters:
+                print(f"[BENCH] {converter} <- {ifc_file.name} ({input_mb:.1f} MB)")
+                for _ in range(warmup):
+                    run_once(converter, ifc_file, output_dir, timeout)
+                runs = [run_once(converter, ifc_file, output_dir, timeout) for _ in range(repeat)]
+                ok = [r for r in runs if r["success"]]
+                
+                entry = {
+                    "converter": converter,
+                    "file": ifc_file.name,
+                    "input_mb": round(input_mb, 2),
+                    "success": len(ok) == len(runs),
+                    "runs": runs,
+                    "wall_s": None, "peak_rss_mb": None, "output_bytes": None, "mb_per_s": None,
+                }
+                if ok:
+                    wall_s = statistics.median(r["wall_s"] for r in ok)
+                    peaks = [r["peak_rss_mb"] for r in ok if r["peak_rss_mb"] is not None]
+                    entry.update({
+                        "wall_s": round(wall_s, 3),
+                        "peak_rss_mb": max(peaks) if peaks else None,
+                        "output_bytes": ok[-1]["output_bytes"],
+                        "mb_per_s": round(input_mb / wall_s, 3) if wall_s else None,
+                    })
+                    print(f"   [OK] {entry['wall_s']}s, {entry['mb_per_s']} MB/s, peak {entry['peak_rss_mb']} MB")
+                else:
+                    print(f"   [FAIL] {runs[-1]['error']}")
+                results.append(entry)
+    
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment_info(),
+        "converters": {name: converter_version(CONVERTERS[name]["script"]) for name in converters},
+        "settings": {"repeat": repeat, "warmup": warmup, "timeout": timeout},
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold_percent: float = 10.0) -> List[Dict]:
+    """
+    Per (converter, file) change of each compared metric relative to the baseline
+    
+    A change is a regression when the metric gets worse by more than
+    threshold_percent; a previously passing conversion that now fails is
+    always a regression.
+    """
+    baseline_entries = {(e["converter"], e["file"]): e for e in baseline["results"]}
+    rows = []
+    for entry in current["results"]:
+        base = baseline_entries.get((entry["converter"], entry["file"]))
+        if base is None:
+            continue
+        if base["success"] and not entry["success"]:
+            rows.append({"converter": entry["converter"], "file": entry["file"], "metric": "success",
+                         "baseline": True, "current": False, "change_percent": None, "regression": True})
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = base.get(metric), entry.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            rows.append({"converter": entry["converter"], "file": entry["file"], "metric": metric,
+                         "baseline": old, "current": new, "change_percent": round(change, 1),
+                         "regression": worse > threshold_percent})
+    return rows
+
+
+def print_comparison(rows: List[Dict]):
+    print(f"{'converter':<15} {'file':<28} {'metric':<12} {'baseline':>10} {'current':>10} {'change':>8}")
+    for row in rows:
+        change = f"{row['change_percent']:+.1f}%" if row["change_percent"] is not None else "-"
+        flag = "  << REGRESSION" if row["regression"] else ""
+        print(f"{row['converter']:<15} {row['file']:<28} {row['metric']:<12} "
+              f"{str(row['baseline']):>10} {str(row['current']):>10} {change:>8}{flag}")
+
+
+def _load(path: Path) -> Dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save(document: Dict, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+    print(f"[SAVED] {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the IFC to Fragments converters")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    run_parser = commands.add_parser("run", help="Run the benchmark")
+    run_parser.add_argument("--corpus", default=str(DEFAULT_CORPUS_DIR), help="Directory of .ifc files")
+    run_parser.add_argument("--files", nargs="+", help="Only these corpus file names")
+    run_parser.add_argument("--converters", nargs="+", choices=list(CONVERTERS), default=list(CONVERTERS))
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--warmup", type=int, default=1)
+    run_parser.add_argument("--timeout", type=float, default=3600)
+    run_parser.add_argument("--output", help="Result file (default benchmarks/results/<timestamp>.json)")
+    run_parser.add_argument("--save-baseline", action="store_true", help="Also store the result as the baseline")
+    run_parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    run_parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    
+    compare_parser = commands.add_parser("compare", help="Compare a result file with the baseline")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+    
+    if args.command == "compare":
+        rows = compare(_load(Path(args.results)), _load(Path(args.baseline)), args.threshold)
+        print_comparison(rows)
+        return 1 if any(row["regression"] for row in rows) else 0
+    
+    corpus_dir = Path(args.corpus)
+    ifc_files = sorted(corpus_dir.glob("*.ifc"), key=lambda p: p.stat().st_size)
+    if args.files:
+        ifc_files = [p for p in ifc_files if p.name in args.files]
+    if not ifc_files:
+        print(f"[ERROR] No IFC files in {corpus_dir}; generate them with: python -m benchmarks.generate_ifc --corpus {corpus_dir}")
+        return 1
+    
+    document = benchmark(args.converters, ifc_files, args.repeat, args.warmup, args.timeout)
+    output = Path(args.output) if args.output else DEFAULT_RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    _save(document, output)
+    
+    baseline = Path(args.baseline)
+    if args.save_baseline:
+        _save(document, baseline)
+    elif baseline.exists():
+        rows = compare(document, _load(baseline), args.threshold)
+        print_comparison(rows)
+        return 1 if any(row["regression"] for row in rows) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+r"""
+Conversion History Store
+========================
+
+Append-only SQLite record of every IFC to Fragments conversion, replacing
+the per-run `conversion_report_<timestamp>.json` files. One row per file
+conversion (input hash and size, duration, peak memory, output size,
+converter version) and one row per batch run.
+
+Rows are never updated or deleted (enforced by triggers), and the common
+query paths (time range, source/status, input hash) are indexed, so
+questions like "p95 seconds per MB this month" are a single query.
+
+Usage:
+    # Latency and throughput percentiles for successful conversions
+    python conversion_history.py stats --since 2025-07-01
+    
+    # Per-month breakdown as JSON
+    python conversion_history.py stats --group-by month --json
+    
+    # Backfill from old JSON reports
+    python conversion_history.py import-reports reports/
+
+The database location is QGEN_IMPFRAG_HISTORY_DB, or the path passed with
+--db, or `reports/conversion_history.db` in the working directory.
+
+Only Python standard libraries are used, so the package stays portable.
+"""
+
+import os
+import json
+import uuid
+import sqlite3
+import hashlib
+import argparse
+import subprocess
+from contextlib import contextmanager
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from output_capture import run_streaming
+
+DEFAULT_DB = Path("reports") / "conversion_history.db"
+PERCENTILES = (50, 90, 95, 99)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at TEXT NOT NULL,
+    run_id TEXT,
+    source TEXT NOT NULL,
+    ifc_name TEXT NOT NULL,
+    ifc_sha256 TEXT,
+    input_bytes INTEGER,
+    status TEXT NOT NULL,
+    duration_s REAL,
+    peak_memory_mb REAL,
+    output_bytes INTEGER,
+    converter_version TEXT,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_conversions_recorded_at ON conversions (recorded_at);
+CREATE INDEX IF NOT EXISTS idx_conversions_source_status ON conversions (source, status, recorded_at);
+CREATE INDEX IF NOT EXISTS idx_conversions_sha256 ON conversions (ifc_sha256);
+
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT,
+    total_files INTEGER,
+    successful INTEGER,
+    failed INTEGER,
+    skipped INTEGER,
+    jobs INTEGER,
+    input_mb REAL,
+    total_time_s REAL,
+    environment TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started_at ON runs (started_at);
+
+CREATE TRIGGER IF NOT EXISTS conversions_append_only_update BEFORE UPDATE ON conversions
+BEGIN SELECT RAISE(ABORT, 'conversion history is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS conversions_append_only_delete BEFORE DELETE ON conversions
+BEGIN SELECT RAISE(ABORT, 'conversion history is append-only'); END;
+"""
+
+# Columns added after the first release: (table, name, declaration)
+ADDED_COLUMNS = [
+    ("conversions", "ifc_entities", "INTEGER"),
+    ("runs", "report_sha256", "TEXT"),
+]
+
+
+def file_sha256(file_path: Path) -> str:
+    """SHA-256 of a file, read in 1 MB chunks (also the backend's cache and ETag hash)"""
+    hash_sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hash_sha256.update(chunk)
+    return hash_sha256.hexdigest()
+
+
+def converter_version(converter_script: Path) -> str:
+    """Version tag of a converter: its script contents plus its npm dependencies"""
+    version = hashlib.sha256(Path(converter_script).read_bytes())
+    package_json = Path(converter_script).parent / "package.json"
+    if package_json.exists():
+        dependencies = json.loads(package_json.read_text(encoding='utf-8')).get("dependencies", {})
+        version.update(json.dumps(dependencies, sort_keys=True).encode())
+    return version.hexdigest()[:16]
+
+
+def run_measured(cmd: List[str], timeout: Optional[float] = None, **kwargs) -> Tuple[subprocess.CompletedProcess, Optional[float]]:
+    """
+    subprocess.run with captured output that also reports the peak resident
+    memory (MB) of the child and the descendants it waited for
+    
+    Output is read through output_capture.run_streaming, so stdout / stderr
+    are bounded tails and `on_line` / `tail_kb` are accepted. Platforms
+    without os.wait4 report None as the peak.
+    """
+    result = run_streaming(cmd, timeout=timeout, **kwargs)
+    return result, result.peak_memory_mb
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _percentile(sorted_values: List[float], percent: float) -> Optional[float]:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * percent / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+class ConversionHistory:
+    """
+    Append-only conversion history in a SQLite database
+    """
+    
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or os.getenv("QGEN_IMPFRAG_HISTORY_DB") or DEFAULT_DB)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            for table, name, declaration in ADDED_COLUMNS:
+                existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+    
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and is always closed"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        # WAL lets parallel converters append while reports are being queried
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def record(self, source: str, ifc_name: str, status: str, duration_s: Optional[float] = None,
+               ifc_path: Optional[Path] = None, ifc_sha256: Optional[str] = None,
+               input_bytes: Optional[int] = None, output_path: Optional[Path] = None,
+               output_bytes: Optional[int] = None, peak_memory_mb: Optional[float] = None,
+               converter_version: Optional[str] = None, run_id: Optional[str] = None,
+               message: Optional[str] = None, recorded_at: Optional[str] = None,
+               ifc_entities: Optional[int] = None) -> int:
+        """
+        Append one conversion; sizes are read from the paths when given
+        
+        The input hash is not computed here, as that would read the whole
+        IFC once more; pass the one staging or the pre-scan produced.
+        """
+        if ifc_path and Path(ifc_path).exists():
+            input_bytes = input_bytes if input_bytes is not None else Path(ifc_path).stat().st_size
+        if output_path and Path(output_path).exists():
+            output_bytes = output_bytes if output_bytes is not None else Path(output_path).stat().st_size
+        
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO conversions (recorded_at, run_id, source, ifc_name, ifc_sha256, input_bytes, "
+                "status, duration_s, peak_memory_mb, output_bytes, converter_version, message, ifc_entities) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (recorded_at or _utc_now(), run_id, source, ifc_name, ifc_sha256, input_bytes,
+                 status, duration_s, peak_memory_mb, output_bytes, converter_version, message, ifc_entities)
+            )
+            return cursor.lastrowid
+    
+    def record_run(self, source: str, stats: Dict, environment: Optional[Dict] = None,
+                   run_id: Optional[str] = None, report_sha256: Optional[str] = None) -> str:
+        """Append the summary of one batch run (the former JSON report, identified by `report_sha256`)"""
+        run_id = run_id or uuid.uuid4().hex
+        
+        def iso(value):
+            return value.isoformat() if isinstance(value, datetime) else value
+        
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO runs (run_id, source, started_at, finished_at, total_files, successful, "
+                "failed, skipped, jobs, input_mb, total_time_s, environment, report_sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, source, iso(stats.get('start_time')), iso(stats.get('end_time')),
+                 stats.get('total_files'), stats.get('successful'), stats.get('failed'),
+                 stats.get('skipped'), stats.get('jobs', 1), stats.get('input_mb'),
+                 stats.get('total_time'), json.dumps(environment or {}, default=str), report_sha256)
+            )
+        return run_id
+    
+    def stats(self, since: Optional[str] = None, until: Optional[str] = None,
+              source: Optional[str] = None, status: str = "success",
+              group_by: Optional[str] = None) -> List[Dict]:
+        """
+        Latency and throughput percentiles over a time range
+        
+        group_by: None, "day" or "month" (buckets on recorded_at, UTC)
+        """
+        clauses, params = ["status = ?"], [status]
+        if since:
+            clauses.append("recorded_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("recorded_at < ?")
+            params.append(until)
+        if source:
+            clauses.append("source = ?")
+            params.append(source)
+        
+        bucket = {"day": "substr(recorded_at, 1, 10)", "month": "substr(recorded_at, 1, 7)"}.get(group_by, "'all'")
+        query = (f"SELECT {bucket} AS bucket, duration_s, input_bytes, output_bytes, peak_memory_mb "
+                 f"FROM conversions WHERE {' AND '.join(clauses)} ORDER BY bucket")
+        
+        groups: Dict[str, List[sqlite3.Row]] = {}
+        with self._connect() as conn:
+            for row in conn.execute(query, params):
+                groups.setdefault(row["bucket"], []).append(row)
+        
+        return [self._summarize(bucket, rows) for bucket, rows in groups.items()]
+    
+    def latest_id(self) -> int:
+        """Id of the newest conversion (0 when empty); cheap change detection"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM conversions").fetchone()[0]
+    
+    def duration_samples(self, sources: Optional[List[str]] = None, converter_version: Optional[str] = None,
+                         limit: int = 2000) -> List[Dict]:
+        """Newest successful conversions with a duration and input size, for model fitting"""
+        clauses, params = ["status = 'success'", "duration_s > 0", "input_bytes > 0"], []
+        if sources:
+            clauses.append(f"source IN ({', '.join('?' * len(sources))})")
+            params.extend(sources)
+        if converter_version:
+            clauses.append("converter_version = ?")
+            params.append(converter_version)
+        query = (f"SELECT input_bytes, ifc_entities, duration_s FROM conversions "
+                 f"WHERE {' AND '.join(clauses)} ORDER BY id DESC LIMIT ?")
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params + [limit])]
+    
+    def _summarize(self, bucket: str, rows: List[sqlite3.Row]) -> Dict:
+        durations = sorted(r["duration_s"] for r in rows if r["duration_s"] is not None)
+        seconds_per_mb = sorted(
+            r["duration_s"] / (r["input_bytes"] / (1024 * 1024))
+            for r in rows if r["duration_s"] is not None and r["input_bytes"]
+        )
+        peaks = sorted(r["peak_memory_mb"] for r in rows if r["peak_memory_mb"] is not None)
+        input_mb = sum((r["input_bytes"] or 0) for r in rows) / (1024 * 1024)
+        busy_s = sum(durations)
+        
+        summary = {
+            "bucket": bucket,
+            "count": len(rows),
+            "input_mb": round(input_mb, 2),
+            "throughput_mb_per_s": round(input_mb / busy_s, 3) if busy_s else None
+        }
+        for p in PERCENTILES:
+            value = _percentile(durations, p)
+            summary[f"duration_p{p}_s"] = round(value, 3) if value is not None else None
+            value = _percentile(seconds_per_mb, p)
+            summary[f"seconds_per_mb_p{p}"] = round(value, 3) if value is not None else None
+        value = _percentile(peaks, 95)
+        summary["peak_memory_p95_mb"] = round(value, 1) if value is not None else None
+        return summary
+    
+    def import_report(self, report_file: Path, source: str = "frag_convert") -> Optional[int]:
+        """
+        Backfill one legacy JSON report; returns the number of conversions added
+        
+        A report whose contents were imported before (under any file name)
+        is skipped and returns None, so re-running an import adds nothing.
+        """
+        report_sha256 = file_sha256(report_file)
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM runs WHERE report_sha256 = ?", (report_sha256,)).fetchone():
+                return None
+        with open(report_file, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        
+        summary = report.get('conversion_summary', {})
+        recorded_at = report.get('timestamp') or _utc_now()
+        # Parsed up front, so a malformed entry fails before anything is written
+        conversions = []
+        for result in summary.get('results', []):
+            if result.get('status') == 'skipped':
+                continue
+            stats = result.get('stats', {})
+            input_mb = stats.get('inputSizeMB', stats.get('input_size_mb'))
+            output_mb = stats.get('outputSizeMB', stats.get('output_size_mb'))
+            conversions.append(dict(
+                ifc_name=result.get('file', ''), status=result.get('status', 'unknown'),
+                duration_s=result.get('conversion_time'),
+                input_bytes=int(float(input_mb) * 1024 * 1024) if input_mb not in (None, 'N/A') else None,
+                output_bytes=int(float(output_mb) * 1024 * 1024) if output_mb not in (None, 'N/A') else None,
+                message=result.get('message')
+            ))
+        
+        run_id = self.record_run(source, summary, report.get('environment'), report_sha256=report_sha256)
+        for conversion in conversions:
+            self.record(source, run_id=run_id, recorded_at=recorded_at, **conversion)
+        return len(conversions)
+
+
+def print_stats(rows: List[Dict]):
+    if not rows:
+        print("[STATS] No matching conversions")
+        return
+    for row in rows:
+        print(f"[STATS] {row['bucket']}: {row['count']} conversions, {row['input_mb']:.2f} MB, "
+              f"{row['throughput_mb_per_s'] or 0:.3f} MB/s")
+        print(f"   duration  p50 {row['duration_p50_s']}s  p90 {row['duration_p90_s']}s  "
+              f"p95 {row['duration_p95_s']}s  p99 {row['duration_p99_s']}s")
+        print(f"   s/MB      p50 {row['seconds_per_mb_p50']}  p90 {row['seconds_per_mb_p90']}  "
+              f"p95 {row['seconds_per_mb_p95']}  p99 {row['seconds_per_mb_p99']}")
+        if row['peak_memory_p95_mb'] is not None:
+            print(f"   peak memory p95 {row['peak_memory_p95_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the IFC conversion history")
+    parser.add_argument('--db', help=f"History database (default: $QGEN_IMPFRAG_HISTORY_DB or {DEFAULT_DB})")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    stats_parser = subparsers.add_parser('stats', help='Latency and throughput percentiles')
+    stats_parser.add_argument('--since', help='ISO date/time (inclusive, UTC)')
+    stats_parser.add_argument('--until', help='ISO date/time (exclusive, UTC)')
+    stats_parser.add_argument('--source', help='Only conversions from this source')
+    stats_parser.add_argument('--status', default='success', help='Conversion status (default: success)')
+    stats_parser.add_argument('--group-by', choices=['day', 'month'], help='Bucket results by day or month')
+    stats_parser.add_argument('--json', action='store_true', help='Print JSON instead of text')
+    
+    import_parser = subparsers.add_parser('import-reports', help='Backfill legacy JSON reports')
+    import_parser.add_argument('reports_dir', help='Directory containing conversion_report_*.json')
+    import_parser.add_argument('--source', default='frag_convert', help='Source label for imported rows')
+    
+    args = parser.parse_args()
+    history = ConversionHistory(args.db)
+    
+    if args.command == 'stats':
+        rows = history.stats(args.since, args.until, args.source, args.status, args.group_by)
+        if args.json:
+            print(json.dumps(rows, indent=2))
+        else:
+            print_stats(rows)
+    elif args.command == 'import-reports':
+        total = 0
+        for report_file in sorted(Path(args.reports_dir).glob("conversion_report_*.json")):
+            count = history.import_report(report_file, args.source)
+            if count is None:
+                print(f"[IMPORT] {report_file.name}: already imported, skipped")
+                continue
+            print(f"[IMPORT] {report_file.name}: {count} conversions")
+            total += count
+        print(f"[DONE] Imported {total} conversions into {history.db_path}")
+
+
+if __name__ == "__main__":
+    main()
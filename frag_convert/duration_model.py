@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Conversion Duration Model
+=========================
+
+Predicts how long an IFC to Fragments conversion will take, fitted on the
+successful conversions in the conversion history. Timeouts are set from
+the upper confidence bound of the prediction instead of fixed size steps,
+and queued jobs get an estimated duration for their ETA.
+
+The model is a least-squares fit in log space:
+    
+    log(duration) = b0 + b1 * log(input MB) [+ b2 * log(entity count)]
+
+The entity term is used when enough history rows carry an entity count
+(`count_entities`) and the caller knows the count of the file at hand.
+The upper bound is the one-sided prediction interval at
+QGEN_IMPFRAG_TIMEOUT_CONFIDENCE (default 0.99); the timeout adds
+QGEN_IMPFRAG_TIMEOUT_MARGIN (default 1.5x) on top and is clamped to
+[QGEN_IMPFRAG_MIN_TIMEOUT, QGEN_IMPFRAG_MAX_TIMEOUT] seconds. With fewer
+than MIN_RECORDS matching conversions the caller's default applies.
+
+The fit is redone when the history has new rows, checked at most every
+REFIT_SECONDS, so the model follows the data as conversions complete.
+    
+    model = DurationModel(history)
+    model.predict(input_bytes, entities, sources=["backend_node"])
+    timeout = model.timeout(input_bytes, default=default_timeout(size_mb))
+
+Only Python standard libraries are used, so the package stays portable.
+"""
+
+import os
+import math
+import time
+import threading
+from pathlib import Path
+from statistics import NormalDist
+from typing import Dict, List, Optional, Sequence
+
+MIN_RECORDS = 8
+MAX_RECORDS = 2000
+REFIT_SECONDS = 30
+CONFIDENCE = float(os.getenv("QGEN_IMPFRAG_TIMEOUT_CONFIDENCE", "0.99"))
+TIMEOUT_MARGIN = float(os.getenv("QGEN_IMPFRAG_TIMEOUT_MARGIN", "1.5"))
+MIN_TIMEOUT = float(os.getenv("QGEN_IMPFRAG_MIN_TIMEOUT", "120"))
+MAX_TIMEOUT = float(os.getenv("QGEN_IMPFRAG_MAX_TIMEOUT", "14400"))
+
+# Former fixed timeouts: (min IFC size in MB, timeout in seconds)
+DEFAULT_TIMEOUT_STEPS = [(100, 3600), (50, 1800), (10, 1200), (0, 600)]
+
+_MB = 1024 * 1024
+
+
+def default_timeout(file_size_mb: float) -> int:
+    """Size-step timeout used until the model has enough history"""
+    for min_size_mb, timeout in DEFAULT_TIMEOUT_STEPS:
+        if file_size_mb > min_size_mb:
+            return timeout
+    return DEFAULT_TIMEOUT_STEPS[-1][1]
+
+
+def bounded_timeout(upper_s: float) -> int:
+    """Timeout for a predicted upper bound: margin on top, clamped to the limits"""
+    return round(min(max(upper_s * TIMEOUT_MARGIN, MIN_TIMEOUT), MAX_TIMEOUT))
+
+
+def count_entities(ifc_path: Path) -> int:
+    """Number of STEP entity instances (lines starting with '#'), read in 1 MB chunks"""
+    count = 0
+    previous = b"\n"
+    with open(ifc_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            count += chunk.count(b"\n#") + (previous == b"\n" and chunk[:1] == b"#")
+            previous = chunk[-1:]
+    return count
+
+
+def _invert(matrix: List[List[float]]) -> Optional[List[List[float]]]:
+    """Gauss-Jordan inverse of a small matrix; None when singular"""
+    n = len(matrix)
+    rows = [list(row) + [float(i == j) for j in range(n)] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            return None
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        scale = rows[col][col]
+        rows[col] = [value / scale for value in rows[col]]
+        for r in range(n):
+            if r != col and rows[r][col]:
+                factor = rows[r][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [row[n:] for row in rows]
+
+
+class LogLinearFit:
+    """
+    Ordinary least squares of log(duration) on log features
+    """
+    
+    def __init__(self, features: List[List[float]], log_durations: List[float]):
+        design = [[1.0] + row for row in features]
+        k = len(design[0])
+        xtx = [[sum(row[i] * row[j] for row in design) for j in range(k)] for i in range(k)]
+        self.xtx_inverse = _invert(xtx)
+        if self.xtx_inverse is None:
+            raise ValueError("Conversion history does not vary enough to fit a model")
+        xty = [sum(row[i] * y for row, y in zip(design, log_durations)) for i in range(k)]
+        self.coefficients = [sum(self.xtx_inverse[i][j] * xty[j] for j in range(k)) for i in range(k)]
+        
+        residuals = [y - self._dot(row) for row, y in zip(design, log_durations)]
+        dof = max(len(design) - k, 1)
+        self.sigma = math.sqrt(sum(r * r for r in residuals) / dof)
+        self.records = len(design)
+    
+    def _dot(self, row: List[float]) -> float:
+        return sum(c * x for c, x in zip(self.coefficients, row))
+    
+    def predict(self, features: List[float], confidence: float) -> Dict:
+        row = [1.0] + features
+        k = len(row)
+        leverage = sum(row[i] * self.xtx_inverse[i][j] * row[j] for i in range(k) for j in range(k))
+        log_expected = self._dot(row)
+        spread = NormalDist().inv_cdf(confidence) * self.sigma * math.sqrt(1 + max(leverage, 0.0))
+        return {
+            "expected_s": round(math.exp(log_expected), 1),
+            "upper_s": round(math.exp(log_expected + spread), 1),
+            "confidence": confidence,
+            "records": self.records
+        }
+
+
+class DurationModel:
+    """
+    Conversion duration predictions refitted from a ConversionHistory
+    """
+    
+    def __init__(self, history, converter_version: Optional[str] = None, min_records: int = MIN_RECORDS,
+                 max_records: int = MAX_RECORDS, refit_seconds: float = REFIT_SECONDS,
+                 confidence: float = CONFIDENCE):
+        self.history = history
+        # Only fit on conversions of this converter version (e.g. to leave out mock fallbacks)
+        self.converter_version = converter_version
+        self.min_records = min_records
+        self.max_records = max_records
+        self.refit_seconds = refit_seconds
+        self.confidence = confidence
+        self._fits: Dict[tuple, Dict[str, Optional[LogLinearFit]]] = {}
+        self._latest_id = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    def _refresh(self):
+        """Drop the fits when the history has new rows (caller holds the lock)"""
+        now = time.time()
+        if now - self._checked_at < self.refit_seconds:
+            return
+        self._checked_at = now
+        latest_id = self.history.latest_id()
+        if latest_id != self._latest_id:
+            self._latest_id = latest_id
+            self._fits.clear()
+    
+    def _fit(self, samples: List[Dict], with_entities: bool) -> Optional[LogLinearFit]:
+        if with_entities:
+            samples = [s for s in samples if s["ifc_entities"]]
+        if len(samples) < self.min_records:
+            return None
+        features = [[math.log(s["input_bytes"] / _MB)] + ([math.log(s["ifc_entities"])] if with_entities else [])
+                    for s in samples]
+        try:
+            return LogLinearFit(features, [math.log(s["duration_s"]) for s in samples])
+        except ValueError:
+            return None
+    
+    def _fits_for(self, sources: Optional[Sequence[str]]) -> Dict[str, Optional[LogLinearFit]]:
+        key = tuple(sorted(sources)) if sources else ()
+        with self._lock:
+            self._refresh()
+            fits = self._fits.get(key)
+            if fits is None:
+                samples = self.history.duration_samples(list(key) or None, self.converter_version,
+                                                        self.max_records)
+                fits = {"size": self._fit(samples, False), "entities": self._fit(samples, True)}
+                self._fits[key] = fits
+            return fits
+    
+    def predict(self, input_bytes: int, entities: Optional[int] = None,
+                sources: Optional[Sequence[str]] = None) -> Optional[Dict]:
+        """
+        Expected duration and upper bound in seconds, or None without enough history
+        
+        `sources` restricts the fit to conversions recorded by those
+        converters (history `source` column).
+        """
+        if not input_bytes:
+            return None
+        try:
+            fits = self._fits_for(sources)
+        except Exception:
+            return None
+        
+        size_feature = math.log(input_bytes / _MB)
+        if entities and fits["entities"]:
+            prediction = fits["entities"].predict([size_feature, math.log(entities)], self.confidence)
+            prediction["features"] = ["input_mb", "entities"]
+        elif fits["size"]:
+            prediction = fits["size"].predict([size_feature], self.confidence)
+            prediction["features"] = ["input_mb"]
+        else:
+            return None
+        return prediction
+    
+    def timeout(self, input_bytes: int, entities: Optional[int] = None,
+                sources: Optional[Sequence[str]] = None, default: Optional[float] = None) -> float:
+        """Timeout in seconds from the upper bound, or `default` without enough history"""
+        prediction = self.predict(input_bytes, entities, sources)
+        if prediction is None:
+            return default if default is not None else default_timeout(input_bytes / _MB)
+        return bounded_timeout(prediction["upper_s"])
+    
+    def expected_seconds(self, input_bytes: int, entities: Optional[int] = None,
+                         sources: Optional[Sequence[str]] = None) -> Optional[float]:
+        prediction = self.predict(input_bytes, entities, sources)
+        return prediction["expected_s"] if prediction else None
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Filesystem Work Leases
+======================
+
+Lets converters on several hosts share one batch of IFC files through
+nothing but a shared directory (e.g. on NFS). A host claims a file by
+creating its lease file atomically, keeps the lease alive with a
+heartbeat while it converts, and publishes the result next to it:
+    
+    <lease_dir>/<name>-<hash>.lease          owner, host, attempt, expires_at
+    <lease_dir>/<name>-<hash>.result.json    published result
+
+- Claiming links a private temp file to the lease name (`os.link`), which
+  is atomic on local filesystems and NFS alike; only one host succeeds.
+- The heartbeat rewrites the lease every `ttl / 3` seconds with a new
+  `expires_at` (write + rename). A host that finds its lease taken over
+  marks it lost and does not publish.
+- A lease whose `expires_at` has passed belongs to a crashed (or hung)
+  host. It is taken over by renaming it away, which again only one host
+  wins, and the file is converted again. After `max_attempts` expired
+  leases the file is published as failed, so a model that kills its
+  converter host does not take down every host in turn.
+- A result is valid while the IFC file's size and mtime match those
+  recorded in it; a changed file is converted again.
+- Results also record the directory's `generation` (the converter version,
+  plus a batch id if one is given). Results of another generation do not
+  count, so a lease directory reused after a converter upgrade, or for a
+  new batch id, converts every file again instead of nothing. All hosts of
+  one batch must run with the same generation.
+- Lease names hash the file's path relative to the batch source directory
+  (`source_root`), so hosts that mount the share at different paths
+  (a drive letter on Windows, `/data/XALG/...` on Linux) agree on them.
+
+Expiry compares `expires_at` with the local clock, so hosts need roughly
+synchronised clocks (NTP); QGEN_IMPFRAG_LEASE_TTL (default 120 seconds)
+must be well above any clock skew.
+    
+    leases = LeaseDirectory("/data/XALG/.../.conversion_leases", source_root="/data/XALG/.../ifc",
+                            generation=converter_version)
+    lease = leases.claim(ifc_file)
+    if lease:
+        with lease:                       # heartbeat while converting
+            result = convert(ifc_file)
+            leases.publish(lease, result)
+
+Only Python standard libraries are used, so the package stays portable.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, List, Optional
+
+LEASE_TTL = float(os.getenv("QGEN_IMPFRAG_LEASE_TTL", "120"))
+MAX_ATTEMPTS = int(os.getenv("QGEN_IMPFRAG_LEASE_MAX_ATTEMPTS", "3"))
+
+LEASE_SUFFIX = ".lease"
+RESULT_SUFFIX = ".result.json"
+
+
+def worker_id() -> str:
+    """Unique lease owner name: host, process and a random part"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _fingerprint(source: Path) -> Dict:
+    stat = source.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_json(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: Path, data: Dict):
+    """Write a file completely before it appears under its name"""
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Lease:
+    """
+    A claimed file; renewed by a heartbeat thread while used as a context manager
+    """
+    
+    def __init__(self, directory: "LeaseDirectory", source: Path, path: Path, attempt: int):
+        self.directory = directory
+        self.source = source
+        self.path = path
+        self.owner = directory.owner
+        self.attempt = attempt
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _content(self) -> Dict:
+        now = time.time()
+        return {
+            "owner": self.owner,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "source": str(self.source),
+            "attempt": self.attempt,
+            "renewed_at": now,
+            "expires_at": now + self.directory.ttl
+        }
+    
+    def held(self) -> bool:
+        """Whether the lease file still names this owner"""
+        current = _read_json(self.path)
+        return bool(current) and current.get("owner") == self.owner
+    
+    def renew(self) -> bool:
+        """Push the expiry out by one TTL; False (and `lost`) once another host has taken over"""
+        if self.lost or not self.held():
+            self.lost = True
+            return False
+        _write_json(self.path, self._content())
+        return True
+    
+    def _heartbeat(self):
+        while not self._stop.wait(self.directory.ttl / 3):
+            try:
+                if not self.renew():
+                    return
+            except OSError:
+                # A transient filesystem error; the lease survives until it expires
+                continue
+    
+    def start(self) -> "Lease":
+        self._thread = threading.Thread(target=self._heartbeat, name=f"lease-{self.path.stem}", daemon=True)
+        self._thread.start()
+        return self
+    
+    def release(self):
+        """Stop the heartbeat and remove the lease file if it is still ours"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if not self.lost and self.held():
+            self.path.unlink(missing_ok=True)
+    
+    def __enter__(self) -> "Lease":
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.release()
+
+
+class LeaseDirectory:
+    """
+    Lease and result files for a batch of source files in a shared directory
+    """
+    
+    def __init__(self, root: Path, owner: Optional[str] = None, ttl: float = LEASE_TTL,
+                 max_attempts: int = MAX_ATTEMPTS, source_root: Optional[Path] = None,
+                 generation: Optional[str] = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.source_root = Path(source_root).resolve() if source_root else None
+        # Results published under another generation are stale
+        self.generation = generation
+        self.owner = owner or worker_id()
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+    
+    def key_for(self, source: Path) -> str:
+        """
+        File name stem for a source, the same on every host
+        
+        The path relative to `source_root` is hashed, as the same name may
+        occur twice; a source outside it falls back to its name and size.
+        """
+        source = Path(source)
+        try:
+            identity = source.resolve().relative_to(self.source_root).as_posix()
+        except (TypeError, ValueError):
+            identity = f"{source.name}:{source.stat().st_size}"
+        digest = hashlib.sha1(identity.encode("utf-8")).hexdigest()[:12]
+        return f"{source.stem}-{digest}"
+    
+    def _lease_path(self, source: Path) -> Path:
+        return self.root / f"{self.key_for(source)}{LEASE_SUFFIX}"
+    
+    def _result_path(self, source: Path) -> Path:
+        return self.root / f"{self.key_for(source)}{RESULT_SUFFIX}"
+    
+    def result(self, source: Path) -> Optional[Dict]:
+        """Published result for the current version of a source file and generation, if any"""
+        result = _read_json(self._result_path(source))
+        if not result or result.get("generation") != self.generation:
+            return None
+        try:
+            if result.get("fingerprint") != _fingerprint(Path(source)):
+                return None
+        except OSError:
+            return None
+        return result
+    
+    def holder(self, source: Path) -> Optional[Dict]:
+        """Content of the live lease on a source, or None when it is free or expired"""
+        lease = _read_json(self._lease_path(source))
+        if lease and lease.get("expires_at", 0) > time.time():
+            return lease
+        return None
+    
+    def _take_over(self, lease_path: Path, expired: Dict) -> Optional[int]:
+        """
+        Remove an expired lease; returns the attempt count it carried, or None
+        if another host got to it first or its owner renewed it after all
+        """
+        stale = lease_path.with_name(f".{lease_path.name}.{uuid.uuid4().hex}.stale")
+        try:
+            os.rename(lease_path, stale)
+        except FileNotFoundError:
+            return None
+        content = _read_json(stale) or expired
+        if content.get("expires_at", 0) > time.time():
+            # Renewed between our read and the rename: put it back
+            try:
+                os.link(stale, lease_path)
+            except FileExistsError:
+                pass
+            stale.unlink(missing_ok=True)
+            return None
+        stale.unlink(missing_ok=True)
+        return int(content.get("attempt", 1))
+    
+    def claim(self, source: Path) -> Optional[Lease]:
+        """
+        Lease a source file for conversion
+        
+        Returns None when the file has a current result or is leased by a
+        live owner. Call `start()` on the lease (or use it as a context
+        manager) to keep it alive.
+        """
+        source = Path(source)
+        if self.result(source):
+            return None
+        lease_path = self._lease_path(source)
+        
+        attempt = 1
+        existing = _read_json(lease_path)
+        if existing is None and lease_path.exists():
+            # Unreadable or half-visible lease; decide on the next pass
+            return None
+        if existing:
+            if existing.get("expires_at", 0) > time.time():
+                return None
+            previous = self._take_over(lease_path, existing)
+            if previous is None:
+                return None
+            attempt = previous + 1
+            if attempt > self.max_attempts:
+                self._write_result(source, {
+                    "file": source.name,
+                    "status": "failed",
+                    "message": f"Abandoned after {previous} attempts whose leases expired "
+                               f"(last held by {existing.get('host')})"
+                })
+                return None
+        
+        lease = Lease(self, source, lease_path, attempt)
+        tmp = lease_path.with_name(f".{lease_path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(lease._content(), f, indent=2)
+        try:
+            os.link(tmp, lease_path)
+        except FileExistsError:
+            return None
+        finally:
+            tmp.unlink(missing_ok=True)
+        
+        # Another host may have published and released between our check and the link
+        if self.result(source):
+            lease.release()
+            return None
+        return lease
+    
+    def _write_result(self, source: Path, result: Dict):
+        _write_json(self._result_path(source), {
+            **result,
+            "source": str(source),
+            "fingerprint": _fingerprint(source),
+            "generation": self.generation,
+            "owner": self.owner,
+            "host": socket.gethostname(),
+            "published_at": datetime.now().isoformat(timespec="seconds")
+        })
+    
+    def publish(self, lease: Lease, result: Dict) -> bool:
+        """
+        Store a result for the leased file and release the lease
+        
+        Returns False without publishing when the lease was lost to another
+        host, whose result then counts instead.
+        """
+        if lease.lost or not lease.held():
+            lease.lost = True
+            lease.release()
+            return False
+        self._write_result(lease.source, result)
+        lease.release()
+        return True
+    
+    def pending(self, sources: List[Path]) -> List[Path]:
+        """Sources without a current result"""
+        return [source for source in sources if not self.result(source)]
+    
+    def summary(self, sources: List[Path]) -> Dict[str, int]:
+        """Counts of published results by status, plus leased and open files"""
+        counts = {"leased": 0, "open": 0}
+        for source in sources:
+            result = self.result(source)
+            if result:
+                counts[result.get("status", "unknown")] = counts.get(result.get("status", "unknown"), 0) + 1
+            elif self.holder(source):
+                counts["leased"] += 1
+            else:
+                counts["open"] += 1
+        return counts
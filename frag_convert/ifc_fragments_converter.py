@@ -9,11 +9,23 @@ This tool can be used from any project to convert IFC files to compressed Fragme
 Features:
 - Portable: Can be called from any directory/project
 - Batch processing: Handles multiple IFC files automatically
+- Parallel batches: Converts several files at once with --jobs N
+- Shortest job first: Small files are converted before large ones, and
+  --priority batch (the default) runs Node.js at a lower CPU priority so
+  interactive conversions on the same machine go first
 - Command line interface: Flexible source/target directory specification
 - Progress tracking: Real-time conversion progress and statistics
 - Error handling: Graceful error recovery and detailed logging
+- Pre-scan: Truncated, non-STEP and unsupported-schema files are rejected
+  before Node.js starts (see ifc_prescan.py)
+- Split mode: --split cuts a model into one IFC per storey (ifc_splitter.py),
+  converts the parts in parallel and writes <name>.manifest.json listing
+  the part fragments with bounding boxes, for loading storeys on demand
+- Interruption: Ctrl-C or SIGTERM stops every Node.js process of the run
+  (each runs in its own process group) and removes partial .frag files
 - Performance stats: Compression ratios and conversion times
-- JSON reports: Detailed conversion reports for tracking
+- Conversion history: Every conversion and run is appended to a SQLite
+  store (see conversion_history.py for percentile queries)
 
 Usage:
     # Convert all IFC files in a directory
@@ -24,6 +36,12 @@ Usage:
     
     # Convert single file
     python D:\XQG4\frag_convert\ifc_fragments_converter.py <source_dir> <target_dir> --single <filename>
+    
+    # Convert 8 files at a time
+    python D:\XQG4\frag_convert\ifc_fragments_converter.py <source_dir> <target_dir> --auto --jobs 8
+    
+    # One fragment per storey, 8 storeys at a time, plus <name>.manifest.json
+    python D:\XQG4\frag_convert\ifc_fragments_converter.py <source_dir> <target_dir> --auto --split --jobs 8
 
 Examples:
     python D:\XQG4\frag_convert\ifc_fragments_converter.py "C:\MyProject\IFC_Files"
@@ -41,25 +59,82 @@ Version: 1.0.0
 
 import os
 import sys
+import signal
 import argparse
 import subprocess
 import logging
 import json
 import time
+import uuid
+import shutil
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from conversion_history import ConversionHistory, converter_version, run_measured
+from ifc_prescan import describe, prescan
+from ifc_splitter import split_ifc
+
 # Get the directory where this script is located (the converter package directory)
 CONVERTER_DIR = Path(__file__).parent
 NODE_SCRIPT = CONVERTER_DIR / "convert_ifc_to_fragments.js"
 
+# Niceness of the Node.js converter per priority class
+PRIORITY_NICE = {'interactive': 0, 'batch': 10}
+
+# Split mode: <name>.manifest.json lists the per-storey part fragments
+MANIFEST_SUFFIX = '.manifest.json'
+MANIFEST_VERSION = 1
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def _configure_logging(log_file: Path):
+    """Log to the run's log file and stdout (no-op if this process already logs)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOG_FORMAT,
+        handlers=[
+            logging.FileHandler(log_file, encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+
+def _interrupt(signum, frame):
+    """SIGTERM handler: take the Ctrl-C path so Node.js is stopped and partial output removed"""
+    raise KeyboardInterrupt
+
+
+def _init_worker(log_file: Path, worker_pids):
+    """
+    Parallel workers leave Ctrl-C to the main process, which stops them with
+    SIGTERM through the PIDs they report; spawned workers (Windows) start
+    without the parent's logging, so they append to its log file themselves
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _interrupt)
+    _configure_logging(log_file)
+    worker_pids.put(os.getpid())
+
+
+def _convert_in_worker(converter: "IfcFragmentsConverter", ifc_file: Path) -> Dict:
+    """Pool task; a stopped worker exits instead of taking the next queued file"""
+    try:
+        return converter.convert_single_file(ifc_file, False)
+    except KeyboardInterrupt:
+        # Node.js is stopped and its partial output removed by now
+        os._exit(1)
+
 class IfcFragmentsConverter:
     """
     Portable IFC to Fragments converter that can be used from any project
     """
     
-    def __init__(self, source_dir: str, target_dir: str = None, single_file: str = None):
+    def __init__(self, source_dir: str, target_dir: str = None, single_file: str = None,
+                 priority: str = 'interactive', split: bool = False, keep_parts: bool = False):
         """
         Initialize the converter
         
@@ -67,10 +142,16 @@ class IfcFragmentsConverter:
             source_dir: Directory containing IFC files (or parent dir if single_file specified)
             target_dir: Directory for output fragment files (default: same as source_dir)
             single_file: Specific IFC file to convert (optional)
+            priority: 'interactive' or 'batch' (converter runs at a lower CPU priority)
+            split: Split each model by storey, convert the parts in parallel and write a manifest
+            keep_parts: Keep the intermediate per-storey IFC files of split mode
         """
         self.source_dir = Path(source_dir).resolve()
         self.target_dir = Path(target_dir).resolve() if target_dir else self.source_dir
         self.single_file = single_file
+        self.priority = priority
+        self.split = split
+        self.keep_parts = keep_parts
         self.converter_dir = CONVERTER_DIR
         self.node_script = NODE_SCRIPT
         
@@ -89,8 +170,16 @@ class IfcFragmentsConverter:
             'start_time': None,
             'end_time': None,
             'total_time': 0,
+            'jobs': 1,
+            'input_mb': 0,
+            'throughput_mb_per_s': 0,
+            'throughput_files_per_min': 0,
             'results': []
         }
+        
+        # Append-only conversion history (replaces per-run JSON reports)
+        self.history = ConversionHistory()
+        self.run_id = None
     
     def setup_logging(self):
         """Configure logging for the conversion process"""
@@ -98,19 +187,11 @@ class IfcFragmentsConverter:
         log_dir = Path.cwd() / "logs"
         log_dir.mkdir(exist_ok=True)
         
-        log_file = log_dir / f"ifc_conversion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-        
-        log_format = '%(asctime)s - %(levelname)s - %(message)s'
-        logging.basicConfig(
-            level=logging.INFO,
-            format=log_format,
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
+        self.log_file = log_dir / f"ifc_conversion_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+        
+        _configure_logging(self.log_file)
         self.logger = logging.getLogger(__name__)
-        self.logger.info(f"[INFO] Log file: {log_file}")
+        self.logger.info(f"[INFO] Log file: {self.log_file}")
     
     def validate_environment(self) -> bool:
         """Validate that all required dependencies are available"""
@@ -216,15 +297,11 @@ class IfcFragmentsConverter:
         
         return ifc_files
     
-    def convert_single_file(self, ifc_file: Path, interactive: bool = True) -> Dict:
-        """Convert a single IFC file to fragments"""
-        start_time = time.time()
-        
-        # Generate output path
-        output_file = self.target_dir / f"{ifc_file.stem}.frag"
+    def confirm_overwrite(self, ifc_file: Path, output_file: Optional[Path] = None) -> Optional[Dict]:
+        """Ask before overwriting an existing output; returns a skip result if declined"""
+        output_file = output_file or self.target_dir / f"{ifc_file.stem}.frag"
         
-        # Check if output already exists
-        if output_file.exists() and interactive:
+        if output_file.exists():
             self.logger.warning(f"[WARN] Output file already exists: {output_file.name}")
             response = input(f"Overwrite {output_file.name}? (y/N): ").strip().lower()
             if response != 'y':
@@ -234,35 +311,72 @@ class IfcFragmentsConverter:
                     'status': 'skipped',
                     'message': 'File already exists, user chose not to overwrite'
                 }
+        return None
+    
+    def convert_single_file(self, ifc_file: Path, interactive: bool = True) -> Dict:
+        """Convert a single IFC file to fragments"""
+        start_time = time.time()
+        
+        # Generate output path
+        output_file = self.target_dir / f"{ifc_file.stem}.frag"
+        
+        # Check if output already exists
+        if interactive:
+            skipped = self.confirm_overwrite(ifc_file)
+            if skipped:
+                return skipped
         
         self.logger.info(f"[CONVERT] Converting: {ifc_file.name}")
         
+        # Truncated / non-STEP / unsupported schema files are rejected before Node.js starts;
+        # the same pass hashes the file for the history
+        scan = prescan(ifc_file, sha256=True)
+        identity = {'ifc_sha256': scan['sha256'], 'ifc_entities': scan['entities']}
+        rejected = self._rejected(ifc_file, scan, start_time)
+        if rejected:
+            return {**rejected, **identity}
+        
         try:
             # Execute Node.js converter
             cmd = ['node', str(self.node_script), str(ifc_file), str(output_file)]
             
-            result = subprocess.run(cmd, 
-                                  capture_output=True, 
-                                  text=True, 
-                                  shell=False,
-                                  encoding='utf-8',
-                                  errors='replace',
-                                  cwd=self.converter_dir)
+            # Output is logged line by line; only a bounded tail is kept
+            result_lines = []
+            
+            def forward_output(stream, line):
+                if line.startswith('CONVERSION_RESULT_JSON:'):
+                    result_lines.append(line.split(':', 1)[1].strip())
+                elif line.strip():
+                    log = self.logger.warning if stream == 'stderr' else self.logger.info
+                    log(f"   [NODE] {line}")
+            
+            try:
+                result, peak_memory_mb = run_measured(cmd,
+                                                      text=True, 
+                                                      shell=False,
+                                                      encoding='utf-8',
+                                                      errors='replace',
+                                                      cwd=self.converter_dir,
+                                                      on_line=forward_output,
+                                                      nice=PRIORITY_NICE[self.priority])
+            except KeyboardInterrupt:
+                # Node.js has been killed by now; what it wrote is incomplete
+                output_file.unlink(missing_ok=True)
+                self.logger.warning(f"[WARN] Interrupted, removed partial output {output_file.name}")
+                raise
             
             conversion_time = time.time() - start_time
             
             # Parse the result
             if result.returncode == 0:
-                # Look for JSON result in stdout
+                # Look for the JSON result line in stdout
                 json_result = None
-                if result.stdout:
-                    for line in result.stdout.split('\n'):
-                        if line.startswith('CONVERSION_RESULT_JSON:'):
-                            try:
-                                json_result = json.loads(line.split(':', 1)[1].strip())
-                                break
-                            except json.JSONDecodeError:
-                                pass
+                for line in result_lines:
+                    try:
+                        json_result = json.loads(line)
+                        break
+                    except json.JSONDecodeError:
+                        pass
                 
                 if json_result and json_result.get('success'):
                     self.logger.info(f"[OK] Successfully converted: {ifc_file.name}")
@@ -277,13 +391,15 @@ class IfcFragmentsConverter:
                         'status': 'success',
                         'message': json_result.get('message', 'Conversion successful'),
                         'conversion_time': conversion_time,
-                        'stats': json_result.get('stats', {})
+                        'peak_memory_mb': peak_memory_mb,
+                        'stats': json_result.get('stats', {}),
+                        **identity
                     }
                 else:
                     error_msg = json_result.get('message', 'Unknown error') if json_result else 'No result data'
                     raise Exception(error_msg)
             else:
-                raise Exception(f"Node.js script failed with code {result.returncode}: {result.stderr}")
+                raise Exception(f"Node.js script failed with code {result.returncode}: {result.stderr.strip()}")
                 
         except Exception as e:
             self.logger.error(f"[ERROR] Failed to convert {ifc_file.name}: {e}")
@@ -291,13 +407,142 @@ class IfcFragmentsConverter:
                 'file': ifc_file.name,
                 'status': 'failed',
                 'message': str(e),
+                'conversion_time': time.time() - start_time,
+                **identity
+            }
+    
+    def _rejected(self, ifc_file: Path, scan: Dict, start_time: float) -> Optional[Dict]:
+        """Failed result for a file the pre-scan finds unreadable, else None"""
+        if scan['valid']:
+            self.logger.info(f"[SCAN] {describe(scan)}")
+            return None
+        self.logger.error(f"[ERROR] Rejected {ifc_file.name}: {describe(scan)}")
+        return {
+            'file': ifc_file.name,
+            'status': 'failed',
+            'message': f"Invalid IFC file: {'; '.join(scan['errors'])}",
+            'conversion_time': time.time() - start_time
+        }
+    
+    def convert_split_file(self, ifc_file: Path, interactive: bool = True, jobs: int = 1) -> Dict:
+        """
+        Split a model into one IFC file per storey (see ifc_splitter.py),
+        convert the parts `jobs` at a time and publish <name>.manifest.json
+        
+        The part fragments (<name>.part-NN-<storey>.frag) are written next
+        to the other outputs; the manifest lists them in spatial order with
+        their storey, elevation and bounding box. A model without storeys
+        is converted whole.
+        """
+        start_time = time.time()
+        manifest_file = self.target_dir / f"{ifc_file.stem}{MANIFEST_SUFFIX}"
+        
+        if interactive:
+            skipped = self.confirm_overwrite(ifc_file, manifest_file)
+            if skipped:
+                return skipped
+        
+        self.logger.info(f"[SPLIT] Splitting: {ifc_file.name}")
+        rejected = self._rejected(ifc_file, prescan(ifc_file), start_time)
+        if rejected:
+            return rejected
+        
+        # The part IFC files are intermediate; only their fragments are kept
+        parts_dir = self.target_dir / f"{ifc_file.stem}.parts"
+        try:
+            split = split_ifc(ifc_file, parts_dir)
+        except Exception as e:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+            self.logger.error(f"[ERROR] Failed to split {ifc_file.name}: {e}")
+            return {
+                'file': ifc_file.name,
+                'status': 'failed',
+                'message': f'Split failed: {e}',
                 'conversion_time': time.time() - start_time
             }
+        
+        parts = split['parts']
+        if not parts:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+            self.logger.warning(f"[SPLIT] {ifc_file.name} has no storeys to split along, converting it whole")
+            return self.convert_single_file(ifc_file, False)
+        self.logger.info(f"[SPLIT] {len(parts)} parts in {split['split_seconds']}s")
+        
+        # Largest parts first, so the longest conversion does not start last
+        by_size = sorted(parts, key=lambda part: part['ifc_bytes'], reverse=True)
+        part_files = [parts_dir / part['ifc_file'] for part in by_size]
+        try:
+            if jobs > 1 and len(part_files) > 1:
+                results = self._convert_files_parallel(part_files, False, jobs)
+            else:
+                results = self._convert_files_sequential(part_files, False)
+            results_by_part = {part['ifc_file']: result for part, result in zip(by_size, results)}
+            
+            # Each part is a conversion of its own in the history (in spatial order)
+            version = converter_version(self.node_script)
+            for part in parts:
+                part_file = parts_dir / part['ifc_file']
+                result = results_by_part[part['ifc_file']]
+                self.record_history(part_file, result, version)
+                fragment = self.target_dir / f"{part_file.stem}.frag"
+                converted = result['status'] == 'success' and fragment.exists()
+                part.update({
+                    'status': result['status'],
+                    'fragment': fragment.name if converted else None,
+                    'fragment_bytes': fragment.stat().st_size if converted else None,
+                    'conversion_time': round(result.get('conversion_time') or 0, 2),
+                    'message': result.get('message')
+                })
+        finally:
+            if not self.keep_parts:
+                shutil.rmtree(parts_dir, ignore_errors=True)
+        
+        bbox = None
+        for part in parts:
+            if part['bbox']:
+                bbox = part['bbox'] if bbox is None else [
+                    [min(a, b) for a, b in zip(bbox[0], part['bbox'][0])],
+                    [max(a, b) for a, b in zip(bbox[1], part['bbox'][1])]
+                ]
+        conversion_time = time.time() - start_time
+        manifest = {
+            'format': 'xsba-split-manifest',
+            'version': MANIFEST_VERSION,
+            'source': ifc_file.name,
+            'source_bytes': split['source_bytes'],
+            'schema': split['schema'],
+            'split_by': 'storey',
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'bbox': bbox,
+            'parts': parts,
+            'unassigned': split['unassigned'],
+            'parts_dir': str(parts_dir) if self.keep_parts else None,
+            'split_seconds': split['split_seconds'],
+            'conversion_time': round(conversion_time, 2),
+            'jobs': jobs
+        }
+        tmp = manifest_file.with_name(manifest_file.name + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        tmp.replace(manifest_file)
+        
+        successful = sum(1 for part in parts if part['status'] == 'success')
+        log = self.logger.info if successful == len(parts) else self.logger.error
+        log(f"[SPLIT] {successful}/{len(parts)} parts of {ifc_file.name} converted, manifest {manifest_file.name}")
+        return {
+            'file': ifc_file.name,
+            'status': 'success' if successful == len(parts) else 'failed',
+            'message': f'{successful}/{len(parts)} storey parts converted, manifest {manifest_file.name}',
+            'conversion_time': conversion_time,
+            'parts': len(parts),
+            'manifest': manifest_file.name
+        }
     
-    def convert_all_files(self, interactive: bool = True):
-        """Convert all found IFC files"""
+    def convert_all_files(self, interactive: bool = True, jobs: int = 1):
+        """Convert all found IFC files, optionally `jobs` files at a time"""
         self.logger.info("[START] Starting IFC to Fragments conversion process")
         self.stats['start_time'] = datetime.now()
+        self.stats['jobs'] = max(1, jobs)
         
         # Find IFC files
         ifc_files = self.find_ifc_files()
@@ -307,12 +552,28 @@ class IfcFragmentsConverter:
             self.logger.warning("[WARN] No IFC files found")
             return
         
-        # Process each file
-        for i, ifc_file in enumerate(ifc_files, 1):
-            self.logger.info(f"[PROCESS] Processing file {i}/{len(ifc_files)}: {ifc_file.name}")
-            
-            result = self.convert_single_file(ifc_file, interactive)
+        # Shortest job first: conversion time grows with file size. Results
+        # are reported in discovery order all the same.
+        dispatch_order = sorted(ifc_files, key=lambda f: f.stat().st_size)
+        
+        self.run_id = uuid.uuid4().hex
+        if self.split:
+            # One model at a time, its storey parts in parallel
+            results = [self.convert_split_file(ifc_file, interactive, self.stats['jobs']) for ifc_file in dispatch_order]
+        elif self.stats['jobs'] > 1 and len(ifc_files) > 1:
+            results = self._convert_files_parallel(dispatch_order, interactive, self.stats['jobs'])
+        else:
+            results = self._convert_files_sequential(dispatch_order, interactive)
+        results_by_file = dict(zip(dispatch_order, results))
+        
+        input_mb = 0.0
+        version = converter_version(self.node_script)
+        for ifc_file in ifc_files:
+            result = results_by_file[ifc_file]
             self.stats['results'].append(result)
+            # Split models were recorded part by part
+            if result['status'] != 'skipped' and 'parts' not in result:
+                self.record_history(ifc_file, result, version)
             
             # Update counters
             if result['status'] == 'success':
@@ -322,16 +583,102 @@ class IfcFragmentsConverter:
             elif result['status'] == 'skipped':
                 self.stats['skipped'] += 1
             
-            # Progress update
-            progress = (i / len(ifc_files)) * 100
-            self.logger.info(f"[STATS] Progress: {progress:.1f}% ({i}/{len(ifc_files)})")
+            if result['status'] != 'skipped':
+                input_mb += ifc_file.stat().st_size / (1024 * 1024)
         
         # Finalize statistics
         self.stats['end_time'] = datetime.now()
         self.stats['total_time'] = (self.stats['end_time'] - self.stats['start_time']).total_seconds()
         
+        # Aggregate throughput over everything that was actually attempted
+        processed = self.stats['successful'] + self.stats['failed']
+        self.stats['input_mb'] = round(input_mb, 2)
+        if self.stats['total_time'] > 0:
+            self.stats['throughput_mb_per_s'] = round(input_mb / self.stats['total_time'], 3)
+            self.stats['throughput_files_per_min'] = round(processed * 60 / self.stats['total_time'], 2)
+        
         self.print_summary()
     
+    def record_history(self, ifc_file: Path, result: Dict, version: str):
+        """Append one conversion result to the history store"""
+        try:
+            self.history.record(
+                'frag_convert', ifc_file.name, result['status'],
+                duration_s=result.get('conversion_time'),
+                ifc_path=ifc_file,
+                output_path=self.target_dir / f"{ifc_file.stem}.frag" if result['status'] == 'success' else None,
+                peak_memory_mb=result.get('peak_memory_mb'),
+                converter_version=version,
+                run_id=self.run_id,
+                message=result.get('message'),
+                ifc_sha256=result.get('ifc_sha256'),
+                ifc_entities=result.get('ifc_entities')
+            )
+        except Exception as e:
+            self.logger.warning(f"[WARN] Could not record history for {ifc_file.name}: {e}")
+    
+    def _convert_files_sequential(self, ifc_files: List[Path], interactive: bool) -> List[Dict]:
+        """Convert files one after another"""
+        results = []
+        for i, ifc_file in enumerate(ifc_files, 1):
+            self.logger.info(f"[PROCESS] Processing file {i}/{len(ifc_files)}: {ifc_file.name}")
+            
+            results.append(self.convert_single_file(ifc_file, interactive))
+            
+            # Progress update
+            progress = (i / len(ifc_files)) * 100
+            self.logger.info(f"[STATS] Progress: {progress:.1f}% ({i}/{len(ifc_files)})")
+        return results
+    
+    def _convert_files_parallel(self, ifc_files: List[Path], interactive: bool, jobs: int) -> List[Dict]:
+        """Convert files in a process pool, returning results in input order"""
+        results: List[Optional[Dict]] = [None] * len(ifc_files)
+        
+        # Overwrite prompts cannot run inside worker processes, so ask up front
+        if interactive:
+            for index, ifc_file in enumerate(ifc_files):
+                results[index] = self.confirm_overwrite(ifc_file)
+        
+        pending = [index for index, result in enumerate(results) if result is None]
+        self.logger.info(f"[PROCESS] Converting {len(pending)} files with {jobs} parallel jobs")
+        
+        completed = len(ifc_files) - len(pending)
+        worker_pids = multiprocessing.SimpleQueue()
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(self.log_file, worker_pids)) as executor:
+            futures = {executor.submit(_convert_in_worker, self, ifc_files[index]): index
+                       for index in pending}
+            
+            try:
+                for future in as_completed(futures):
+                    index = futures[future]
+                    ifc_file = ifc_files[index]
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        self.logger.error(f"[ERROR] Worker failed for {ifc_file.name}: {e}")
+                        results[index] = {
+                            'file': ifc_file.name,
+                            'status': 'failed',
+                            'message': f'Worker process failed: {e}'
+                        }
+                    
+                    # Progress update
+                    completed += 1
+                    progress = (completed / len(ifc_files)) * 100
+                    self.logger.info(f"[STATS] Progress: {progress:.1f}% ({completed}/{len(ifc_files)}) - finished {ifc_file.name}")
+            except KeyboardInterrupt:
+                # Workers kill their Node.js process group and remove its partial output on SIGTERM
+                executor.shutdown(wait=False, cancel_futures=True)
+                while not worker_pids.empty():
+                    try:
+                        os.kill(worker_pids.get(), signal.SIGTERM)
+                    except OSError:
+                        pass  # Already exited
+                raise
+        
+        return results
+    
     def print_summary(self):
         """Print conversion summary and statistics"""
         self.logger.info("\n" + "="*60)
@@ -345,6 +692,10 @@ class IfcFragmentsConverter:
         self.logger.info(f"[OK] Successful: {self.stats['successful']}")
         self.logger.info(f"[ERROR] Failed: {self.stats['failed']}")
         self.logger.info(f"[SKIP] Skipped: {self.stats['skipped']}")
+        self.logger.info(f"[JOBS] Parallel Jobs: {self.stats['jobs']}")
+        self.logger.info(f"[SPEED] Throughput: {self.stats['throughput_mb_per_s']:.2f} MB/s, "
+                         f"{self.stats['throughput_files_per_min']:.2f} files/min "
+                         f"({self.stats['input_mb']:.2f} MB converted)")
         
         if self.stats['successful'] > 0:
             success_rate = (self.stats['successful'] / self.stats['total_files']) * 100
@@ -367,32 +718,21 @@ class IfcFragmentsConverter:
         self.logger.info("[DONE] Conversion process completed!")
     
     def save_report(self):
-        """Save detailed conversion report to JSON file"""
-        reports_dir = Path.cwd() / "reports"
-        reports_dir.mkdir(exist_ok=True)
-        
-        report_file = reports_dir / f"conversion_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        
-        report_data = {
-            'conversion_summary': self.stats,
-            'environment': {
-                'source_directory': str(self.source_dir),
-                'target_directory': str(self.target_dir),
-                'converter_directory': str(self.converter_dir),
-                'working_directory': str(Path.cwd())
-            },
-            'timestamp': datetime.now().isoformat()
+        """Record the run summary in the conversion history store"""
+        environment = {
+            'source_directory': str(self.source_dir),
+            'target_directory': str(self.target_dir),
+            'converter_directory': str(self.converter_dir),
+            'working_directory': str(Path.cwd())
         }
         
         try:
-            with open(report_file, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, indent=2, default=str)
-            
-            self.logger.info(f"[REPORT] Detailed report saved: {report_file}")
+            self.history.record_run('frag_convert', self.stats, environment, self.run_id)
+            self.logger.info(f"[REPORT] Run {self.run_id} recorded in {self.history.db_path}")
         except Exception as e:
             self.logger.warning(f"[WARN] Could not save report: {e}")
     
-    def run(self, interactive: bool = True):
+    def run(self, interactive: bool = True, jobs: int = 1):
         """Main execution method"""
         try:
             print("\n" + "="*60)
@@ -404,6 +744,8 @@ class IfcFragmentsConverter:
             print(f"Target Directory: {self.target_dir}")
             if self.single_file:
                 print(f"Single File: {self.single_file}")
+            if self.split:
+                print("Split Mode: one fragment per storey plus a manifest")
             print("="*60)
             
             # Environment validation
@@ -412,7 +754,7 @@ class IfcFragmentsConverter:
                 return False
             
             # Start conversion process
-            self.convert_all_files(interactive)
+            self.convert_all_files(interactive, jobs)
             return True
             
         except KeyboardInterrupt:
@@ -434,6 +776,8 @@ Examples:
   %(prog)s "C:\\MyProject\\IFC" "C:\\MyProject\\Fragments"
   %(prog)s "C:\\IFC" "C:\\Output" --single "model.ifc"
   %(prog)s "C:\\IFC" --auto  # Non-interactive mode
+  %(prog)s "C:\\IFC" "C:\\Output" --auto --jobs 8  # 8 conversions in parallel
+  %(prog)s "C:\\IFC" "C:\\Output" --auto --split --jobs 8  # per-storey fragments, 8 storeys at a time
         """
     )
     
@@ -449,6 +793,19 @@ Examples:
     parser.add_argument('--auto', '-a', action='store_true',
                        help='Non-interactive mode (overwrite existing files without asking)')
     
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='Number of files to convert in parallel (default: 1)')
+    
+    parser.add_argument('--priority', choices=list(PRIORITY_NICE), default='batch',
+                       help='Priority class; batch runs Node.js at a lower CPU priority (default: batch)')
+    
+    parser.add_argument('--split', action='store_true',
+                       help='Split each model by storey, convert the parts in parallel (--jobs) '
+                            'and write <name>.manifest.json')
+    
+    parser.add_argument('--keep-parts', action='store_true',
+                       help='Keep the intermediate per-storey IFC files of --split in <name>.parts/')
+    
     parser.add_argument('--version', '-v', action='version', version='IFC Fragments Converter 1.0.0')
     
     args = parser.parse_args()
@@ -462,14 +819,19 @@ Examples:
         print(f"Error: Single file does not exist: {os.path.join(args.source_dir, args.single)}")
         sys.exit(1)
     
+    signal.signal(signal.SIGTERM, _interrupt)
+    
     # Create converter and run
     converter = IfcFragmentsConverter(
         source_dir=args.source_dir,
         target_dir=args.target_dir,
-        single_file=args.single
+        single_file=args.single,
+        priority=args.priority,
+        split=args.split,
+        keep_parts=args.keep_parts
     )
     
-    success = converter.run(interactive=not args.auto)
+    success = converter.run(interactive=not args.auto, jobs=args.jobs)
     sys.exit(0 if success else 1)
 
 if __name__ == "__main__":
@@ -0,0 +1,683 @@
+#!/usr/bin/env python3
+"""
+IFC Spatial Splitter
+====================
+
+Splits an IFC model along its spatial structure into self-contained IFC
+files, so the parts can be converted in parallel and a viewer can load
+one storey at a time:
+    
+    model.ifc  ->  <parts_dir>/model.part-01-Level_0.ifc    one per IfcBuildingStorey
+                   <parts_dir>/model.part-02-Level_1.ifc    (or IFC4X3 facility part)
+                   <parts_dir>/model.part-03-Building_A.ifc elements contained in a
+                                                            building / site directly
+
+A part holds:
+- its elements: what is contained in the storey (or in its spaces), the
+  spaces themselves, and recursively their decomposition (IfcRelAggregates,
+  IfcRelNests), openings (IfcRelVoidsElement) and fillings (IfcRelFillsElement)
+- the spatial chain above them (storey, building, site, project)
+- every relationship that touches them; references to elements of other
+  parts are removed from its lists, and a relationship that would lose a
+  single-valued reference is left out
+- everything the above references, directly or not: owner history, units,
+  contexts, placements, geometry, property sets, types, materials - plus
+  the styled items and presentation layers of its geometry
+
+Entity instance names are kept, so entities shared by several parts are
+written identically into each of them.
+
+The source is memory-mapped and indexed once (record offsets in two
+arrays, types only for spatial elements and relationships), so memory
+grows with the entity count, not with the file size.
+
+Each part comes with an approximate bounding box in model coordinates:
+representation coordinates transformed by the element's placement chain.
+Item positions inside a representation, profile extents and extrusion
+depths are not applied, so boxes suit ordering and culling of parts, not
+exact fitting.
+    
+    split = split_ifc("model.ifc", "model.parts")
+    for part in split["parts"]:
+        part["ifc_file"], part["name"], part["elevation"], part["bbox"]
+
+Only Python standard libraries are used, so the package stays portable.
+"""
+
+import re
+import sys
+import json
+import math
+import mmap
+import time
+import argparse
+from array import array
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ifc_prescan import parse_header
+
+# Spatial elements a part is cut along (the innermost one an element is in)
+LEVEL_TYPES = (
+    "IFCBUILDINGSTOREY", "IFCFACILITYPART", "IFCFACILITYPARTCOMMON",
+    "IFCBRIDGEPART", "IFCROADPART", "IFCRAILWAYPART", "IFCMARINEPART",
+)
+
+# Spatial elements above the levels; they head every part below them
+CONTAINER_TYPES = (
+    "IFCPROJECT", "IFCSITE", "IFCBUILDING",
+    "IFCFACILITY", "IFCBRIDGE", "IFCROAD", "IFCRAILWAY", "IFCMARINEFACILITY",
+)
+
+LAYER_TYPES = ("IFCPRESENTATIONLAYERASSIGNMENT", "IFCPRESENTATIONLAYERWITHSTYLE")
+
+# (relationship, parent attribute, child attribute); later rows win when an
+# element has several parents, so spatial containment beats the rest
+DECOMPOSITION = (
+    ("IFCRELFILLSELEMENT", 4, 5),
+    ("IFCRELVOIDSELEMENT", 4, 5),
+    ("IFCRELNESTS", 4, 5),
+    ("IFCRELAGGREGATES", 4, 5),
+    ("IFCRELCONTAINEDINSPATIALSTRUCTURE", 5, 4),
+)
+
+# Not followed when collecting the coordinates of a representation
+BOX_SKIP_TYPES = (b"IFCGEOMETRICREPRESENTATIONCONTEXT", b"IFCGEOMETRICREPRESENTATIONSUBCONTEXT",
+                  b"IFCLOCALPLACEMENT")
+
+_INDEXED_TYPES = {name.encode() for name in LEVEL_TYPES + CONTAINER_TYPES + LAYER_TYPES + ("IFCSTYLEDITEM",)}
+
+_RECORD = re.compile(rb"#(\d+)\s*=\s*([A-Za-z][A-Za-z0-9_]*)\s*\(")
+# A record starts after the previous one's ';' - "#1=X(" inside a string does not
+_RECORD_START = re.compile(rb";\s*#(\d+)\s*=\s*([A-Za-z][A-Za-z0-9_]*)\s*\(")
+_REF = re.compile(rb"#(\d+)")
+_STRING = re.compile(rb"'(?:[^']|'')*'")
+_TOKEN = re.compile(rb"'(?:[^']|'')*'|[(),]|[^\s(),']+")
+_NUMBER = re.compile(rb"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+Transform = Tuple[Tuple[float, ...], ...]
+IDENTITY: Transform = ((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+
+
+def _references(record: bytes) -> List[int]:
+    """Instance names a record refers to (not its own, nor '#' inside strings)"""
+    body = record[record.index(b"=") + 1:]
+    if b"'" in body:
+        body = _STRING.sub(b"''", body)
+    return [int(number) for number in _REF.findall(body)]
+
+
+def _parse_values(text: bytes) -> List:
+    """
+    STEP parameters to nested lists of raw tokens; typed values such as
+    IFCLABEL('x') become (name, [values]) so they serialise back unchanged
+    """
+    stack, names = [[]], [None]
+    previous = None
+    for token in _TOKEN.findall(text):
+        if token == b"(":
+            typed = previous is not None and previous[:1].isalpha() and stack[-1] and stack[-1][-1] is previous
+            names.append(stack[-1].pop() if typed else None)
+            stack.append([])
+        elif token == b")":
+            inner, name = stack.pop(), names.pop()
+            stack[-1].append((name, inner) if name else inner)
+        elif token != b",":
+            stack[-1].append(token)
+        previous = token if token not in (b"(", b")", b",") else None
+    return stack[0]
+
+
+def _values(record: bytes) -> List:
+    """Attribute values of an entity record"""
+    start = record.index(b"(", record.index(b"="))
+    return _parse_values(record[start:record.rindex(b")") + 1])[0]
+
+
+def _format_values(values: List) -> bytes:
+    parts = []
+    for value in values:
+        if isinstance(value, list):
+            parts.append(b"(" + _format_values(value) + b")")
+        elif isinstance(value, tuple):
+            parts.append(value[0] + b"(" + _format_values(value[1]) + b")")
+        else:
+            parts.append(value)
+    return b",".join(parts)
+
+
+def _ref(value) -> Optional[int]:
+    return int(value[1:]) if isinstance(value, bytes) and value[:1] == b"#" else None
+
+
+def _refs(value) -> List[int]:
+    """References in a single-valued or list attribute"""
+    items = value if isinstance(value, list) else [value]
+    return [number for number in map(_ref, items) if number is not None]
+
+
+def _text(value) -> Optional[str]:
+    if isinstance(value, bytes) and value[:1] == b"'":
+        return value[1:-1].replace(b"''", b"'").decode("latin-1")
+    return None
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value) if isinstance(value, bytes) else None
+    except ValueError:
+        return None
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "_", name).strip("_")[:40] or "part"
+
+
+def _merge_box(total, box):
+    if box is None:
+        return total
+    if total is None:
+        return [list(box[0]), list(box[1])]
+    return [[min(a, b) for a, b in zip(total[0], box[0])],
+            [max(a, b) for a, b in zip(total[1], box[1])]]
+
+
+def _box_of_points(points) -> Optional[List[List[float]]]:
+    points = list(points)
+    if not points:
+        return None
+    return [[min(p[i] for p in points) for i in range(3)], [max(p[i] for p in points) for i in range(3)]]
+
+
+def _normalize(vector):
+    length = math.sqrt(sum(c * c for c in vector)) or 1.0
+    return tuple(c / length for c in vector)
+
+
+def _cross(a, b):
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+
+def _rotate(transform: Transform, vector):
+    _, x, y, z = transform
+    return tuple(x[i] * vector[0] + y[i] * vector[1] + z[i] * vector[2] for i in range(3))
+
+
+def _apply(transform: Transform, point):
+    origin = transform[0]
+    rotated = _rotate(transform, point)
+    return tuple(origin[i] + rotated[i] for i in range(3))
+
+
+def _compose(parent: Transform, local: Transform) -> Transform:
+    return (_apply(parent, local[0]),) + tuple(_rotate(parent, axis) for axis in local[1:])
+
+
+class StepFile:
+    """
+    Memory-mapped STEP file with the byte range of every entity record
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        data_start = self.data.find(b"DATA;", max(self.data.find(b"ENDSEC;"), 0))
+        self.data_end = self.data.rfind(b"ENDSEC;")
+        if data_start < 0 or self.data_end <= data_start:
+            self.close()
+            raise ValueError(f"{self.path.name} has no DATA section")
+        self.header = self.data[:data_start]
+        self.starts = array("q")
+        self.ends = array("q")
+        self.by_type: Dict[str, List[int]] = defaultdict(list)
+        self._grow(len(self.data) // 64)
+        self._index(data_start)
+    
+    def _grow(self, size: int):
+        extra = bytes(8 * (size - len(self.starts)))
+        self.starts.frombytes(extra)
+        self.ends.frombytes(extra)
+    
+    def _index(self, data_start: int):
+        starts, ends = self.starts, self.ends
+        previous = None
+        for match in _RECORD_START.finditer(self.data, data_start + 4, self.data_end):
+            number = int(match.group(1))
+            if number >= len(starts):
+                self._grow(max(number + 1, 2 * len(starts)))
+            start = match.start(1) - 1
+            if previous is not None:
+                ends[previous] = match.start() + 1
+            starts[number] = start
+            previous = number
+            name = match.group(2).upper()
+            if name.startswith(b"IFCREL") or name in _INDEXED_TYPES:
+                self.by_type[name.decode()].append(number)
+        if previous is not None:
+            ends[previous] = self.data.rfind(b";", starts[previous], self.data_end) + 1
+    
+    @property
+    def size(self) -> int:
+        """One past the highest instance name"""
+        return len(self.starts)
+    
+    def exists(self, number: int) -> bool:
+        return number < len(self.starts) and self.starts[number] > 0
+    
+    def record(self, number: int) -> bytes:
+        """`#n=TYPE(...);` as in the file"""
+        return self.data[self.starts[number]:self.ends[number]]
+    
+    def type_of(self, number: int) -> bytes:
+        return _RECORD.match(self.record(number)).group(2).upper()
+    
+    def ids_of(self, *types: str) -> List[int]:
+        return [number for name in types for number in self.by_type.get(name, [])]
+    
+    def close(self):
+        self.data.close()
+        self._file.close()
+    
+    def __enter__(self) -> "StepFile":
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SpatialSplitter:
+    """
+    Assigns the elements of a model to parts and writes one IFC file per part
+    """
+    
+    def __init__(self, step: StepFile):
+        self.step = step
+        self.levels = set(step.ids_of(*LEVEL_TYPES))
+        self.containers = set(step.ids_of(*CONTAINER_TYPES))
+        self.projects = step.ids_of("IFCPROJECT")
+        self.parent: Dict[int, int] = {}
+        self.part_of: Dict[int, Optional[int]] = {}
+        self.spatial = bytearray(step.size)
+        self.assigned = bytearray(step.size)
+        self._placements: Dict[int, Optional[Transform]] = {}
+        self._boxes: Dict[int, Optional[List]] = {}
+        
+        self._build_parents()
+        self._assign()
+        self._index_relationships()
+        self._index_decorations()
+    
+    def _build_parents(self):
+        for relationship, parent_index, child_index in DECOMPOSITION:
+            for rel in self.step.ids_of(relationship):
+                values = _values(self.step.record(rel))
+                if len(values) <= max(parent_index, child_index):
+                    continue
+                parents = _refs(values[parent_index])
+                if not parents:
+                    continue
+                for child in _refs(values[child_index]):
+                    self.parent[child] = parents[0]
+    
+    def _key(self, node: int) -> Optional[int]:
+        """Level (or container without levels) an element ends up in, walking up its parents"""
+        path, seen = [], set()
+        key = None
+        while node is not None and node not in seen:
+            if node in self.part_of:
+                key = self.part_of[node]
+                break
+            seen.add(node)
+            path.append(node)
+            if node in self.levels or node in self.containers:
+                key = node
+                break
+            node = self.parent.get(node)
+        for visited in path:
+            self.part_of[visited] = key
+        return key
+    
+    def _assign(self):
+        for spatial in self.levels | self.containers:
+            if spatial < self.step.size:
+                self.spatial[spatial] = 1
+        self.members: Dict[int, List[int]] = defaultdict(list)
+        for child in list(self.parent):
+            key = self._key(child)
+            if key is not None and child < self.step.size:
+                self.assigned[child] = 1
+                if not self.spatial[child]:
+                    self.members[key].append(child)
+    
+    def _shared(self, number: int) -> bool:
+        """Whether an entity belongs to a part or to the spatial structure (else it is shared)"""
+        return number < self.step.size and (self.spatial[number] or self.assigned[number])
+    
+    def _index_relationships(self):
+        """Relationships by the parts / spatial elements they touch; the others float"""
+        self.part_relationships: Dict[int, List[int]] = defaultdict(list)
+        self.spatial_relationships: Dict[int, List[int]] = defaultdict(list)
+        self.floating: List[Tuple[int, List[int]]] = []
+        for name, relationships in self.step.by_type.items():
+            if not name.startswith("IFCREL"):
+                continue
+            for rel in relationships:
+                refs = _references(self.step.record(rel))
+                keys, spatial = set(), set()
+                for number in refs:
+                    if not self._shared(number):
+                        continue
+                    if self.spatial[number]:
+                        spatial.add(number)
+                    else:
+                        keys.add(self.part_of[number])
+                for key in keys:
+                    self.part_relationships[key].append(rel)
+                for number in spatial:
+                    self.spatial_relationships[number].append(rel)
+                if not keys and not spatial:
+                    # Related objects only; everything shares the owner history (attribute 1)
+                    values = _values(self.step.record(rel))
+                    self.floating.append((rel, [number for value in values[4:] for number in _refs(value)]))
+    
+    def _index_decorations(self):
+        """Styled items by the geometry they style"""
+        self.styled: Dict[int, List[int]] = defaultdict(list)
+        for styled_item in self.step.ids_of("IFCSTYLEDITEM"):
+            values = _values(self.step.record(styled_item))
+            for item in _refs(values[0]) if values else []:
+                self.styled[item].append(styled_item)
+        self.layers = self.step.ids_of(*LAYER_TYPES)
+    
+    def chain(self, key: int) -> List[int]:
+        """A part's spatial element and those above it, up to the project"""
+        chain, node = [], key
+        while node is not None and node not in chain:
+            chain.append(node)
+            node = self.parent.get(node)
+        return chain + [project for project in self.projects if project not in chain]
+    
+    def _filtered(self, rel: int, anchors: bytearray) -> Optional[bytes]:
+        """
+        Relationship record without references to other parts' elements:
+        the record unchanged, a rewritten one, or None when it cannot be kept
+        """
+        record = self.step.record(rel)
+        if not any(self._shared(number) and not anchors[number] for number in _references(record)):
+            return record
+        values = _values(record)
+        removed = False
+        kept = []
+        for value in values:
+            if isinstance(value, list):
+                items = [item for item in value
+                         if not ((number := _ref(item)) is not None and self._shared(number) and not anchors[number])]
+                if value and not items:
+                    return None
+                removed = removed or len(items) != len(value)
+                kept.append(items)
+            elif (number := _ref(value)) is not None and self._shared(number) and not anchors[number]:
+                return None
+            else:
+                kept.append(value)
+        if not removed:
+            return record
+        name = _RECORD.match(record).group(2)
+        return b"#%d=%s(%s);" % (rel, name, _format_values(kept))
+    
+    def _closure(self, roots: List[int], visited: bytearray, rewrites: Dict[int, bytes]):
+        """Mark `roots` and everything they reference (plus styled items of reached geometry)"""
+        stack = list(roots)
+        while stack:
+            number = stack.pop()
+            if not self.step.exists(number) or visited[number]:
+                continue
+            visited[number] = 1
+            stack.extend(_references(rewrites.get(number) or self.step.record(number)))
+            styled = self.styled.get(number)
+            if styled:
+                stack.extend(styled)
+    
+    def collect(self, key: int) -> Tuple[bytearray, Dict[int, bytes]]:
+        """Entities of one part (as a mask over instance names) and its rewritten records"""
+        size = self.step.size
+        chain = self.chain(key)
+        anchors = bytearray(size)
+        for number in chain + self.members[key]:
+            if number < size:
+                anchors[number] = 1
+        
+        candidates = set(self.part_relationships.get(key, []))
+        for number in chain:
+            candidates.update(self.spatial_relationships.get(number, []))
+        rewrites, roots = {}, chain + self.members[key]
+        for rel in candidates:
+            record = self._filtered(rel, anchors)
+            if record is None:
+                continue
+            roots.append(rel)
+            if record != self.step.record(rel):
+                rewrites[rel] = record
+        
+        visited = bytearray(size)
+        self._closure(roots, visited, rewrites)
+        
+        # Relationships among shared entities only (materials or properties of types ...)
+        for rel, refs in self.floating:
+            if any(number < size and visited[number] for number in refs):
+                self._closure([rel], visited, rewrites)
+        
+        # Presentation layers keep the items of this part
+        for layer in self.layers:
+            record = self.step.record(layer)
+            values = _values(record)
+            if len(values) < 3 or not isinstance(values[2], list):
+                continue
+            items = [item for item in values[2] if (number := _ref(item)) is not None and number < size and visited[number]]
+            if not items:
+                continue
+            if len(items) != len(values[2]):
+                values[2] = items
+                rewrites[layer] = b"#%d=%s(%s);" % (layer, _RECORD.match(record).group(2), _format_values(values))
+            self._closure([layer], visited, rewrites)
+        return visited, rewrites
+    
+    def write(self, path: Path, visited: bytearray, rewrites: Dict[int, bytes]) -> int:
+        """Write the marked entities as an IFC file; returns the entity count"""
+        count = 0
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(self.step.header)
+            f.write(b"DATA;\n")
+            number = visited.find(1)
+            while number >= 0:
+                f.write(rewrites.get(number) or self.step.record(number))
+                f.write(b"\n")
+                count += 1
+                number = visited.find(1, number + 1)
+            f.write(b"ENDSEC;\nEND-ISO-10303-21;\n")
+        tmp.replace(path)
+        return count
+    
+    # Approximate bounding boxes
+    
+    def _point(self, number: Optional[int], default=(0.0, 0.0, 0.0)):
+        if number is None or not self.step.exists(number):
+            return default
+        record = self.step.record(number)
+        coordinates = [float(c) for c in _NUMBER.findall(record, record.index(b"(", record.index(b"=")))][:3]
+        return tuple(coordinates + [0.0] * (3 - len(coordinates))) if coordinates else default
+    
+    def _axis_placement(self, number: Optional[int]) -> Transform:
+        if number is None or not self.step.exists(number):
+            return IDENTITY
+        values = _values(self.step.record(number))
+        origin = self._point(_ref(values[0]) if values else None)
+        if self.step.type_of(number) == b"IFCAXIS2PLACEMENT3D" and len(values) >= 3:
+            z = _normalize(self._point(_ref(values[1]), (0.0, 0.0, 1.0)))
+            x = self._point(_ref(values[2]), (1.0, 0.0, 0.0))
+        else:
+            z = (0.0, 0.0, 1.0)
+            x = self._point(_ref(values[1]) if len(values) > 1 else None, (1.0, 0.0, 0.0))
+        dot = sum(a * b for a, b in zip(x, z))
+        x = _normalize(tuple(a - dot * b for a, b in zip(x, z)))
+        return (origin, x, _cross(z, x), z)
+    
+    def placement(self, number: Optional[int]) -> Optional[Transform]:
+        """World transform of an IfcLocalPlacement (None for grid / linear placements)"""
+        if number is None or not self.step.exists(number):
+            return None
+        if number not in self._placements:
+            self._placements[number] = None
+            if self.step.type_of(number) == b"IFCLOCALPLACEMENT":
+                values = _values(self.step.record(number))
+                relative_to = _ref(values[0])
+                parent = self.placement(relative_to) if relative_to is not None else IDENTITY
+                if parent is not None:
+                    self._placements[number] = _compose(parent, self._axis_placement(_ref(values[1])))
+        return self._placements[number]
+    
+    def _local_box(self, root: int) -> Optional[List]:
+        """Box of the coordinates under a representation; representation maps are boxed once"""
+        if root in self._boxes:
+            return self._boxes[root]
+        box, stack, seen = None, [root], set()
+        while stack:
+            number = stack.pop()
+            if number in seen or not self.step.exists(number):
+                continue
+            seen.add(number)
+            record = self.step.record(number)
+            name = _RECORD.match(record).group(2).upper()
+            if name in BOX_SKIP_TYPES:
+                continue
+            if name == b"IFCREPRESENTATIONMAP" and number != root:
+                box = _merge_box(box, self._local_box(number))
+                continue
+            if name == b"IFCCARTESIANPOINT":
+                box = _merge_box(box, _box_of_points([self._point(number)]))
+            elif name in (b"IFCCARTESIANPOINTLIST3D", b"IFCCARTESIANPOINTLIST2D"):
+                body = _STRING.sub(b"''", record[record.index(b"(", record.index(b"=")):])
+                numbers = [float(c) for c in _NUMBER.findall(body)]
+                step = 3 if name.endswith(b"3D") else 2
+                box = _merge_box(box, _box_of_points(
+                    tuple(numbers[i:i + step]) + (0.0,) * (3 - step) for i in range(0, len(numbers) - step + 1, step)))
+            else:
+                stack.extend(_references(record))
+        self._boxes[root] = box
+        return box
+    
+    def element_box(self, element: int) -> Optional[List]:
+        """World box of an element (IfcProduct: ObjectPlacement and Representation)"""
+        values = _values(self.step.record(element))
+        if len(values) < 7:
+            return None
+        transform = self.placement(_ref(values[5]))
+        if transform is None:
+            return None
+        representation = _ref(values[6])
+        box = self._local_box(representation) if representation is not None else None
+        if box is None:
+            return _box_of_points([transform[0]])
+        corners = [(x, y, z) for x in (box[0][0], box[1][0]) for y in (box[0][1], box[1][1])
+                   for z in (box[0][2], box[1][2])]
+        return _box_of_points(_apply(transform, corner) for corner in corners)
+    
+    def part_box(self, key: int) -> Optional[List]:
+        box = None
+        for element in self.members[key]:
+            box = _merge_box(box, self.element_box(element))
+        return [[round(c, 3) for c in corner] for corner in box] if box else None
+    
+    def describe(self, key: int) -> Dict:
+        """Name, GlobalId, type and elevation of a part's spatial element"""
+        values = _values(self.step.record(key))
+        elevation = _float(values[9]) if len(values) > 9 else None
+        return {
+            "type": self.step.type_of(key).decode(),
+            "global_id": _text(values[0]) if values else None,
+            "name": (_text(values[2]) if len(values) > 2 else None) or f"#{key}",
+            "elevation": elevation
+        }
+    
+    def parts(self) -> List[int]:
+        """Part keys: containers with elements of their own first, then levels by elevation"""
+        keys = [key for key in self.members if self.members[key]]
+        
+        def order(key):
+            info = self.describe(key)
+            return (key in self.levels, info["elevation"] if info["elevation"] is not None else 0.0, key)
+        return sorted(keys, key=order)
+
+
+def split_ifc(ifc_path: Path, parts_dir: Path, stem: Optional[str] = None) -> Dict:
+    """
+    Write one IFC file per storey (and per building / site holding elements
+    directly) to `parts_dir`
+    
+    Returns the source's schema, the parts (file, spatial element, element
+    and entity counts, approximate bounding box) and the number of
+    decomposed objects outside the spatial structure ("unassigned"), which
+    parts only carry where something references them. A model without
+    spatial containment yields no parts.
+    """
+    ifc_path = Path(ifc_path)
+    parts_dir = Path(parts_dir)
+    stem = stem or ifc_path.stem
+    start = time.perf_counter()
+    parts_dir.mkdir(parents=True, exist_ok=True)
+    
+    with StepFile(ifc_path) as step:
+        header = parse_header(step.header)
+        splitter = SpatialSplitter(step)
+        parts = []
+        for number, key in enumerate(splitter.parts(), 1):
+            info = splitter.describe(key)
+            ifc_file = parts_dir / f"{stem}.part-{number:02d}-{_slug(info['name'])}.ifc"
+            visited, rewrites = splitter.collect(key)
+            entities = splitter.write(ifc_file, visited, rewrites)
+            parts.append({
+                "id": f"part-{number:02d}",
+                **info,
+                "ifc_file": ifc_file.name,
+                "elements": len(splitter.members[key]),
+                "entities": entities,
+                "ifc_bytes": ifc_file.stat().st_size,
+                "bbox": splitter.part_box(key)
+            })
+            print(f"[SPLIT] {ifc_file.name}: {info['type']} {info['name']!r}, "
+                  f"{len(splitter.members[key])} elements, {entities} entities")
+        unassigned = sum(1 for key in splitter.part_of.values() if key is None)
+    
+    return {
+        "source": ifc_path.name,
+        "source_bytes": ifc_path.stat().st_size,
+        "schema": header.get("schema"),
+        "parts": parts,
+        "unassigned": unassigned,
+        "split_seconds": round(time.perf_counter() - start, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split an IFC model into one IFC file per storey")
+    parser.add_argument('ifc_file', help='IFC file to split')
+    parser.add_argument('parts_dir', nargs='?', help='Directory for the parts (default: <name>.parts next to the file)')
+    parser.add_argument('--json', action='store_true', help='Print the split summary as JSON')
+    args = parser.parse_args()
+    
+    ifc_file = Path(args.ifc_file)
+    parts_dir = Path(args.parts_dir) if args.parts_dir else ifc_file.with_name(f"{ifc_file.stem}.parts")
+    split = split_ifc(ifc_file, parts_dir)
+    if args.json:
+        print(json.dumps(split, indent=2))
+    else:
+        print(f"[DONE] {len(split['parts'])} parts in {parts_dir} ({split['split_seconds']}s), "
+              f"{split['unassigned']} objects outside the spatial structure")
+    return 0 if split["parts"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Bounded Converter Output Capture
+================================
+
+Reads a converter's stdout / stderr line by line while it runs instead of
+collecting everything with `capture_output=True`. Each stream keeps only
+its last `tail_kb` kilobytes in a ring buffer, and every line is handed to
+an `on_line(stream, line)` callback as it arrives, so progress shows up in
+the logs immediately and memory per conversion stays constant however
+long the converter runs. The tails are still returned for error messages;
+their default size comes from QGEN_IMPFRAG_OUTPUT_TAIL_KB.
+
+Each converter starts in its own process group (session), so a timeout,
+a cancel (`cancel_event`) or Ctrl-C in the caller stops the whole tree
+with `kill_tree` - e.g. a `python ifc_fragments_converter.py` wrapper
+and the Node.js process it started - instead of only the direct child.
+Converters started from inside such a group stay in it, so the outermost
+caller's kill reaches every level. Descendants still alive after the
+converter exits are killed as well, as they would hold its output pipes.
+    
+    result = run_streaming(cmd, timeout=600, text=True,
+                           on_line=lambda stream, line: logger.info(line))
+    result.returncode, result.stdout, result.stderr    # stdout / stderr are the tails
+    result.peak_memory_mb                              # None without os.wait4
+
+Only Python standard libraries are used, so the package stays portable.
+"""
+
+import os
+import signal
+import sys
+import time
+import threading
+import subprocess
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_TAIL_KB = int(os.getenv("QGEN_IMPFRAG_OUTPUT_TAIL_KB", "64"))
+
+# Longest piece read at once; longer lines reach on_line in pieces
+MAX_LINE_BYTES = 64 * 1024
+
+# Seconds between SIGTERM and SIGKILL when a process tree is stopped
+KILL_GRACE_SECONDS = float(os.getenv("QGEN_IMPFRAG_KILL_GRACE_SECONDS", "5"))
+
+# Set in the environment of converters that lead their own process group
+GROUP_ENV = "QGEN_IMPFRAG_CONVERSION_GROUP"
+
+_TEXT_KWARGS = ("text", "universal_newlines", "encoding", "errors")
+
+
+class ConversionCancelled(subprocess.SubprocessError):
+    """The converter was stopped because its cancel event was set"""
+    
+    def __init__(self, cmd, output=None, stderr=None):
+        self.cmd = cmd
+        self.output = output
+        self.stderr = stderr
+    
+    def __str__(self):
+        return f"Command '{self.cmd}' was cancelled"
+
+
+class OutputTail:
+    """
+    Ring buffer holding the last `max_bytes` of a stream, plus line counts
+    """
+    
+    def __init__(self, max_bytes: int = DEFAULT_TAIL_KB * 1024):
+        self.max_bytes = max_bytes
+        self.chunks = deque()
+        self.size = 0
+        self.total_bytes = 0
+        self.lines = 0
+    
+    def append(self, chunk: bytes):
+        self.chunks.append(chunk)
+        self.size += len(chunk)
+        self.total_bytes += len(chunk)
+        self.lines += 1
+        while self.size > self.max_bytes and len(self.chunks) > 1:
+            self.size -= len(self.chunks.popleft())
+    
+    @property
+    def truncated(self) -> bool:
+        return self.total_bytes > self.size
+    
+    def data(self) -> bytes:
+        data = b"".join(self.chunks)
+        return data[-self.max_bytes:] if len(data) > self.max_bytes else data
+
+
+def _decoder(popen_kwargs: Dict) -> Optional[Callable[[bytes], str]]:
+    """Bytes to str like Popen's text mode would, or None for bytes output"""
+    text_mode = {key: popen_kwargs.pop(key) for key in _TEXT_KWARGS if key in popen_kwargs}
+    if not any(text_mode.values()):
+        return None
+    encoding = text_mode.get("encoding") or "utf-8"
+    errors = text_mode.get("errors") or "replace"
+    return lambda data: data.decode(encoding, errors).replace("\r\n", "\n")
+
+
+def run_streaming(cmd: List[str], timeout: Optional[float] = None, tail_kb: int = DEFAULT_TAIL_KB,
+                  on_line: Optional[Callable[[str, str], None]] = None,
+                  on_start: Optional[Callable[[subprocess.Popen], None]] = None,
+                  input=None, nice: int = 0, cancel_event: Optional[threading.Event] = None,
+                  **popen_kwargs) -> subprocess.CompletedProcess:
+    """
+    subprocess.run whose stdout / stderr are read incrementally into
+    bounded tails
+    
+    Accepts subprocess.run's text / encoding / errors / cwd / env keywords;
+    `capture_output` is accepted and implied. `on_line(stream, line)` is
+    called from the reader threads with each line (without the newline),
+    `on_start(process)` right after the child is started. `nice` lowers
+    the child's CPU priority by that increment (inherited by the processes
+    it starts). On timeout the child's process tree is killed and
+    TimeoutExpired is raised with the tails as output; once `cancel_event`
+    is set the same happens with ConversionCancelled. Any other exception
+    in the caller (KeyboardInterrupt) also kills the tree before it
+    propagates.
+    
+    The returned CompletedProcess also carries `peak_memory_mb` (the child's
+    peak RSS from os.wait4, None where unavailable) and `output_bytes`
+    (total bytes per stream, including what fell out of the tails).
+    """
+    popen_kwargs.pop("capture_output", None)
+    decode = _decoder(popen_kwargs)
+    tails = {"stdout": OutputTail(tail_kb * 1024), "stderr": OutputTail(tail_kb * 1024)}
+    
+    def convert(data: bytes):
+        return decode(data) if decode else data
+    
+    def read_lines(name, stream):
+        try:
+            for chunk in iter(lambda: stream.readline(MAX_LINE_BYTES), b""):
+                tails[name].append(chunk)
+                if on_line:
+                    try:
+                        on_line(name, convert(chunk).rstrip("\r\n" if decode else b"\r\n"))
+                    except Exception:
+                        pass
+        finally:
+            stream.close()
+    
+    own_group = hasattr(os, "killpg") and not os.environ.get(GROUP_ENV)
+    if own_group:
+        popen_kwargs["start_new_session"] = True
+        popen_kwargs["env"] = {**(popen_kwargs.get("env") or os.environ), GROUP_ENV: "1"}
+    
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE if input is not None else None,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, **popen_kwargs)
+    if nice:
+        set_nice(process.pid, nice)
+    readers = [threading.Thread(target=read_lines, args=(name, getattr(process, name)),
+                                name=f"output-{name}-{process.pid}", daemon=True)
+               for name in ("stdout", "stderr")]
+    for reader in readers:
+        reader.start()
+    
+    if input is not None:
+        try:
+            process.stdin.write(input.encode() if isinstance(input, str) else input)
+        except BrokenPipeError:
+            pass
+        finally:
+            process.stdin.close()
+    
+    def outputs():
+        for reader in readers:
+            reader.join()
+        return [convert(tails[name].data()) for name in ("stdout", "stderr")]
+    
+    try:
+        if on_start:
+            on_start(process)
+        status, usage = _wait(process, timeout, cancel_event)
+    except subprocess.TimeoutExpired:
+        kill_tree(process, group=own_group)
+        raise subprocess.TimeoutExpired(cmd, timeout, *outputs())
+    except ConversionCancelled:
+        kill_tree(process, group=own_group)
+        raise ConversionCancelled(cmd, *outputs())
+    except BaseException:
+        kill_tree(process, group=own_group)
+        raise
+    
+    if status is not None:
+        # Tell Popen the child is gone so it does not try to reap it again
+        process.returncode = os.waitstatus_to_exitcode(status)
+    if own_group:
+        # Orphaned descendants would keep the pipes (and their memory) open
+        _signal_group(process.pid, signal.SIGKILL)
+    stdout, stderr = outputs()
+    
+    result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+    result.peak_memory_mb = None
+    if usage is not None:
+        # ru_maxrss is in KB on Linux and in bytes on macOS
+        result.peak_memory_mb = round(usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    result.output_bytes = {name: tail.total_bytes for name, tail in tails.items()}
+    return result
+
+
+def set_nice(pid: int, increment: int):
+    """Lower a process's CPU priority relative to ours (no-op where unsupported)"""
+    if not hasattr(os, "setpriority"):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, pid, min(os.getpriority(os.PRIO_PROCESS, 0) + increment, 19))
+    except OSError:
+        pass
+
+
+def kill_tree(process: subprocess.Popen, grace: float = KILL_GRACE_SECONDS, group: bool = True):
+    """
+    Stop a child and everything it started, then reap the child
+    
+    With `group` (the child leads its own process group, as run_streaming
+    and the converter pool start them) the group gets SIGTERM, and SIGKILL
+    once it is still alive after `grace` seconds. Otherwise only the child
+    itself is killed.
+    """
+    if not group or not hasattr(os, "killpg"):
+        process.kill()
+        process.wait()
+        return
+    if _signal_group(process.pid, signal.SIGTERM):
+        deadline = time.time() + grace
+        while time.time() < deadline:
+            # Reap the leader, or its zombie keeps the group alive
+            process.poll()
+            if not _signal_group(process.pid, 0):
+                break
+            time.sleep(0.05)
+        _signal_group(process.pid, signal.SIGKILL)
+    process.wait()
+
+
+def _signal_group(pgid: int, sig: int) -> bool:
+    """Send a signal to a process group; False when the group is gone"""
+    try:
+        os.killpg(pgid, sig)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _wait(process: subprocess.Popen, timeout: Optional[float], cancel_event: Optional[threading.Event] = None):
+    """Wait for the child; (wait status, rusage) with os.wait4, else (None, None)"""
+    deadline = time.time() + timeout if timeout else None
+    while True:
+        if hasattr(os, "wait4"):
+            pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                return status, usage
+        elif process.poll() is not None:
+            return None, None
+        if cancel_event is not None and cancel_event.is_set():
+            raise ConversionCancelled(process.args)
+        if deadline and time.time() > deadline:
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        if cancel_event is not None:
+            cancel_event.wait(0.05)
+        else:
+            time.sleep(0.05)
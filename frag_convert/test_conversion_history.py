@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for backfilling legacy reports into the conversion history
+    
+    python -m pytest frag_convert/test_conversion_history.py
+"""
+
+import json
+
+import pytest
+
+from conversion_history import ConversionHistory
+
+
+def write_report(path, files=("a.ifc", "b.ifc")):
+    results = [{"file": name, "status": "success", "conversion_time": 2.0,
+                "stats": {"inputSizeMB": 1.0, "outputSizeMB": "0.25"}} for name in files]
+    results.append({"file": "skipped.ifc", "status": "skipped"})
+    path.write_text(json.dumps({
+        "timestamp": "2025-06-01T10:00:00+00:00",
+        "conversion_summary": {"total_files": len(results), "results": results}
+    }), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def history(tmp_path):
+    return ConversionHistory(tmp_path / "history.db")
+
+
+def conversion_count(history):
+    with history._connect() as conn:
+        return conn.execute("SELECT COUNT(*) FROM conversions").fetchone()[0]
+
+
+def test_import_adds_conversions_and_run(history, tmp_path):
+    report = write_report(tmp_path / "conversion_report_1.json")
+    
+    assert history.import_report(report) == 2
+    assert conversion_count(history) == 2
+    with history._connect() as conn:
+        row = conn.execute("SELECT input_bytes, output_bytes FROM conversions LIMIT 1").fetchone()
+        assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 1
+    assert (row["input_bytes"], row["output_bytes"]) == (1024 * 1024, 256 * 1024)
+
+
+def test_reimport_is_skipped(history, tmp_path):
+    report = write_report(tmp_path / "conversion_report_1.json")
+    history.import_report(report)
+    
+    assert history.import_report(report) is None
+    copy = tmp_path / "conversion_report_copy.json"
+    copy.write_bytes(report.read_bytes())
+    assert history.import_report(copy) is None
+    assert conversion_count(history) == 2
+
+
+def test_different_report_is_imported(history, tmp_path):
+    history.import_report(write_report(tmp_path / "conversion_report_1.json"))
+    
+    assert history.import_report(write_report(tmp_path / "conversion_report_2.json", ("c.ifc",))) == 1
+    assert conversion_count(history) == 3
+
+
+def test_malformed_report_writes_nothing(history, tmp_path):
+    report = tmp_path / "conversion_report_bad.json"
+    report.write_text(json.dumps({"conversion_summary": {"results": [
+        {"file": "a.ifc", "status": "success", "stats": {"inputSizeMB": 1.0}},
+        {"file": "b.ifc", "status": "success", "stats": {"inputSizeMB": "broken"}}
+    ]}}), encoding="utf-8")
+    
+    with pytest.raises(ValueError):
+        history.import_report(report)
+    with history._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 0
+    assert conversion_count(history) == 0
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the conversion duration model
+    
+    python -m pytest frag_convert/test_duration_model.py
+"""
+
+import math
+
+import pytest
+
+from duration_model import DurationModel, bounded_timeout, count_entities, default_timeout
+
+
+class FakeHistory:
+    """The two ConversionHistory queries the model uses"""
+    
+    def __init__(self, samples):
+        self.samples = samples
+        self.queries = 0
+    
+    def latest_id(self):
+        return len(self.samples)
+    
+    def duration_samples(self, sources=None, converter_version=None, limit=2000):
+        self.queries += 1
+        return self.samples[-limit:]
+
+
+def _samples(count, seconds_per_mb=2.0, entities=False):
+    """Durations proportional to size, with a little deterministic noise"""
+    samples = []
+    for i in range(count):
+        input_mb = 2 ** (i % 6)
+        samples.append({
+            "input_bytes": input_mb * 1024 * 1024,
+            # Not a multiple of the size, so both terms can be fitted
+            "ifc_entities": 10000 * 3 ** (i % 5) if entities else None,
+            "duration_s": seconds_per_mb * input_mb * (1.1 if i % 2 else 0.9)
+        })
+    return samples
+
+
+def test_prediction_follows_the_history():
+    model = DurationModel(FakeHistory(_samples(24)), refit_seconds=0)
+    prediction = model.predict(10 * 1024 * 1024)
+    
+    assert prediction["features"] == ["input_mb"]
+    assert prediction["records"] == 24
+    assert prediction["expected_s"] == pytest.approx(20, rel=0.1)
+    assert prediction["upper_s"] > prediction["expected_s"]
+    assert model.timeout(10 * 1024 * 1024) == bounded_timeout(prediction["upper_s"])
+
+
+def test_entity_count_is_used_when_known():
+    model = DurationModel(FakeHistory(_samples(24, entities=True)), refit_seconds=0)
+    
+    assert model.predict(8 * 1024 * 1024, entities=80000)["features"] == ["input_mb", "entities"]
+    assert model.predict(8 * 1024 * 1024)["features"] == ["input_mb"]
+
+
+def test_too_little_history_falls_back_to_default():
+    model = DurationModel(FakeHistory(_samples(5)), refit_seconds=0)
+    
+    assert model.predict(10 * 1024 * 1024) is None
+    assert model.expected_seconds(10 * 1024 * 1024) is None
+    assert model.timeout(10 * 1024 * 1024, default=900) == 900
+    assert model.timeout(60 * 1024 * 1024) == default_timeout(60) == 1800
+
+
+def test_history_without_size_spread_falls_back_to_default():
+    samples = [{"input_bytes": 1024 * 1024, "ifc_entities": None, "duration_s": 3.0 + i} for i in range(20)]
+    model = DurationModel(FakeHistory(samples), refit_seconds=0)
+    
+    assert model.predict(1024 * 1024) is None
+    assert model.timeout(1024 * 1024, default=600) == 600
+
+
+def test_model_is_refitted_when_history_grows():
+    history = FakeHistory(_samples(24))
+    model = DurationModel(history, refit_seconds=0)
+    model.predict(1024 * 1024)
+    model.predict(2 * 1024 * 1024)
+    assert history.queries == 1
+    
+    # Conversions became three times slower
+    history.samples += _samples(2000, seconds_per_mb=6.0)
+    assert model.predict(10 * 1024 * 1024)["expected_s"] == pytest.approx(60, rel=0.1)
+    assert history.queries == 2
+
+
+def test_timeouts_are_clamped():
+    assert bounded_timeout(1) == 120
+    assert bounded_timeout(10 ** 6) == 14400
+    assert bounded_timeout(1000) == math.floor(1000 * 1.5)
+
+
+def test_count_entities(tmp_path):
+    ifc = tmp_path / "model.ifc"
+    ifc.write_bytes(b"ISO-10303-21;\nDATA;\n#1=IFCWALL();\n#2=IFCSLAB();\n#3=IFCLABEL('#4');\nENDSEC;\n")
+    assert count_entities(ifc) == 3
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the filesystem work leases
+    
+    python -m pytest frag_convert/test_file_leases.py
+"""
+
+import time
+import threading
+
+import pytest
+
+from file_leases import LeaseDirectory
+
+
+@pytest.fixture
+def source(tmp_path):
+    ifc = tmp_path / "ifc" / "model.ifc"
+    ifc.parent.mkdir()
+    ifc.write_text("ISO-10303-21;\n")
+    return ifc
+
+
+def _hosts(tmp_path, count, **kwargs):
+    return [LeaseDirectory(tmp_path / "leases", owner=f"host-{i}", source_root=tmp_path / "ifc", **kwargs)
+            for i in range(count)]
+
+
+def test_only_one_host_claims_a_file(tmp_path, source):
+    hosts = _hosts(tmp_path, 8)
+    barrier = threading.Barrier(len(hosts))
+    leases = []
+    
+    def claim(directory):
+        barrier.wait()
+        leases.append(directory.claim(source))
+    
+    threads = [threading.Thread(target=claim, args=(directory,)) for directory in hosts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    won = [lease for lease in leases if lease]
+    assert len(won) == 1
+    assert hosts[0].holder(source)["owner"] == won[0].owner
+
+
+def test_published_result_stops_further_claims(tmp_path, source):
+    first, second = _hosts(tmp_path, 2)
+    lease = first.claim(source)
+    with lease:
+        assert first.publish(lease, {"file": source.name, "status": "success"})
+    
+    assert not lease.path.exists()
+    assert second.result(source)["status"] == "success"
+    assert second.claim(source) is None
+    assert second.pending([source]) == []
+
+
+def test_expired_lease_is_taken_over(tmp_path, source):
+    crashed, survivor = _hosts(tmp_path, 2, ttl=0.05)
+    stale = crashed.claim(source)
+    assert survivor.claim(source) is None
+    
+    time.sleep(0.1)
+    lease = survivor.claim(source)
+    assert lease.attempt == 2
+    assert survivor.holder(source)["owner"] == "host-1"
+    
+    # The crashed host comes back: its renewal fails and it may not publish
+    assert not stale.renew()
+    assert stale.lost
+    assert not crashed.publish(stale, {"status": "success"})
+    assert survivor.result(source) is None
+    assert survivor.publish(lease, {"status": "success"})
+
+
+def test_file_is_failed_after_max_attempts(tmp_path, source):
+    host, = _hosts(tmp_path, 1, ttl=0.05, max_attempts=2)
+    assert host.claim(source).attempt == 1
+    time.sleep(0.1)
+    assert host.claim(source).attempt == 2
+    time.sleep(0.1)
+    
+    assert host.claim(source) is None
+    result = host.result(source)
+    assert result["status"] == "failed"
+    assert "after 2 attempts" in result["message"]
+
+
+def test_changed_file_invalidates_result(tmp_path, source):
+    host, = _hosts(tmp_path, 1)
+    lease = host.claim(source)
+    host.publish(lease, {"status": "success"})
+    assert host.result(source)
+    
+    source.write_text("ISO-10303-21;\nDATA;\n")
+    assert host.result(source) is None
+    assert host.pending([source]) == [source]
+    assert host.claim(source).attempt == 1
+
+
+def test_key_is_the_same_under_different_mount_roots(tmp_path):
+    keys = []
+    for mount in ("mnt-a", "mnt-b"):
+        ifc = tmp_path / mount / "ifc" / "site" / "model.ifc"
+        ifc.parent.mkdir(parents=True)
+        ifc.write_text("ISO-10303-21;\n")
+        keys.append(LeaseDirectory(tmp_path / "leases", source_root=tmp_path / mount / "ifc").key_for(ifc))
+    assert keys[0] == keys[1]
+    
+    # The same name in another folder is a different file
+    other = tmp_path / "mnt-a" / "ifc" / "other" / "model.ifc"
+    other.parent.mkdir()
+    other.write_text("ISO-10303-21;\n")
+    directory = LeaseDirectory(tmp_path / "leases", source_root=tmp_path / "mnt-a" / "ifc")
+    assert directory.key_for(other) != keys[0]
+
+
+def test_result_of_another_generation_is_stale(tmp_path, source):
+    old, = _hosts(tmp_path, 1, generation="converter-v1")
+    lease = old.claim(source)
+    old.publish(lease, {"status": "success"})
+    assert old.result(source)
+    
+    # After a converter upgrade (or under a new batch id) the file is converted again
+    upgraded, = _hosts(tmp_path, 1, generation="converter-v2")
+    assert upgraded.result(source) is None
+    assert upgraded.pending([source]) == [source]
+    lease = upgraded.claim(source)
+    assert lease.attempt == 1
+    upgraded.publish(lease, {"status": "success"})
+    assert upgraded.result(source)["generation"] == "converter-v2"
+    assert old.result(source) is None
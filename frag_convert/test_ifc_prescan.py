@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for the IFC pre-scanner
+    
+    python -m pytest frag_convert/test_ifc_prescan.py
+"""
+
+import hashlib
+
+import pytest
+
+from ifc_prescan import prescan
+
+HEADER = """ISO-10303-21;
+HEADER;
+FILE_DESCRIPTION(('ViewDefinition [CoordinationView]'),'2;1');
+FILE_NAME('model.ifc','2025-01-01T00:00:00',('Author'),('Office'),'IfcOpenShell','Modeller','');
+FILE_SCHEMA(('{schema}'));
+ENDSEC;
+DATA;
+"""
+
+RECORDS = """#1=IFCPROJECT('0000000000000000000001',$,'Project',$,$,$,$,$,$);
+#2=IFCCARTESIANPOINT((0.,0.,0.));
+#3=IFCEXTRUDEDAREASOLID(#4,#5,#6,3.);
+#4=IFCRECTANGLEPROFILEDEF(.AREA.,$,#7,1.,1.);
+#5=IFCPROPERTYSINGLEVALUE('Note',$,IFCLABEL('Checked'),$);
+"""
+
+FOOTER = "ENDSEC;\nEND-ISO-10303-21;\n"
+
+
+@pytest.fixture
+def write(tmp_path):
+    def write(text, name="model.ifc"):
+        path = tmp_path / name
+        path.write_bytes(text.encode("latin-1") if isinstance(text, str) else text)
+        return path
+    return write
+
+
+def test_valid_file(write):
+    scan = prescan(write(HEADER.format(schema="IFC4") + RECORDS + FOOTER))
+    
+    assert scan["valid"], scan["errors"]
+    assert scan["schema"] == "IFC4"
+    assert scan["header"]["originating_system"] == "Modeller"
+    assert scan["entities"] == 5
+    assert scan["geometry"] == {"IFCEXTRUDEDAREASOLID": 1}
+    assert scan["property_entities"] == 1
+    assert scan["warnings"] == []
+
+
+def test_truncated_file(write):
+    text = HEADER.format(schema="IFC4") + RECORDS + "#6=IFCDIRECTION((0.,0"
+    scan = prescan(write(text))
+    
+    assert not scan["valid"]
+    assert scan["errors"] == ["File is truncated (missing END-ISO-10303-21, last record cut off ('#6=IFCDIRECTION((0.,0'))"]
+
+
+def test_unclosed_data_section(write):
+    scan = prescan(write(HEADER.format(schema="IFC4") + RECORDS + "END-ISO-10303-21;\n"))
+    
+    assert not scan["valid"]
+    assert "File is truncated (DATA section not closed)" in scan["errors"]
+
+
+@pytest.mark.parametrize("content, error", [
+    (b"", "File is empty"),
+    (b"PK\x03\x04\x00\x00 zipped model", "Not a STEP file (missing ISO-10303-21 header)"),
+    (b"<?xml version='1.0'?><ifcXML/>", "Not a STEP file (missing ISO-10303-21 header)"),
+])
+def test_not_a_step_file(write, content, error):
+    scan = prescan(write(content))
+    
+    assert not scan["valid"]
+    assert scan["errors"][0] == error
+
+
+def test_binary_garbage(write):
+    scan = prescan(write(HEADER.format(schema="IFC4").encode() + b"\x00" * 64 + FOOTER.encode()))
+    
+    assert "File contains binary data (NUL bytes)" in scan["errors"]
+
+
+@pytest.mark.parametrize("schema, valid", [
+    ("IFC2X3", True),
+    ("IFC4X3_ADD2", True),
+    ("IFC2X2_FINAL", False),
+    ("CONFIG_CONTROL_DESIGN", False),
+])
+def test_schema_support(write, schema, valid):
+    scan = prescan(write(HEADER.format(schema=schema) + RECORDS + FOOTER))
+    
+    assert scan["valid"] is valid
+    assert scan["schema"] == schema
+    if not valid:
+        assert scan["errors"][0].startswith(f"Unsupported schema {schema}")
+
+
+def test_empty_data_section(write):
+    scan = prescan(write(HEADER.format(schema="IFC4") + FOOTER))
+    
+    assert scan["errors"] == ["DATA section has no entities"]
+
+
+@pytest.mark.parametrize("text", [HEADER.format(schema="IFC4") + RECORDS + FOOTER, "no STEP data at all"])
+def test_sha256_in_the_same_pass(write, text):
+    path = write(text)
+    
+    assert prescan(path, sha256=True)["sha256"] == hashlib.sha256(path.read_bytes()).hexdigest()
+    assert prescan(path)["sha256"] is None
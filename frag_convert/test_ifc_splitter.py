@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for the IFC spatial splitter
+    
+    python -m pytest frag_convert/test_ifc_splitter.py
+"""
+
+import re
+from collections import Counter
+
+import pytest
+
+from ifc_splitter import split_ifc
+
+# Two storeys and a building holding an element directly; a door filling an
+# opening in a wall, a wall type and a property set shared across storeys,
+# and a '#' inside a string attribute
+MODEL = """ISO-10303-21;
+HEADER;
+FILE_DESCRIPTION(('ViewDefinition [ReferenceView_V1.2]'),'2;1');
+FILE_NAME('split.ifc','2025-01-01T00:00:00',(''),(''),'','','');
+FILE_SCHEMA(('IFC4'));
+ENDSEC;
+DATA;
+#1=IFCCARTESIANPOINT((0.,0.,0.));
+#2=IFCAXIS2PLACEMENT3D(#1,$,$);
+#3=IFCGEOMETRICREPRESENTATIONCONTEXT($,'Model',3,1.E-05,#2,$);
+#4=IFCSIUNIT(*,.LENGTHUNIT.,$,.METRE.);
+#5=IFCUNITASSIGNMENT((#4));
+#10=IFCPROJECT(GUID,$,'Project',$,$,$,$,(#3),#5);
+#11=IFCLOCALPLACEMENT($,#2);
+#12=IFCSITE(GUID,$,'Site',$,$,#11,$,$,.ELEMENT.,$,$,$,$,$);
+#13=IFCLOCALPLACEMENT(#11,#2);
+#14=IFCBUILDING(GUID,$,'Building',$,$,#13,$,$,.ELEMENT.,$,$,$);
+#15=IFCRELAGGREGATES(GUID,$,$,$,#10,(#12));
+#16=IFCRELAGGREGATES(GUID,$,$,$,#12,(#14));
+#20=IFCCARTESIANPOINT((0.,0.,3.5));
+#21=IFCAXIS2PLACEMENT3D(#20,$,$);
+#22=IFCLOCALPLACEMENT(#13,#2);
+#23=IFCLOCALPLACEMENT(#13,#21);
+#24=IFCBUILDINGSTOREY(GUID,$,'Level 0',$,$,#22,$,$,.ELEMENT.,0.);
+#25=IFCBUILDINGSTOREY(GUID,$,'Level 1',$,$,#23,$,$,.ELEMENT.,3.5);
+#26=IFCRELAGGREGATES(GUID,$,$,$,#14,(#24,#25));
+#30=IFCCARTESIANPOINT((0.,0.,0.));
+#31=IFCCARTESIANPOINT((4.,0.2,3.));
+#32=IFCPOLYLINE((#30,#31));
+#33=IFCSHAPEREPRESENTATION(#3,'Body','Curve3D',(#32));
+#34=IFCPRODUCTDEFINITIONSHAPE($,$,(#33));
+#35=IFCWALLTYPE(GUID,$,'Shared type',$,$,$,$,$,$,.STANDARD.);
+#40=IFCLOCALPLACEMENT(#22,#2);
+#41=IFCWALL(GUID,$,'Wall 0',$,$,#40,#34,$,.STANDARD.);
+#42=IFCOPENINGELEMENT(GUID,$,'Opening 0',$,$,#40,$,$,.OPENING.);
+#43=IFCRELVOIDSELEMENT(GUID,$,$,$,#41,#42);
+#44=IFCDOOR(GUID,$,'Door 0',$,$,#40,$,$,2.1,0.9,.DOOR.,$,$);
+#45=IFCRELFILLSELEMENT(GUID,$,$,$,#42,#44);
+#46=IFCRELCONTAINEDINSPATIALSTRUCTURE(GUID,$,$,$,(#41),#24);
+#50=IFCLOCALPLACEMENT(#23,#2);
+#51=IFCWALL(GUID,$,'Wall 1',$,$,#50,#34,$,.STANDARD.);
+#52=IFCSLAB(GUID,$,'Slab 1',$,$,#50,$,$,.FLOOR.);
+#53=IFCRELCONTAINEDINSPATIALSTRUCTURE(GUID,$,$,$,(#51,#52),#25);
+#60=IFCBEAM(GUID,$,'Roof beam',$,$,#13,$,$,.BEAM.);
+#61=IFCRELCONTAINEDINSPATIALSTRUCTURE(GUID,$,$,$,(#60),#14);
+#70=IFCRELDEFINESBYTYPE(GUID,$,$,$,(#41,#51),#35);
+#71=IFCPROPERTYSINGLEVALUE('Note',$,IFCLABEL('see #99'),$);
+#72=IFCPROPERTYSET(GUID,$,'Pset_Shared',$,(#71));
+#73=IFCRELDEFINESBYPROPERTIES(GUID,$,$,$,(#41,#51,#60),#72);
+ENDSEC;
+END-ISO-10303-21;
+"""
+
+# Wall 0, opening, door, wall 1, slab, roof beam
+ELEMENTS = {41, 42, 44, 51, 52, 60}
+
+_RECORD = re.compile(r"^#(\d+)\s*=\s*([A-Z0-9_]+)\((.*)\);\s*$", re.M)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+def _model_text() -> str:
+    guids = iter(range(1, 1000))
+    return re.sub(r"\bGUID\b", lambda _: f"'{next(guids):022d}'", MODEL)
+
+
+def _records(text: str):
+    """Instance name -> (type, attribute text)"""
+    return {int(number): (entity, body) for number, entity, body in _RECORD.findall(text)}
+
+
+@pytest.fixture
+def split(tmp_path):
+    source = tmp_path / "split.ifc"
+    source.write_text(_model_text())
+    result = split_ifc(source, tmp_path / "parts")
+    parts = {part["name"]: _records((tmp_path / "parts" / part["ifc_file"]).read_text()) for part in result["parts"]}
+    return result, parts
+
+
+def test_one_part_per_storey_and_building(split):
+    result, parts = split
+    assert [part["name"] for part in result["parts"]] == ["Building", "Level 0", "Level 1"]
+    assert [part["elevation"] for part in result["parts"][1:]] == [0.0, 3.5]
+    assert result["schema"] == "IFC4"
+
+
+def test_every_reference_resolves_within_its_part(split):
+    _, parts = split
+    for name, records in parts.items():
+        for number, (entity, body) in records.items():
+            references = {int(ref) for ref in re.findall(r"#(\d+)", _STRING.sub("''", body))}
+            missing = references - set(records)
+            assert not missing, f"{name}: #{number}={entity} refers to missing {sorted(missing)}"
+
+
+def test_every_element_is_in_exactly_one_part(split):
+    _, parts = split
+    placed = Counter(number for records in parts.values() for number in records if number in ELEMENTS)
+    assert placed == Counter(dict.fromkeys(ELEMENTS, 1))
+    assert set(parts["Level 0"]) >= {41, 42, 44}
+    assert set(parts["Level 1"]) >= {51, 52}
+    assert 60 in parts["Building"]
+
+
+def test_shared_entities_are_copied_unchanged(split):
+    _, parts = split
+    source = _records(_model_text())
+    for name in ("Level 0", "Level 1"):
+        # The wall type and the geometry both storeys use
+        for number in (35, 34, 33, 32):
+            assert parts[name][number] == source[number]
+        assert parts[name][24 if name == "Level 0" else 25][0] == "IFCBUILDINGSTOREY"
+        assert parts[name][10][0] == "IFCPROJECT"
+
+
+def test_relationships_keep_only_their_part_elements(split):
+    _, parts = split
+    assert re.search(r",\(#41\),#35$", parts["Level 0"][70][1])
+    assert re.search(r",\(#51\),#35$", parts["Level 1"][70][1])
+    assert 70 not in parts["Building"]
+    assert re.search(r",\(#60\),#72$", parts["Building"][73][1])
+    # The '#99' in the property's text is not a reference to follow
+    assert "see #99" in parts["Building"][71][1]
@@ -22,7 +22,10 @@ import * as FRAGS from "@thatopen/fragments";
 // API Configuration - Use Vite proxy for development, Nginx proxy for production
 const API_CONFIG = {
   // Empty string uses same origin - Vite or Nginx will proxy /api/ to backend
-  BASE_URL: ''
+  BASE_URL: '',
+  // Files above this size use the resumable chunked upload API
+  CHUNKED_UPLOAD_THRESHOLD_MB: 200,
+  CHUNK_RETRIES: 3
 };
 
 console.log("🚀 QGEN_IMPFRAG Standalone Fragment Viewer initializing...");
@@ -1988,6 +1991,78 @@ class FragmentViewer {
     this.world.camera.controls?.setLookAt(10, 10, 10, 0, 0, 0);
   }
 
+  /**
+   * Poll a queued conversion job until it finishes and return its result
+   */
+  private async waitForConversionJob(jobId: string, progressText: HTMLElement | null, pollInterval: number = 2000): Promise<any> {
+    while (true) {
+      const response = await fetch(`${API_CONFIG.BASE_URL}/api/jobs/${jobId}`);
+      if (!response.ok) {
+        throw new Error(`Job status request failed: HTTP ${response.status}`);
+      }
+      
+      const job = await response.json();
+      if (job.status === 'completed' || job.status === 'failed') {
+        return job.result || { success: false, error: job.error };
+      }
+      if (job.status === 'cancelled') {
+        return { success: false, error: 'Conversion was cancelled' };
+      }
+      
+      if (progressText) progressText.textContent = job.status === 'queued' ? 'Waiting in conversion queue...' : 'Generating fragments...';
+      await new Promise(resolve => setTimeout(resolve, pollInterval));
+    }
+  }
+
+  /**
+   * Upload a large IFC file as resumable chunks and queue its conversion.
+   * Resolves to the response of the complete call (202 with a job id).
+   */
+  private async uploadInChunks(file: File, converter: string, progressText: HTMLElement | null): Promise<Response> {
+    const sessionResponse = await fetch(`${API_CONFIG.BASE_URL}/api/uploads`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, size: file.size, converter })
+    });
+    if (!sessionResponse.ok) {
+      return sessionResponse;
+    }
+    
+    const session = await sessionResponse.json();
+    let missing: number[] = session.missing_chunks;
+    
+    for (let attempt = 0; missing.length > 0 && attempt <= API_CONFIG.CHUNK_RETRIES; attempt++) {
+      for (const index of missing) {
+        const chunk = file.slice(index * session.chunk_size, (index + 1) * session.chunk_size);
+        const headers: Record<string, string> = {};
+        if (crypto.subtle) {
+          const digest = await crypto.subtle.digest('SHA-256', await chunk.arrayBuffer());
+          headers['X-Chunk-SHA256'] = Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+        }
+        
+        try {
+          const response = await fetch(`${API_CONFIG.BASE_URL}/api/uploads/${session.upload_id}/chunks/${index}`, {
+            method: 'PUT',
+            headers,
+            body: chunk
+          });
+          if (!response.ok) {
+            console.warn(`⚠️ Chunk ${index} rejected: HTTP ${response.status}`);
+          }
+        } catch (error) {
+          console.warn(`⚠️ Chunk ${index} failed, will retry:`, error);
+        }
+        if (progressText) progressText.textContent = `Uploading file... chunk ${index + 1}/${session.total_chunks}`;
+      }
+      
+      // Ask the server which chunks it actually has before retrying
+      const statusResponse = await fetch(`${API_CONFIG.BASE_URL}/api/uploads/${session.upload_id}`);
+      missing = (await statusResponse.json()).missing_chunks;
+    }
+    
+    return fetch(`${API_CONFIG.BASE_URL}/api/uploads/${session.upload_id}/complete`, { method: 'POST' });
+  }
+  
   /**
    * Handle IFC file conversion
    */
@@ -2018,17 +2093,22 @@ class FragmentViewer {
       if (progressText) progressText.textContent = 'Processing IFC data...';
       statusElement.textContent = `🔄 Converting ${file.name}...`;
 
-      // Send to backend for conversion
-      const response = await fetch(`${API_CONFIG.BASE_URL}/api/convert`, {
-        method: 'POST',
-        body: formData
-      });
+      // Send to backend for conversion (large files as resumable chunks)
+      const response = file.size > API_CONFIG.CHUNKED_UPLOAD_THRESHOLD_MB * 1024 * 1024
+        ? await this.uploadInChunks(file, 'convert', progressText)
+        : await fetch(`${API_CONFIG.BASE_URL}/api/convert`, {
+            method: 'POST',
+            body: formData
+          });
 
       // Update progress
       if (progressBar) progressBar.style.width = '70%';
       if (progressText) progressText.textContent = 'Generating fragments...';
 
-      const result = await response.json();
+      let result = await response.json();
+      if (response.status === 202) {
+        result = await this.waitForConversionJob(result.job_id, progressText);
+      }
 
       if (result.success) {
         // Complete progress
@@ -2117,11 +2197,13 @@ class FragmentViewer {
 
       console.log(`📤 Sending request to: ${API_CONFIG.BASE_URL}/api/convert-subprocess`);
       
-      // Send to backend subprocess converter endpoint
-      const response = await fetch(`${API_CONFIG.BASE_URL}/api/convert-subprocess`, {
-        method: 'POST',
-        body: formData
-      });
+      // Send to backend subprocess converter endpoint (large files as resumable chunks)
+      const response = file.size > API_CONFIG.CHUNKED_UPLOAD_THRESHOLD_MB * 1024 * 1024
+        ? await this.uploadInChunks(file, 'convert-subprocess', progressText)
+        : await fetch(`${API_CONFIG.BASE_URL}/api/convert-subprocess`, {
+            method: 'POST',
+            body: formData
+          });
 
       console.log(`📥 Response status: ${response.status} ${response.statusText}`);
 
@@ -2133,7 +2215,11 @@ class FragmentViewer {
         throw new Error(`HTTP ${response.status}: ${response.statusText}`);
       }
 
-      const result = await response.json();
+      let result = await response.json();
+      if (response.status === 202) {
+        console.log(`📥 Subprocess conversion queued as job ${result.job_id}`);
+        result = await this.waitForConversionJob(result.job_id, progressText);
+      }
       console.log('📋 Subprocess result:', result);
 
       if (result.success) {
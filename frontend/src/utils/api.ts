@@ -29,6 +29,8 @@ export interface ApiResponse<T> {
   timestamp?: string;
 }
 
+const FRAGMENT_CACHE_NAME = 'qgen-impfrag-fragments';
+
 class ApiClient {
   private baseUrl: string;
 
@@ -97,20 +99,79 @@ class ApiClient {
   }
 
   /**
-   * Download fragment file as blob for processing
+   * Download fragment file as blob for processing.
+   *
+   * Copies are kept in the Cache Storage API and revalidated with their
+   * ETag, so an unchanged fragment costs a 304 instead of a full download.
+   * An interrupted transfer resumes with a Range request for the rest.
    */
   async downloadFragment(filename: string): Promise<Blob | null> {
+    const url = this.getFragmentUrl(filename);
     try {
-      const response = await fetch(this.getFragmentUrl(filename));
+      const cache = typeof caches !== 'undefined' ? await caches.open(FRAGMENT_CACHE_NAME) : null;
+      const cached = cache ? await cache.match(url) : undefined;
+      const etag = cached?.headers.get('ETag');
+
+      const response = await fetch(url, {
+        cache: 'no-store',
+        headers: etag ? { 'If-None-Match': etag } : {}
+      });
+      if (response.status === 304 && cached) {
+        return await cached.blob();
+      }
       if (!response.ok) {
         throw new Error(`Failed to download fragment: ${response.statusText}`);
       }
-      return await response.blob();
+
+      const blob = await this.readWithResume(url, response);
+      if (cache) {
+        await cache.put(url, new Response(blob, { headers: response.headers }));
+      }
+      return blob;
     } catch (error) {
       console.error(`Fragment download error:`, error);
       return null;
     }
   }
+
+  /**
+   * Read a fragment response body, continuing with byte-range requests
+   * (pinned to the same ETag via If-Range) if the connection drops
+   */
+  private async readWithResume(url: string, response: Response, maxRetries: number = 3): Promise<Blob> {
+    const etag = response.headers.get('ETag');
+    const total = Number(response.headers.get('Content-Length')) || 0;
+    const parts: BlobPart[] = [];
+    let received = 0;
+    let current: Response = response;
+
+    for (let attempt = 0; ; attempt++) {
+      try {
+        const reader = current.body!.getReader();
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          parts.push(value);
+          received += value.length;
+        }
+        return new Blob(parts, { type: 'application/octet-stream' });
+      } catch (error) {
+        if (!etag || !total || attempt >= maxRetries) throw error;
+        console.warn(`⚠️ Fragment download interrupted at ${received}/${total} bytes, resuming`, error);
+      }
+
+      current = await fetch(url, {
+        cache: 'no-store',
+        headers: { 'Range': `bytes=${received}-`, 'If-Range': etag }
+      });
+      if (current.status !== 206) {
+        // The fragment changed on the server: start over with the new version
+        parts.length = 0;
+        received = 0;
+        if (!current.ok) throw new Error(`Failed to resume fragment: ${current.statusText}`);
+      }
+    }
+  }
 }
 
 // Export singleton instance